@@ -1,8 +1,24 @@
 from truthdiscovery.algorithm.average_log import AverageLog
+from truthdiscovery.algorithm.backends import (
+    AutoBackend,
+    BaseMatrixBackend,
+    DenseBackend,
+    DenseMatrix,
+    SparseBackend,
+    ThreadedBackend,
+    ThreadedMatrix
+)
 from truthdiscovery.algorithm.base import (
     BaseAlgorithm,
     BaseIterativeAlgorithm,
-    PriorBelief
+    PriorBelief,
+    ProfiledRunContext,
+    RunContext
+)
+from truthdiscovery.algorithm.hooks import (
+    AlgorithmHook,
+    IterationState,
+    ProfilerHook
 )
 from truthdiscovery.algorithm.investment import Investment
 from truthdiscovery.algorithm.pooled_investment import PooledInvestment
@@ -10,10 +10,9 @@ class AverageLog(BaseIterativeAlgorithm):
     Similar to Sums (and uses the same belief update step), but updates source
     trust as average claim belief weighted by log(number of claims).
     """
-    def _run(self, data):
+    def _run(self, data, ctx):
         trust = np.zeros((data.num_sources,))
         belief = self.get_prior_beliefs(data)
-        self.log(data, trust, belief)
 
         # Pre-compute the number of claims made by each source and log
         # weighting, since this is used in each iteration and does not change.
@@ -23,18 +22,21 @@ class AverageLog(BaseIterativeAlgorithm):
         claim_counts = data.sc @ np.ones((data.num_claims,))
 
         weights = np.log(claim_counts) / claim_counts
+        ctx.checkpoint("setup")
+        yield trust, belief
 
-        while not self.iterator.finished():
+        while not ctx.iterator.finished():
             # Entry-wise multiplication
             new_trust = weights * (data.sc @  belief)
-            belief = data.sc.T @ new_trust
+            belief = data.get_claim_totals(new_trust)
+            ctx.checkpoint("spmv")
 
             # Normalise as with sums
             new_trust = new_trust / max(new_trust)
             belief = belief / max(belief)
+            ctx.checkpoint("normalise")
 
-            self.iterator.compare(new_trust, trust)
+            ctx.iterator.compare(new_trust, trust)
+            ctx.checkpoint("compare")
             trust = new_trust
-            self.log(data, trust, belief)
-
-        return trust, belief
+            yield trust, belief
@@ -0,0 +1,501 @@
+"""
+Backends for the matrix-vector products performed by iterative algorithms
+"""
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import os
+import threading
+import weakref
+
+import numpy as np
+import scipy.sparse
+
+#: Names of dataset attributes holding matrices that backends may convert
+MATRIX_ATTRIBUTES = ("sc", "mut_ex", "imp")
+
+
+def get_row_blocks(mat, num_blocks):
+    """
+    Split a CSR matrix into blocks of rows with roughly equal numbers of
+    non-zero entries. Blocks share their data and index arrays with ``mat``
+
+    :param mat:        ``scipy.sparse.csr_matrix``
+    :param num_blocks: maximum number of blocks
+    :return: list of tuples ``(start, end, block)``, where ``block`` is a
+             CSR matrix for rows ``start`` to ``end - 1``
+    """
+    targets = np.linspace(0, mat.nnz, num_blocks + 1)[1:-1]
+    starts = np.searchsorted(mat.indptr, targets, side="left")
+    bounds = np.unique(np.concatenate(([0], starts, [mat.shape[0]])))
+    blocks = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        first = mat.indptr[start]
+        last = mat.indptr[end]
+        # The constructor copies views of much larger arrays, so set the
+        # arrays afterwards to share them
+        block = scipy.sparse.csr_matrix((end - start, mat.shape[1]),
+                                        dtype=mat.dtype)
+        block.indptr = mat.indptr[start:end + 1] - first
+        block.indices = mat.indices[first:last]
+        block.data = mat.data[first:last]
+        blocks.append((start, end, block))
+    return blocks
+
+
+class BaseMatrixBackend:
+    """
+    Base class for matrix backends. Before an iterative algorithm runs, its
+    backend converts the ``sc``, ``mut_ex`` and ``imp`` matrices of the
+    dataset into objects that perform products with vectors in a particular
+    way. Algorithms use the converted matrices exactly as they would use
+    ``scipy.sparse`` matrices.
+    """
+    def prepare(self, data):
+        """
+        :param data: :any:`Dataset` object
+        :return: a shallow copy of ``data`` with converted matrices, or
+                 ``data`` itself if no matrices were converted
+        """
+        converted = {}
+        for name in MATRIX_ATTRIBUTES:
+            matrix = getattr(data, name)
+            new_matrix = self.convert(matrix)
+            if new_matrix is not matrix:
+                converted[name] = new_matrix
+        if not converted:
+            return data
+        view = copy.copy(data)
+        for name, matrix in converted.items():
+            setattr(view, name, matrix)
+        return view
+
+    def convert(self, matrix):
+        """
+        :param matrix: a dataset matrix
+        :return: the converted matrix, or ``matrix`` itself if this backend
+                 does not handle matrices of its type
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+
+class SparseBackend(BaseMatrixBackend):
+    """
+    Backend which uses dataset matrices as they are
+    """
+    def prepare(self, data):
+        return data
+
+    def convert(self, matrix):
+        return matrix
+
+
+class ThreadedBackend(BaseMatrixBackend):
+    """
+    Backend that computes products of sparse matrices and vectors in a pool of
+    threads. Each matrix is split into blocks of rows with roughly equal
+    numbers of non-zero entries, and the blocks are multiplied concurrently
+    (``scipy.sparse`` releases the GIL while multiplying).
+
+    Each block computes its rows exactly as a single product would, so results
+    are identical to those of :any:`SparseBackend`.
+    """
+    #: Default minimum number of non-zero entries in each block. Smaller
+    #: matrices are multiplied in fewer blocks, since threads only pay off
+    #: when there is enough work to share
+    DEFAULT_MIN_BLOCK_SIZE = 2 ** 15
+
+    def __init__(self, num_threads=None,
+                 min_block_size=DEFAULT_MIN_BLOCK_SIZE):
+        """
+        :param num_threads:    (optional) number of threads. Default is the
+                               number of CPUs
+        :param min_block_size: minimum number of non-zero entries in each
+                               block of rows
+        :raises ValueError: if ``num_threads`` or ``min_block_size`` is not
+                            positive
+        """
+        if num_threads is None:
+            num_threads = os.cpu_count() or 1
+        if num_threads < 1:
+            raise ValueError("Number of threads must be positive")
+        if min_block_size < 1:
+            raise ValueError("Minimum block size must be positive")
+        self.num_threads = num_threads
+        self.min_block_size = min_block_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        """
+        :return: the thread pool, which is created on first use and shared by
+                 all runs using this backend
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.num_threads,
+                    thread_name_prefix="ThreadedBackend"
+                )
+            return self._executor
+
+    def shutdown(self, wait=True):
+        """
+        Shut down the thread pool, if it has been created. A new pool is
+        created if the backend is used again
+
+        :param wait: if True, wait for pending products to finish
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def get_num_blocks(self, nnz):
+        """
+        :param nnz: number of non-zero entries in a matrix
+        :return: the number of blocks to split the matrix into
+        """
+        return int(max(1, min(self.num_threads, nnz // self.min_block_size)))
+
+    def convert(self, matrix):
+        if not scipy.sparse.issparse(matrix):
+            return matrix
+        return ThreadedMatrix(matrix, self)
+
+    def __getstate__(self):
+        # Thread pools cannot be pickled or copied; a new pool is created
+        # when needed
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class ThreadedMatrix:
+    """
+    Wrapper around a ``scipy.sparse`` CSR matrix used by
+    :any:`ThreadedBackend`. Products with vectors are computed in the
+    backend's thread pool; other operations (transposition, addition,
+    ``multiply()`` and products with other matrices) are performed by scipy,
+    and the results wrapped again.
+
+    The transpose is computed once as a CSR matrix and cached, so that
+    repeated products with the transpose (as performed in every iteration of
+    most algorithms) are split into row blocks in the same way.
+    """
+    # Make numpy defer to the operators defined here
+    __array_ufunc__ = None
+
+    def __init__(self, matrix, backend, transpose=None):
+        """
+        :param matrix:    ``scipy.sparse`` matrix
+        :param backend:   :any:`ThreadedBackend` object
+        :param transpose: (optional) :any:`ThreadedMatrix` for the transpose
+                          of ``matrix``, if already known
+        """
+        self.matrix = scipy.sparse.csr_matrix(matrix)
+        if not self.matrix.has_sorted_indices:
+            # Sort a copy, since the arrays may be shared with the dataset
+            self.matrix = self.matrix.sorted_indices()
+        self.backend = backend
+        self._transpose = transpose
+        self._blocks = None
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    @property
+    def dtype(self):
+        return self.matrix.dtype
+
+    def wrap(self, matrix):
+        return ThreadedMatrix(matrix, self.backend)
+
+    @property
+    def T(self):
+        if self._transpose is None:
+            self._transpose = ThreadedMatrix(
+                self.matrix.T.tocsr(), self.backend, transpose=self
+            )
+        return self._transpose
+
+    def multiply(self, other):
+        return self.wrap(self.matrix.multiply(other))
+
+    def toarray(self):
+        return self.matrix.toarray()
+
+    def __mul__(self, scalar):
+        if not np.isscalar(scalar):
+            return NotImplemented
+        return self.wrap(self.matrix * scalar)
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        if not isinstance(other, ThreadedMatrix):
+            return NotImplemented
+        return self.wrap(self.matrix + other.matrix)
+
+    def __matmul__(self, other):
+        if isinstance(other, ThreadedMatrix):
+            return self.wrap(self.matrix @ other.matrix)
+        return self.matvec(np.asarray(other))
+
+    def get_blocks(self):
+        if self._blocks is None:
+            num_blocks = self.backend.get_num_blocks(self.nnz)
+            self._blocks = get_row_blocks(self.matrix, num_blocks)
+        return self._blocks
+
+    def matvec(self, vec):
+        """
+        :param vec: 1D numpy array with one entry for each column
+        :return: the product of the matrix and ``vec``
+        """
+        if vec.shape != (self.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((self.shape[1],), vec.shape)
+            )
+        blocks = self.get_blocks()
+        if len(blocks) <= 1:
+            return self.matrix @ vec
+        result = np.empty(self.shape[0],
+                          dtype=np.result_type(self.dtype, vec.dtype))
+
+        def multiply_block(item):
+            start, end, block = item
+            result[start:end] = block @ vec
+
+        # Consume the iterator to wait for all blocks (and raise any errors)
+        list(self.backend.get_executor().map(multiply_block, blocks))
+        return result
+
+
+class DenseMatrix:
+    """
+    Wrapper around a dense numpy array used by :any:`DenseBackend`, supporting
+    the same operations as ``scipy.sparse`` matrices do in the algorithms.
+
+    When created from a ``scipy.sparse`` matrix, the dense array is only built
+    when the matrix is first used, so that matrices an algorithm never uses
+    are not converted.
+    """
+    # Make numpy defer to the operators defined here
+    __array_ufunc__ = None
+
+    def __init__(self, matrix):
+        """
+        :param matrix: 2D numpy array, or ``scipy.sparse`` matrix to convert
+                       on first use
+        """
+        if scipy.sparse.issparse(matrix):
+            self._sparse = matrix
+            self._array = None
+        else:
+            self._sparse = None
+            self._array = matrix
+
+    @property
+    def array(self):
+        """
+        The dense numpy array of floats
+        """
+        if self._array is None:
+            self._array = self._sparse.toarray().astype(float, copy=False)
+            self._sparse = None
+        return self._array
+
+    def is_converted(self):
+        """
+        :return: True if the dense array has been built
+        """
+        return self._array is not None
+
+    @property
+    def shape(self):
+        if self._array is None:
+            return self._sparse.shape
+        return self._array.shape
+
+    @property
+    def dtype(self):
+        if self._array is None:
+            return np.dtype(float)
+        return self._array.dtype
+
+    @property
+    def nnz(self):
+        if self._array is None:
+            return self._sparse.nnz
+        return np.count_nonzero(self._array)
+
+    @property
+    def T(self):
+        return DenseMatrix(self.array.T)
+
+    def multiply(self, other):
+        # As for sparse matrices, zero entries stay zero even when multiplied
+        # by infinity or NaN
+        with np.errstate(invalid="ignore"):
+            product = self.array * np.asarray(other)
+        return DenseMatrix(np.where(self.array != 0, product, 0))
+
+    def toarray(self):
+        return self.array
+
+    def __mul__(self, scalar):
+        if not np.isscalar(scalar):
+            return NotImplemented
+        return DenseMatrix(self.array * scalar)
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        if not isinstance(other, DenseMatrix):
+            return NotImplemented
+        return DenseMatrix(self.array + other.array)
+
+    def __matmul__(self, other):
+        if isinstance(other, DenseMatrix):
+            return DenseMatrix(self.array @ other.array)
+        vec = np.asarray(other)
+        if vec.shape != (self.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((self.shape[1],), vec.shape)
+            )
+        return self.array @ vec
+
+
+class DenseBackend(BaseMatrixBackend):
+    """
+    Backend that converts sparse matrices to dense numpy arrays of floats, so
+    that products with vectors are computed by BLAS. For small or dense
+    datasets this avoids the overhead of sparse formats; results are the same
+    as for :any:`SparseBackend` up to floating point rounding.
+
+    Matrices are converted the first time an algorithm uses them, and the
+    converted dataset is cached while the original dataset is alive, so that
+    repeated runs on one dataset convert each matrix once. Note that memory
+    use for the claim-claim matrices ``mut_ex`` and ``imp`` is quadratic in
+    the number of claims.
+    """
+    def __init__(self):
+        self._views = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def prepare(self, data):
+        matrices = tuple(getattr(data, name) for name in MATRIX_ATTRIBUTES)
+        with self._lock:
+            cached = self._views.get(data)
+        # Rebuild the view if the dataset's matrices have been replaced
+        if cached is not None and all(
+                old is new for old, new in zip(cached[0], matrices)):
+            return cached[1]
+        view = super().prepare(data)
+        if view is not data:
+            with self._lock:
+                self._views[data] = (matrices, view)
+        return view
+
+    def convert(self, matrix):
+        if not scipy.sparse.issparse(matrix):
+            return matrix
+        return DenseMatrix(matrix)
+
+    def __getstate__(self):
+        # Converted datasets and locks are not copied
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+class AutoBackend(BaseMatrixBackend):
+    """
+    The default backend, which chooses between :any:`DenseBackend` and another
+    backend for each dataset, according to the size and density of its
+    matrices.
+
+    The dense backend is used when the total number of entries in the dense
+    ``sc``, ``mut_ex`` and ``imp`` matrices is at most ``small_size``, or at
+    most ``max_size`` when the density of ``sc`` is at least ``min_density``.
+    """
+    #: Default dense size below which the dense backend is always used
+    DEFAULT_SMALL_SIZE = 2 ** 16
+    #: Default dense size above which the dense backend is never used
+    DEFAULT_MAX_SIZE = 2 ** 17
+    #: Default minimum density of ``sc`` for the dense backend to be used for
+    #: datasets larger than ``small_size``
+    DEFAULT_MIN_DENSITY = 0.1
+
+    def __init__(self, small_size=DEFAULT_SMALL_SIZE,
+                 max_size=DEFAULT_MAX_SIZE, min_density=DEFAULT_MIN_DENSITY,
+                 fallback=None):
+        """
+        :param small_size:  see above
+        :param max_size:    see above
+        :param min_density: see above
+        :param fallback:    (optional) backend used when the dense backend is
+                            not chosen. Default is :any:`SparseBackend`
+        """
+        self.small_size = small_size
+        self.max_size = max_size
+        self.min_density = min_density
+        self.dense = DenseBackend()
+        self.fallback = fallback or SparseBackend()
+
+    def use_dense(self, data):
+        """
+        :param data: :any:`Dataset` object
+        :return: True if the dense backend should be used for ``data``
+        """
+        if not all(scipy.sparse.issparse(getattr(data, name))
+                   for name in MATRIX_ATTRIBUTES):
+            return False
+        sc_size = data.num_sources * data.num_claims
+        dense_size = sc_size + 2 * data.num_claims ** 2
+        return self.is_dense_size(dense_size, data.sc.nnz / sc_size)
+
+    def is_dense_size(self, dense_size, density):
+        """
+        :param dense_size: total number of entries in the dense matrices
+        :param density:    proportion of non-zero entries in the source-claim
+                           matrix (or the matrix itself when converting a
+                           single matrix)
+        :return: True if the dense backend should be used
+        """
+        if dense_size <= self.small_size:
+            return True
+        return dense_size <= self.max_size and density >= self.min_density
+
+    def prepare(self, data):
+        if self.use_dense(data):
+            return self.dense.prepare(data)
+        return self.fallback.prepare(data)
+
+    def convert(self, matrix):
+        """
+        Convert a single matrix, choosing the backend by the size and density
+        of ``matrix`` alone. Algorithms convert whole datasets with
+        :meth:`prepare`, which takes all the dataset's matrices into account
+        """
+        if not scipy.sparse.issparse(matrix):
+            return matrix
+        size = matrix.shape[0] * matrix.shape[1]
+        density = matrix.nnz / size if size else 0
+        if self.is_dense_size(size, density):
+            return self.dense.convert(matrix)
+        return self.fallback.convert(matrix)
@@ -4,8 +4,11 @@ import time
 
 import numpy as np
 
+from truthdiscovery.algorithm.backends import AutoBackend
+from truthdiscovery.algorithm.hooks import IterationState
 from truthdiscovery.exceptions import EmptyDatasetError
-from truthdiscovery.output import Result
+from truthdiscovery.output import Result, Snapshot
+from truthdiscovery.utils import tracing
 from truthdiscovery.utils.iterator import FixedIterator
 
 
@@ -55,6 +58,68 @@ class BaseAlgorithm:
         return set(yield_names(cls))
 
 
+class RunContext:
+    """
+    State for a single run of an iterative algorithm. A new context is created
+    for each run, so that one algorithm object can be used for several runs at
+    once (e.g. from a thread pool) without runs interfering with each other
+    """
+    def __init__(self, data, iterator):
+        """
+        :param data:     :any:`Dataset` object the algorithm is run on
+        :param iterator: :any:`Iterator` object private to this run
+        """
+        self.data = data
+        self.iterator = iterator
+        self.start_time = time.time()
+
+    def get_time_taken(self):
+        """
+        :return: seconds elapsed since the run started
+        """
+        return time.time() - self.start_time
+
+    def checkpoint(self, phase):
+        """
+        Mark the end of a phase of computation (e.g. sparse matrix-vector
+        products, normalisation). Algorithms call this throughout each
+        iteration; it does nothing unless the run is being profiled (see
+        :any:`ProfiledRunContext`)
+
+        :param phase: name of the phase that has just finished
+        """
+
+    def pop_timings(self):
+        """
+        :return: a dict mapping phase names to nanoseconds spent in each phase
+                 since the last call, or None if the run is not being profiled
+        """
+        return None
+
+
+class ProfiledRunContext(RunContext):
+    """
+    Run context that records time spent in each phase, for use when hooks are
+    registered with an algorithm
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+        self.last_checkpoint = time.perf_counter_ns()
+
+    def checkpoint(self, phase):
+        now = time.perf_counter_ns()
+        self.timings[phase] = (
+            self.timings.get(phase, 0) + now - self.last_checkpoint
+        )
+        self.last_checkpoint = now
+
+    def pop_timings(self):
+        timings = self.timings
+        self.timings = {}
+        return timings
+
+
 class BaseIterativeAlgorithm(BaseAlgorithm):
     """
     Base class for functionality common to algorithms that iteratively compute
@@ -62,18 +127,43 @@ class BaseIterativeAlgorithm(BaseAlgorithm):
     """
     iterator = None
     priors = PriorBelief.FIXED
-    results_log = None
+    backend = AutoBackend()
+    hooks = ()
 
-    def __init__(self, iterator=None, priors=None):
+    def __init__(self, iterator=None, priors=None, backend=None):
         """
         :param iterator: :any:`Iterator` object to control when iteration stops
                          (optional)
         :param priors:   value from :any:`PriorBelief` enumeration to specify
                          which prior belief values are used (optional)
+        :param backend:  :any:`BaseMatrixBackend` object used for products of
+                         dataset matrices and vectors (optional). Default is
+                         :any:`AutoBackend`
         """
         self.iterator = iterator or self.get_default_iterator()
         if priors is not None:
             self.priors = priors
+        if backend is not None:
+            self.backend = backend
+
+    def add_hook(self, hook):
+        """
+        Register a hook to be notified as the algorithm runs. When no hooks are
+        registered no profiling information is collected at all.
+
+        :param hook: an :any:`AlgorithmHook` object
+        """
+        self.hooks = tuple(self.hooks) + (hook,)
+
+    def remove_hook(self, hook):
+        """
+        Unregister a hook previously registered with :meth:`add_hook`
+
+        :raises ValueError: if the hook is not registered
+        """
+        hooks = list(self.hooks)
+        hooks.remove(hook)
+        self.hooks = tuple(hooks)
 
     def get_default_iterator(self):
         """
@@ -96,7 +186,9 @@ class BaseIterativeAlgorithm(BaseAlgorithm):
             return np.full((data.num_claims,), 0.5)
 
         if self.priors == PriorBelief.VOTED:
-            source_counts = data.sc.T @ np.ones((data.num_sources,))
+            source_counts = data.get_claim_totals(
+                np.ones((data.num_sources,))
+            )
             return source_counts / (data.mut_ex @ source_counts)
 
         if self.priors == PriorBelief.UNIFORM:
@@ -106,54 +198,147 @@ class BaseIterativeAlgorithm(BaseAlgorithm):
             "Invalid prior belief type: '{}'".format(self.priors)
         )
 
+    def get_context(self, data):
+        """
+        Create the state for a new run of the algorithm. The iterator is copied
+        so that ``self.iterator`` is never modified by a run, and is given the
+        dataset's source weights (if any)
+
+        :param data: :any:`Dataset` object
+        :return: a :any:`RunContext` object
+        """
+        ctx_cls = ProfiledRunContext if self.hooks else RunContext
+        iterator = self.iterator.copy()
+        # Iterators compare trust vectors, so distances must account for
+        # weighted sources
+        iterator.weights = data.source_weights
+        return ctx_cls(data, iterator)
+
     def run(self, data):
         super().run(data)
-        self.iterator.reset()
-        self.start_time = time.time()
-        self.results_log = None
-        trust, belief = self._run(data)
-        end_time = time.time()
-        return Result(
+        ctx = self.get_context(data)
+        with tracing.span("{}.run".format(self.__class__.__name__)):
+            for trust, belief in self._iterate(data, ctx):
+                pass
+        result = Result(
             trust=data.get_source_trust_dict(trust),
             belief=data.get_belief_dict(belief),
-            time_taken=end_time - self.start_time,
-            iterations=self.iterator.it_count
+            time_taken=ctx.get_time_taken(),
+            iterations=ctx.iterator.it_count,
+            history=ctx.iterator.get_history()
         )
+        if self.hooks:
+            ctx.checkpoint("result")
+            self._notify_finish(ctx, trust, belief)
+        return result
 
-    def run_iter(self, data):
+    def run_iter(self, data, every=1, as_results=False):
         """
-        Return a generator of partial :any:`Result` objects as the algorithm
-        iterates
+        Return a generator of partial results as the algorithm iterates.
+        Results are yielded as soon as each iteration completes, and are not
+        stored, so memory use does not grow with the number of iterations.
+
+        The initial scores (iteration 0) and the final scores are always
+        included.
+
+        :param data:       input data as a :any:`Dataset` object
+        :param every:      only yield results for every ``every``-th
+                           iteration (default: every iteration)
+        :param as_results: if True, yield :any:`Result` objects instead of
+                           :any:`Snapshot` objects
+        :raises ValueError: if ``every`` is less than 1
         """
+        if every < 1:
+            raise ValueError("'every' must be at least 1")
         super().run(data)
-        self.iterator.reset()
-        self.start_time = time.time()
-        self.results_log = []
-        _t, _b = self._run(data)
-        yield from self.results_log
+        ctx = self.get_context(data)
+        snapshot = None
+        yielded = False
+        for trust, belief in self._iterate(data, ctx):
+            snapshot = Snapshot(
+                trust=trust,
+                belief=belief,
+                time_taken=ctx.get_time_taken(),
+                iterations=ctx.iterator.it_count
+            )
+            yielded = snapshot.iterations % every == 0
+            if yielded:
+                yield snapshot.to_result(data) if as_results else snapshot
 
-    def _run(self, data):
+        # Make sure final scores are included even if the final iteration
+        # number is not a multiple of `every`
+        if not yielded:
+            yield snapshot.to_result(data) if as_results else snapshot
+        if self.hooks:
+            ctx.checkpoint("output")
+            self._notify_finish(ctx, snapshot.trust, snapshot.belief)
+
+    def _iterate(self, data, ctx):
         """
-        Internal method for running the algorithm, to avoid including
-        boilerplate code in each subclass
+        Wrap :meth:`_run` to perform book-keeping common to all algorithms
+        after each iteration: recording belief changes in the iterator history,
+        notifying hooks, and recording trace spans
 
-        :param data: :any:`Dataset` object
-        :return: a tuple ``(trust, belief)``, where ``trust`` is a numpy
-                 array of source trusts, and ``belief`` is a numpy array of
-                 claim beliefs, both ordered as in the input data
+        :yield: tuples ``(trust, belief)`` as for :meth:`_run`
         """
-        raise NotImplementedError("Must be implemented in child classes")
+        hooks = self.hooks
+        record_beliefs = ctx.iterator.history is not None
+        tracer = tracing.get_tracer()
+        # Hooks are given the dataset as passed in; only _run sees the
+        # matrices converted by the backend
+        run_data = self.backend.prepare(data)
+        if not hooks and not record_beliefs and tracer is None:
+            yield from self._run(run_data, ctx)
+            return
 
-    def log(self, data, trust, belief):
+        for hook in hooks:
+            hook.on_start(self, data)
+        prev_belief = None
+        span_name = "{}.iteration".format(self.__class__.__name__)
+        step_start = tracer.now() if tracer else None
+        for trust, belief in self._run(run_data, ctx):
+            if tracer is not None:
+                # Iteration 0 covers the setup of the initial scores
+                tracer.add_span(
+                    span_name, step_start, tracer.now(),
+                    args={"iteration": ctx.iterator.it_count}
+                )
+            if record_beliefs and prev_belief is not None:
+                ctx.iterator.record_belief_change(belief, prev_belief)
+            prev_belief = belief
+            yield trust, belief
+            if hooks:
+                # Time spent by the consumer of the generator (e.g. converting
+                # scores to results) is counted as 'output'
+                ctx.checkpoint("output")
+                state = IterationState(
+                    ctx.iterator.it_count, trust, belief, ctx.pop_timings()
+                )
+                for hook in hooks:
+                    hook.on_iteration(state)
+            if tracer is not None:
+                step_start = tracer.now()
+
+    def _notify_finish(self, ctx, trust, belief):
         """
-        If logging is enabled, append the given trust and belief scores to the
-        log
+        Call ``on_finish`` for all registered hooks
         """
-        if self.results_log is not None:
-            res = Result(
-                trust=data.get_source_trust_dict(trust),
-                belief=data.get_belief_dict(belief),
-                time_taken=time.time() - self.start_time,
-                iterations=self.iterator.it_count
-            )
-            self.results_log.append(res)
+        state = IterationState(
+            ctx.iterator.it_count, trust, belief, ctx.pop_timings()
+        )
+        for hook in self.hooks:
+            hook.on_finish(state)
+
+    def _run(self, data, ctx):
+        """
+        Internal method for running the algorithm, to avoid including
+        boilerplate code in each subclass. This must be a generator that yields
+        the initial scores, and the scores after each iteration.
+
+        :param data: :any:`Dataset` object
+        :param ctx:  :any:`RunContext` object holding the iterator for this run
+        :yield: tuples ``(trust, belief)``, where ``trust`` is a numpy array of
+                source trusts, and ``belief`` is a numpy array of claim
+                beliefs, both ordered as in the input data
+        """
+        raise NotImplementedError("Must be implemented in child classes")
@@ -0,0 +1,121 @@
+import threading
+import time
+
+
+class IterationState:
+    """
+    Information passed to hooks after each iteration of an algorithm
+    """
+    def __init__(self, iteration, trust, belief, timings):
+        """
+        :param iteration: number of iterations completed (0 for the initial
+                          scores)
+        :param trust:     numpy array of source trust scores
+        :param belief:    numpy array of claim belief scores
+        :param timings:   dict mapping phase names to nanoseconds spent in
+                          that phase since the previous state
+        """
+        self.iteration = iteration
+        self.trust = trust
+        self.belief = belief
+        self.timings = timings
+
+
+class AlgorithmHook:
+    """
+    Base class for hooks, which can be registered with an iterative algorithm
+    with :meth:`~truthdiscovery.algorithm.base.BaseIterativeAlgorithm.add_hook`
+    to be notified as the algorithm runs. All methods do nothing by default.
+    """
+    def on_start(self, algorithm, data):
+        """
+        Called at the start of a run
+
+        :param algorithm: the :any:`BaseIterativeAlgorithm` being run
+        :param data:      the :any:`Dataset` it is being run on
+        """
+
+    def on_iteration(self, state):
+        """
+        Called after each iteration (including once for the initial scores)
+
+        :param state: an :any:`IterationState` object
+        """
+
+    def on_finish(self, state):
+        """
+        Called at the end of a run
+
+        :param state: an :any:`IterationState` object with the final scores.
+                      ``timings`` contains the time taken to produce the output
+                      after the final iteration
+        """
+
+
+class ProfilerHook(AlgorithmHook):
+    """
+    Hook that records the time spent in each phase of computation (e.g.
+    'spmv', 'normalise', 'compare') at each iteration, and aggregates them
+    across iterations and runs
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Discard all timings recorded so far
+        """
+        with self.lock:
+            #: list of timings dicts, one for each iteration seen
+            self.iteration_timings = []
+            #: dict mapping phase to total nanoseconds
+            self.totals = {}
+            #: dict mapping phase to the number of times it was recorded
+            self.counts = {}
+            #: number of complete runs seen
+            self.runs = 0
+            #: total wall-clock nanoseconds spent in complete runs
+            self.total_run_ns = 0
+            self._start_times = {}
+
+    def on_start(self, algorithm, data):
+        with self.lock:
+            self._start_times[threading.get_ident()] = time.perf_counter_ns()
+
+    def on_iteration(self, state):
+        with self.lock:
+            self.iteration_timings.append(state.timings)
+            self._add(state.timings)
+
+    def on_finish(self, state):
+        end = time.perf_counter_ns()
+        with self.lock:
+            self._add(state.timings)
+            self.runs += 1
+            start = self._start_times.pop(threading.get_ident(), None)
+            if start is not None:
+                self.total_run_ns += end - start
+
+    def _add(self, timings):
+        for phase, duration in timings.items():
+            self.totals[phase] = self.totals.get(phase, 0) + duration
+            self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def get_summary(self):
+        """
+        :return: a dict mapping phase names to dicts with keys ``total_ns``,
+                 ``count``, ``mean_ns`` and ``fraction`` (the fraction of the
+                 time recorded across all phases)
+        """
+        with self.lock:
+            grand_total = sum(self.totals.values())
+            return {
+                phase: {
+                    "total_ns": total,
+                    "count": self.counts[phase],
+                    "mean_ns": total / self.counts[phase],
+                    "fraction": total / grand_total if grand_total else 0
+                }
+                for phase, total in self.totals.items()
+            }
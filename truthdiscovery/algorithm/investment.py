@@ -23,14 +23,14 @@ class Investment(BaseIterativeAlgorithm):
             self.g = g
         super().__init__(*args, **kwargs)
 
-    def update_trust(self, old_trust, claim_counts, sc_mat, belief):
+    def update_trust(self, old_trust, claim_counts, data, belief):
         """
         :return: an updated trust vector
         """
         # The amount each source has to invest in its claims
         investment_amounts = old_trust / claim_counts
         # The amount each claim receives in investment from its sources
-        claim_investments = sc_mat.T @ investment_amounts
+        claim_investments = data.get_claim_totals(investment_amounts)
         if np.any(claim_investments == 0):
             raise EarlyFinishError(
                 "Investment in at least one claim has become zero"
@@ -42,29 +42,31 @@ class Investment(BaseIterativeAlgorithm):
 
         # (Note: using '/' here will result in a dense numpy array: we use
         # multiply() to get a sparse result instead)
-        mat = sc_mat.multiply(1 / claim_investments)
+        mat = data.sc.multiply(1 / claim_investments)
         return investment_amounts * (mat @ belief)
 
-    def _run(self, data):
+    def _run(self, data, ctx):
         claim_counts = data.sc @ np.ones((data.num_claims,))
         trust = np.ones((data.num_sources,))
         belief = self.get_prior_beliefs(data)
-        self.log(data, trust, belief)
+        ctx.checkpoint("setup")
+        yield trust, belief
 
-        while not self.iterator.finished():
+        while not ctx.iterator.finished():
             try:
                 new_trust = self.update_trust(
-                    trust, claim_counts, data.sc, belief
+                    trust, claim_counts, data, belief
                 )
             except EarlyFinishError:
                 break
-            belief = (data.sc.T @ (new_trust / claim_counts)) ** self.g
+            belief = data.get_claim_totals(new_trust / claim_counts) ** self.g
+            ctx.checkpoint("spmv")
 
             new_trust = new_trust / max(new_trust)
             belief = belief / max(belief)
+            ctx.checkpoint("normalise")
 
-            self.iterator.compare(new_trust, trust)
+            ctx.iterator.compare(new_trust, trust)
+            ctx.checkpoint("compare")
             trust = new_trust
-            self.log(data, trust, belief)
-
-        return trust, belief
+            yield trust, belief
@@ -21,31 +21,33 @@ class PooledInvestment(Investment):
         """
         return FixedIterator(10)
 
-    def _run(self, data):
+    def _run(self, data, ctx):
         claim_counts = data.sc @ np.ones((data.num_claims,))
         trust = np.ones((data.num_sources,))
         belief = self.get_prior_beliefs(data)
-        self.log(data, trust, belief)
+        ctx.checkpoint("setup")
+        yield trust, belief
 
-        while not self.iterator.finished():
+        while not ctx.iterator.finished():
             # Trust update is the same as for Investment
             try:
                 new_trust = self.update_trust(
-                    trust, claim_counts, data.sc, belief
+                    trust, claim_counts, data, belief
                 )
             except EarlyFinishError:  # pragma: no cover
                 break
             # 'Invest' trust in claims, grow with non-linear function, and
             # update belief
-            base_returns = data.sc.T @ (new_trust / claim_counts)
+            base_returns = data.get_claim_totals(new_trust / claim_counts)
             returns = base_returns ** self.g
             belief = base_returns * (returns / (data.mut_ex @ returns))
+            ctx.checkpoint("spmv")
 
             new_trust = new_trust / max(new_trust)
             belief = belief / max(belief)
+            ctx.checkpoint("normalise")
 
-            self.iterator.compare(new_trust, trust)
+            ctx.iterator.compare(new_trust, trust)
+            ctx.checkpoint("compare")
             trust = new_trust
-            self.log(data, trust, belief)
-
-        return trust, belief
+            yield trust, belief
@@ -10,22 +10,24 @@ class Sums(BaseIterativeAlgorithm):
     Described by Kleinberg for web pages, and adapted to truth discovery by
     Pasternack and Roth
     """
-    def _run(self, data):
+    def _run(self, data, ctx):
         trust = np.zeros((data.num_sources,))
         belief = self.get_prior_beliefs(data)
-        self.log(data, trust, belief)
+        ctx.checkpoint("setup")
+        yield trust, belief
 
-        while not self.iterator.finished():
+        while not ctx.iterator.finished():
             new_trust = data.sc @ belief
-            belief = data.sc.T @ new_trust
+            belief = data.get_claim_totals(new_trust)
+            ctx.checkpoint("spmv")
 
             # Trust and belief are normalised so that the largest entries in
             # each are 1; otherwise trust and belief scores grow without bound
             new_trust = new_trust / max(new_trust)
             belief = belief / max(belief)
+            ctx.checkpoint("normalise")
 
-            self.iterator.compare(trust, new_trust)
+            ctx.iterator.compare(trust, new_trust)
+            ctx.checkpoint("compare")
             trust = new_trust
-            self.log(data, trust, belief)
-
-        return trust, belief
+            yield trust, belief
@@ -55,7 +55,7 @@ class TruthFinder(BaseIterativeAlgorithm):
             )
         return -np.log(1 - trust)
 
-    def _run(self, data):
+    def _run(self, data, ctx):
         trust = np.zeros((data.num_sources,))
 
         claim_counts = data.sc @ np.ones((data.num_claims),)
@@ -65,17 +65,20 @@ class TruthFinder(BaseIterativeAlgorithm):
 
         trust = np.full((data.num_sources,), self.initial_trust)
         belief = np.zeros((data.num_claims,))
-        self.log(data, trust, belief)
+        ctx.checkpoint("setup")
+        yield trust, belief
 
-        while not self.iterator.finished():
+        while not ctx.iterator.finished():
             try:
-                log_belief = b_mat @ self.get_log_trust(trust)
+                log_belief = b_mat @ data.apply_source_weights(
+                    self.get_log_trust(trust)
+                )
             except EarlyFinishError:
                 break
             belief = 1 / (1 + np.exp(-self.dampening_factor * log_belief))
             new_trust = a_mat @ belief
-            self.iterator.compare(new_trust, trust)
+            ctx.checkpoint("spmv")
+            ctx.iterator.compare(new_trust, trust)
+            ctx.checkpoint("compare")
             trust = new_trust
-            self.log(data, trust, belief)
-
-        return trust, belief
+            yield trust, belief
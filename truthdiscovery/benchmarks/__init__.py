@@ -0,0 +1,45 @@
+from truthdiscovery.benchmarks.base import (
+    BaseBenchmark,
+    BenchmarkRunner,
+    compare_reports,
+    Comparison,
+    generate_synthetic_data,
+    get_environment,
+    get_thread_settings,
+    load_report,
+    make_key,
+    save_report,
+    summarise,
+    SyntheticBenchmark
+)
+from truthdiscovery.benchmarks.dense import (
+    DenseBenchmark,
+    find_crossover,
+    get_max_difference
+)
+from truthdiscovery.benchmarks.implications import (
+    get_agreement,
+    ImplicationBenchmark
+)
+from truthdiscovery.benchmarks.memory import (
+    measure_memory,
+    MemoryBenchmark
+)
+from truthdiscovery.benchmarks.pareto import (
+    cheapest_configuration,
+    pareto_frontier,
+    ParetoBenchmark
+)
+from truthdiscovery.benchmarks.scaling import (
+    default_worker_counts,
+    ScalingBenchmark,
+    split_components
+)
+from truthdiscovery.benchmarks.timing import TimingBenchmark
+
+#: Benchmark classes, keyed by name
+BENCHMARKS = {
+    cls.name: cls
+    for cls in (DenseBenchmark, ImplicationBenchmark, MemoryBenchmark,
+                ParetoBenchmark, ScalingBenchmark, TimingBenchmark)
+}
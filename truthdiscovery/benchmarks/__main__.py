@@ -0,0 +1,407 @@
+"""
+Run truthdiscovery benchmarks and compare the results against a baseline
+"""
+import argparse
+import sys
+
+from truthdiscovery.algorithm import ThreadedBackend
+from truthdiscovery.benchmarks import (
+    BENCHMARKS,
+    BenchmarkRunner,
+    compare_reports,
+    DenseBenchmark,
+    ImplicationBenchmark,
+    load_report,
+    MemoryBenchmark,
+    ParetoBenchmark,
+    save_report,
+    ScalingBenchmark,
+    TimingBenchmark
+)
+from truthdiscovery.benchmarks.base import ALGORITHMS
+from truthdiscovery.benchmarks.pareto import (
+    cheapest_configuration,
+    DEFAULT_ITERATORS
+)
+from truthdiscovery.benchmarks.scaling import EXECUTORS
+
+
+def size_type(size_str):
+    """
+    Parse a dataset size in the form '<num_sources>x<num_variables>'
+    """
+    try:
+        num_sources, num_vars = map(int, size_str.split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "invalid size '{}': must be in the form '<sources>x<variables>'"
+            .format(size_str)
+        )
+    return (num_sources, num_vars)
+
+
+def algorithm_type(label):
+    if label not in ALGORITHMS:
+        raise argparse.ArgumentTypeError(
+            "invalid algorithm '{}': choose from {}"
+            .format(label, ", ".join(sorted(ALGORITHMS)))
+        )
+    return label
+
+
+def get_parser():
+    """
+    :return: argparse ArgumentParser object
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m truthdiscovery.benchmarks",
+        description=__doc__
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    # Options common to all benchmarks
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--repeat",
+        help="Number of timed repetitions of each measurement",
+        type=int,
+        default=5
+    )
+    common.add_argument(
+        "--warmup",
+        help="Number of untimed repetitions before each measurement",
+        type=int,
+        default=1
+    )
+    common.add_argument(
+        "-o", "--outfile",
+        help="Path to save JSON report to (default: stdout)",
+        type=argparse.FileType("w"),
+        default=sys.stdout
+    )
+    common.add_argument(
+        "--baseline",
+        help="JSON report to compare results against",
+        type=argparse.FileType("r")
+    )
+    common.add_argument(
+        "--threshold",
+        help=("Maximum allowed relative increase over the baseline before a "
+              "measurement is reported as a regression (default: 0.1)"),
+        type=float,
+        default=0.1
+    )
+    common.add_argument(
+        "--seed",
+        help="Seed for synthetic data generation",
+        type=int,
+        default=0
+    )
+    common.add_argument(
+        "-a", "--algorithms",
+        help="Algorithms to benchmark (default: all)",
+        metavar="ALGORITHM",
+        nargs="+",
+        type=algorithm_type
+    )
+
+    # Options for benchmarks on synthetic data
+    synthetic = argparse.ArgumentParser(add_help=False)
+    synthetic.add_argument(
+        "--sizes",
+        help="Dataset sizes in the form '<num_sources>x<num_variables>'",
+        metavar="SIZE",
+        nargs="+",
+        type=size_type,
+        default=[(50, 50), (100, 100), (200, 200)]
+    )
+    synthetic.add_argument(
+        "--claim-probs",
+        help="Claim probabilities, which control the sparsity of datasets",
+        dest="claim_probs",
+        metavar="PROB",
+        nargs="+",
+        type=float,
+        default=[0.1, 0.5]
+    )
+
+    subparsers.add_parser(
+        TimingBenchmark.name,
+        parents=[common, synthetic],
+        help="Time each stage of the workflow on synthetic datasets",
+        description=TimingBenchmark.__doc__
+    )
+    subparsers.add_parser(
+        MemoryBenchmark.name,
+        parents=[common, synthetic],
+        help=("Measure peak and retained memory for each stage of the "
+              "workflow on synthetic datasets"),
+        description=MemoryBenchmark.__doc__
+    )
+    pareto_parser = subparsers.add_parser(
+        ParetoBenchmark.name,
+        parents=[common, synthetic],
+        help=("Find the accuracy/run time Pareto frontier of algorithm and "
+              "iterator configurations"),
+        description=ParetoBenchmark.__doc__
+    )
+    pareto_parser.add_argument(
+        "--iterators",
+        help=("Iterator specifications, in the format used for the 'iterator' "
+              "parameter of the command-line client (default: {})"
+              .format(" ".join(DEFAULT_ITERATORS))),
+        metavar="ITERATOR",
+        nargs="+",
+        default=DEFAULT_ITERATORS
+    )
+    pareto_parser.add_argument(
+        "--trials",
+        help="Number of datasets to generate for each size",
+        type=int,
+        default=3
+    )
+    pareto_parser.add_argument(
+        "--target-accuracy",
+        help=("Print the fastest configuration with at least this accuracy "
+              "for each dataset size"),
+        dest="target_accuracy",
+        type=float
+    )
+    imp_parser = subparsers.add_parser(
+        ImplicationBenchmark.name,
+        parents=[common, synthetic],
+        help=("Measure the effect of sparsified implications on size, run "
+              "time and accuracy"),
+        description=ImplicationBenchmark.__doc__
+    )
+    imp_parser.add_argument(
+        "--top-k",
+        help="Numbers of implications to keep per claim (default: 1 5 20)",
+        dest="top_ks",
+        metavar="K",
+        nargs="+",
+        type=int,
+        default=[1, 5, 20]
+    )
+    imp_parser.add_argument(
+        "--imp-thresholds",
+        help="Minimum implication magnitudes to keep (default: 0.5 0.9)",
+        dest="imp_thresholds",
+        metavar="T",
+        nargs="+",
+        type=float,
+        default=[0.5, 0.9]
+    )
+    imp_parser.add_argument(
+        "--sigma",
+        help="Width of the Gaussian implication function (default: 5)",
+        type=float,
+        default=5
+    )
+    imp_parser.add_argument(
+        "--domain-size",
+        help="Number of possible values for each variable (default: 100)",
+        dest="domain_size",
+        type=int,
+        default=100
+    )
+    subparsers.add_parser(
+        DenseBenchmark.name,
+        parents=[common, synthetic],
+        help=("Compare sparse and dense matrix backends to find the size at "
+              "which dense matrices stop paying off"),
+        description=DenseBenchmark.__doc__
+    )
+    scaling_parser = subparsers.add_parser(
+        ScalingBenchmark.name,
+        parents=[common],
+        help=("Measure speedup and efficiency of parallel execution paths for "
+              "increasing numbers of workers"),
+        description=ScalingBenchmark.__doc__
+    )
+    scaling_parser.add_argument(
+        "--workers",
+        help=("Numbers of workers to use (default: powers of two up to the "
+              "number of CPUs)"),
+        dest="worker_counts",
+        metavar="N",
+        nargs="+",
+        type=int
+    )
+    scaling_parser.add_argument(
+        "--component-size",
+        help=("Size of each component of the dataset in the form "
+              "'<num_sources>x<num_variables>'"),
+        dest="component_size",
+        type=size_type,
+        default=(100, 100)
+    )
+    scaling_parser.add_argument(
+        "--num-components",
+        help="Number of components in the dataset",
+        dest="num_components",
+        type=int,
+        default=8
+    )
+    scaling_parser.add_argument(
+        "--claim-prob",
+        help="Claim probability within each component",
+        dest="claim_probability",
+        type=float,
+        default=0.2
+    )
+    scaling_parser.add_argument(
+        "--batch-size",
+        help="Number of simultaneous runs in batch mode",
+        dest="batch_size",
+        type=int,
+        default=8
+    )
+    scaling_parser.add_argument(
+        "--executor",
+        help="Type of worker pool for components and batch modes",
+        choices=sorted(EXECUTORS),
+        default="thread"
+    )
+    scaling_parser.add_argument(
+        "--min-block-size",
+        help=("Minimum number of non-zero entries in each row block in "
+              "backend mode (default: {})"
+              .format(ThreadedBackend.DEFAULT_MIN_BLOCK_SIZE)),
+        dest="min_block_size",
+        type=int,
+        default=ThreadedBackend.DEFAULT_MIN_BLOCK_SIZE
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare",
+        help="Compare a saved report against a baseline",
+        description="Compare a saved report against a baseline"
+    )
+    compare_parser.add_argument(
+        "report",
+        help="JSON report",
+        type=argparse.FileType("r")
+    )
+    compare_parser.add_argument(
+        "baseline",
+        help="Baseline JSON report",
+        type=argparse.FileType("r")
+    )
+    compare_parser.add_argument(
+        "--threshold",
+        help="Maximum allowed relative increase (default: 0.1)",
+        type=float,
+        default=0.1
+    )
+    compare_parser.add_argument(
+        "--metric",
+        help=("Statistic to compare (default: 'median' for timing, "
+              "'peak_bytes' for memory)")
+    )
+    return parser
+
+
+def get_benchmark(args):
+    """
+    :return: a :any:`BaseBenchmark` object for the parsed command-line
+             arguments
+    """
+    runner = BenchmarkRunner(repeat=args.repeat, warmup=args.warmup)
+    algorithms = None
+    if args.algorithms:
+        algorithms = {label: ALGORITHMS[label]() for label in args.algorithms}
+    kwargs = {"algorithms": algorithms, "seed": args.seed, "runner": runner}
+    if args.command == ScalingBenchmark.name:
+        kwargs.update(
+            worker_counts=args.worker_counts,
+            component_size=args.component_size,
+            num_components=args.num_components,
+            claim_probability=args.claim_probability,
+            batch_size=args.batch_size,
+            executor=args.executor,
+            min_block_size=args.min_block_size
+        )
+    else:
+        kwargs.update(
+            sizes=args.sizes, claim_probabilities=args.claim_probs
+        )
+        if args.command == ParetoBenchmark.name:
+            kwargs.update(iterators=args.iterators, trials=args.trials)
+        elif args.command == ImplicationBenchmark.name:
+            kwargs.update(
+                top_ks=args.top_ks, thresholds=args.imp_thresholds,
+                sigma=args.sigma, domain_size=args.domain_size
+            )
+    return BENCHMARKS[args.command](**kwargs)
+
+
+def report_comparisons(report, baseline, threshold, metric=None):
+    """
+    Print a comparison of a report against a baseline to stderr
+
+    :param metric: statistic to compare. If not given, the default for the
+                   report's benchmark is used
+    :return: True if any measurement has regressed
+    """
+    if metric is None:
+        metric = BENCHMARKS[report["benchmark"]].metric
+    comparisons = compare_reports(
+        report, baseline, threshold=threshold, metric=metric
+    )
+    for comp in comparisons:
+        print(comp, file=sys.stderr)
+    return any(comp.regressed for comp in comparisons)
+
+
+def report_cheapest(report, target_accuracy):
+    """
+    Print the fastest configuration that meets an accuracy target for each
+    dataset in a Pareto benchmark report to stderr
+    """
+    for case in report["frontiers"]:
+        res = cheapest_configuration(case["frontier"], target_accuracy)
+        desc = ", ".join(
+            "{}={}".format(*item) for item in sorted(case["params"].items())
+        )
+        if res is None:
+            print("{}: no configuration achieves accuracy {}"
+                  .format(desc, target_accuracy), file=sys.stderr)
+        else:
+            print("{}: {} with iterator {} (accuracy {:.3f}, {:.4g} seconds)"
+                  .format(desc, res["algorithm"], res["iterator"],
+                          res["accuracy"], res["time"]),
+                  file=sys.stderr)
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        regressed = report_comparisons(
+            load_report(args.report), load_report(args.baseline),
+            args.threshold, metric=args.metric
+        )
+    elif args.command is not None:
+        try:
+            benchmark = get_benchmark(args)
+        except ValueError as ex:
+            parser.error(str(ex))
+        report = benchmark.run()
+        save_report(report, args.outfile)
+        if getattr(args, "target_accuracy", None) is not None:
+            report_cheapest(report, args.target_accuracy)
+        regressed = False
+        if args.baseline:
+            regressed = report_comparisons(
+                report, load_report(args.baseline), args.threshold
+            )
+    else:
+        parser.print_help()
+        return 0
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
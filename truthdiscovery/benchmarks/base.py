@@ -0,0 +1,379 @@
+"""
+Common functionality for benchmarks: repeated measurements, environment
+metadata, and saving, loading and comparing JSON reports
+"""
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import time
+
+import numpy as np
+import scipy
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+from truthdiscovery.client.base import BaseClient
+from truthdiscovery.input import SyntheticData
+
+#: Algorithm classes to benchmark, keyed by the labels used by the clients
+ALGORITHMS = BaseClient.ALG_LABEL_MAPPING
+
+
+#: Environment variables that control the number of threads used by BLAS and
+#: OpenMP libraries
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS"
+)
+
+
+def get_thread_settings():
+    """
+    :return: a dict of BLAS/OpenMP thread settings: the values of the
+             environment variables in :any:`THREAD_ENV_VARS`, and the
+             libraries loaded and their number of threads if the optional
+             ``threadpoolctl`` package is installed
+    """
+    settings = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    if threadpoolctl is not None:  # pragma: no cover
+        settings["threadpools"] = [
+            {key: info.get(key) for key in
+             ("user_api", "internal_api", "version", "num_threads")}
+            for info in threadpoolctl.threadpool_info()
+        ]
+    return settings
+
+
+def get_environment():
+    """
+    :return: a dict of information about the machine and software versions,
+             to be stored alongside benchmark results so that results from
+             different runs can be interpreted
+    """
+    return {
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "thread_settings": get_thread_settings()
+    }
+
+
+def summarise(samples):
+    """
+    :param samples: a non-empty list of measurements
+    :return: a dict of summary statistics for the measurements
+    """
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.mean(samples),
+        "median": statistics.median(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": len(samples)
+    }
+
+
+def make_key(stage, **params):
+    """
+    Construct a string that identifies a benchmark measurement, used to match
+    measurements between reports
+
+    :param stage:  name of the stage being measured (e.g. ``run``)
+    :param params: parameters of the measurement (e.g. dataset size)
+    """
+    parts = [stage]
+    parts += ["{}={}".format(key, params[key]) for key in sorted(params)]
+    return "/".join(parts)
+
+
+class BenchmarkRunner:
+    """
+    Time a function by calling it several times, after a number of untimed
+    warm-up calls
+    """
+    def __init__(self, repeat=5, warmup=1, timer=time.perf_counter):
+        """
+        :param repeat: number of timed calls
+        :param warmup: number of untimed calls to make first
+        :param timer:  function returning the current time in seconds
+        :raises ValueError: if ``repeat`` is less than 1 or ``warmup`` is
+                            negative
+        """
+        if repeat < 1:
+            raise ValueError("'repeat' must be at least 1")
+        if warmup < 0:
+            raise ValueError("'warmup' must be non-negative")
+        self.repeat = repeat
+        self.warmup = warmup
+        self.timer = timer
+
+    def measure(self, func, setup=None):
+        """
+        :param func:  function to time
+        :param setup: (optional) function to call (untimed) before each call to
+                      ``func``. Its return value is passed as the argument to
+                      ``func``
+        :return: a dict of summary statistics of the time taken in seconds (see
+                 :func:`summarise`)
+        """
+        for _ in range(self.warmup):
+            self._call(func, setup)
+        samples = [self._call(func, setup) for _ in range(self.repeat)]
+        return summarise(samples)
+
+    def _call(self, func, setup):
+        if setup is not None:
+            arg = setup()
+            start = self.timer()
+            func(arg)
+        else:
+            start = self.timer()
+            func()
+        return self.timer() - start
+
+
+class BaseBenchmark:
+    """
+    Base class for a benchmark scenario. Sub-classes must implement
+    :meth:`get_config` and :meth:`iter_results`
+    """
+    #: name of the benchmark, stored in reports
+    name = None
+    #: statistic compared against baselines by default
+    metric = "median"
+
+    def __init__(self, runner=None):
+        """
+        :param runner: :any:`BenchmarkRunner` object used to take measurements
+        """
+        self.runner = runner or BenchmarkRunner()
+
+    def get_config(self):
+        """
+        :return: a JSON-serialisable dict of the parameters of the benchmark
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    def iter_results(self):
+        """
+        Perform the benchmark
+
+        :yield: dicts with keys ``key`` (see :func:`make_key`), ``stage``,
+                ``params`` and ``stats``
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    def make_result(self, stage, params, stats, **extra):
+        """
+        :return: a result dict in the format required for
+                 :meth:`iter_results`. Extra keyword arguments are included in
+                 the dict
+        """
+        result = {
+            "key": make_key(stage, **params),
+            "stage": stage,
+            "params": params,
+            "stats": stats
+        }
+        result.update(extra)
+        return result
+
+    def run(self):
+        """
+        Perform the benchmark
+
+        :return: a report dict, which may be saved with :func:`save_report`
+        """
+        return {
+            "benchmark": self.name,
+            "environment": get_environment(),
+            "config": self.get_config(),
+            "repeat": self.runner.repeat,
+            "warmup": self.runner.warmup,
+            "results": list(self.iter_results())
+        }
+
+
+def generate_synthetic_data(num_sources, num_variables, claim_probability,
+                            domain_size=4, seed=0):
+    """
+    Generate a :any:`SyntheticData` object with uniformly random source trust
+    values, seeding numpy's random number generator first so that datasets are
+    the same between runs
+    """
+    np.random.seed(seed)
+    trust = np.random.uniform(size=(num_sources,))
+    return SyntheticData(
+        trust,
+        num_variables=num_variables,
+        claim_probability=claim_probability,
+        domain_size=domain_size
+    )
+
+
+class SyntheticBenchmark(BaseBenchmark):
+    """
+    Base class for benchmarks performed on synthetic datasets for each
+    combination of dataset size and claim probability. Sub-classes must
+    implement :meth:`benchmark_dataset`
+    """
+    def __init__(self, sizes=((50, 50), (100, 100), (200, 200)),
+                 claim_probabilities=(0.1, 0.5), algorithms=None,
+                 domain_size=4, max_render_nodes=300, seed=0, **kwargs):
+        """
+        :param sizes:               iterable of
+                                    ``(num_sources, num_variables)``
+        :param claim_probabilities: iterable of claim probabilities, which
+                                    control the sparsity of the datasets
+        :param algorithms:          (optional) dict mapping labels to algorithm
+                                    objects. Default is all algorithms with
+                                    default parameters
+        :param domain_size:         number of possible values for each variable
+        :param max_render_nodes:    rendering is only benchmarked for datasets
+                                    with at most this many sources, variables
+                                    and claims in total
+        :param seed:                seed for synthetic data generation
+        :param kwargs:              passed to :any:`BaseBenchmark`
+        """
+        super().__init__(**kwargs)
+        self.sizes = [tuple(size) for size in sizes]
+        self.claim_probabilities = list(claim_probabilities)
+        if algorithms is None:
+            algorithms = {label: cls() for label, cls in ALGORITHMS.items()}
+        self.algorithms = algorithms
+        self.domain_size = domain_size
+        self.max_render_nodes = max_render_nodes
+        self.seed = seed
+
+    def get_config(self):
+        return {
+            "sizes": self.sizes,
+            "claim_probabilities": self.claim_probabilities,
+            "algorithms": sorted(self.algorithms),
+            "domain_size": self.domain_size,
+            "max_render_nodes": self.max_render_nodes,
+            "seed": self.seed
+        }
+
+    def iter_results(self):
+        cases = itertools.product(self.sizes, self.claim_probabilities)
+        for (num_sources, num_vars), claim_prob in cases:
+            synth = generate_synthetic_data(
+                num_sources, num_vars, claim_prob,
+                domain_size=self.domain_size, seed=self.seed
+            )
+            yield from self.benchmark_dataset(synth, {
+                "num_sources": num_sources,
+                "num_variables": num_vars,
+                "claim_probability": claim_prob
+            })
+
+    def should_render(self, data):
+        """
+        :return: True if rendering should be benchmarked for a dataset
+        """
+        num_nodes = data.num_sources + data.num_variables + data.num_claims
+        return num_nodes <= self.max_render_nodes
+
+    def benchmark_dataset(self, synth, params):
+        """
+        :param synth:  a :any:`SyntheticData` object
+        :param params: dict of parameters describing the dataset
+        :yield: result dicts for each stage
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+
+def save_report(report, fileobj):
+    """
+    Write a benchmark report as JSON to a file object
+    """
+    json.dump(report, fileobj, indent=2, default=str)
+
+
+def load_report(fileobj):
+    """
+    Load a report saved with :func:`save_report`
+    """
+    return json.load(fileobj)
+
+
+class Comparison:
+    """
+    Comparison of a single measurement between a report and a baseline
+    """
+    def __init__(self, key, baseline, current, threshold):
+        """
+        :param key:       key of the measurement
+        :param baseline:  value in the baseline report
+        :param current:   value in the current report
+        :param threshold: maximum allowed relative increase before the
+                          measurement is considered a regression
+        """
+        self.key = key
+        self.baseline = baseline
+        self.current = current
+        self.threshold = threshold
+
+    @property
+    def ratio(self):
+        if self.baseline == 0:
+            return float("inf") if self.current > 0 else 1.0
+        return self.current / self.baseline
+
+    @property
+    def regressed(self):
+        return self.ratio > 1 + self.threshold
+
+    def __str__(self):
+        return "{}{}: {:.4g} -> {:.4g} ({:+.1%})".format(
+            "REGRESSION " if self.regressed else "",
+            self.key, self.baseline, self.current, self.ratio - 1
+        )
+
+
+def compare_reports(report, baseline, threshold=0.1, metric="median",
+                    thresholds=None):
+    """
+    Compare measurements in a report against a baseline report. Lower values
+    are taken to be better. Measurements that are only present in one of the
+    reports are ignored.
+
+    :param report:     the current report
+    :param baseline:   the baseline report
+    :param threshold:  maximum allowed relative increase (e.g. 0.1 for 10%)
+    :param metric:     statistic to compare (key in each result's ``stats``)
+    :param thresholds: (optional) dict mapping stage names to thresholds, to
+                       override ``threshold`` for particular stages
+    :return: a list of :any:`Comparison` objects
+    """
+    thresholds = thresholds or {}
+    baseline_values = {
+        res["key"]: res["stats"][metric] for res in baseline["results"]
+        if metric in res["stats"]
+    }
+    comparisons = []
+    for res in report["results"]:
+        if res["key"] not in baseline_values or metric not in res["stats"]:
+            continue
+        comparisons.append(Comparison(
+            res["key"], baseline_values[res["key"]], res["stats"][metric],
+            thresholds.get(res["stage"], threshold)
+        ))
+    return comparisons
@@ -0,0 +1,133 @@
+"""
+Benchmark the dense execution path against sparse matrices, to find the
+dataset size at which dense products stop paying off
+"""
+import copy
+import itertools
+
+from truthdiscovery.algorithm import AutoBackend, DenseBackend, SparseBackend
+from truthdiscovery.benchmarks.base import SyntheticBenchmark
+
+
+def get_max_difference(results, reference):
+    """
+    :param results:   a :any:`Result` object
+    :param reference: a :any:`Result` object for the same dataset
+    :return: the largest absolute difference between trust or belief scores in
+             ``results`` and ``reference``
+    """
+    diffs = [abs(results.trust[source] - trust)
+             for source, trust in reference.trust.items()]
+    for var, beliefs in reference.belief.items():
+        diffs += [abs(results.belief[var][val] - belief)
+                  for val, belief in beliefs.items()]
+    return float(max(diffs, default=0))
+
+
+def find_crossover(results):
+    """
+    :param results: list of result dicts for the dense backend for one
+                    algorithm, including ``dense_size`` and ``speedup``
+    :return: the smallest dense size for which the dense backend is slower
+             than the sparse backend, or None if the dense backend is always
+             faster
+    """
+    slower = [res["dense_size"] for res in results if res["speedup"] < 1]
+    return min(slower, default=None)
+
+
+class DenseBenchmark(SyntheticBenchmark):
+    """
+    For each dataset size and claim probability, run each algorithm with
+    :any:`SparseBackend` and :any:`DenseBackend`. Results for the dense backend
+    record the density of the source-claim matrix, the number of entries in
+    the dense matrices (``dense_size``), the ratio of sparse to dense median
+    run time (``speedup``), the largest difference from sparse results
+    (``max_difference``) and the backend :any:`AutoBackend` chooses for the
+    dataset (``auto``).
+
+    The report includes the *crossover* dense size for each algorithm and
+    claim probability: the smallest dense size at which the dense backend is
+    slower.
+    """
+    name = "dense"
+
+    def __init__(self, sizes=((10, 10), (50, 50), (100, 100), (200, 200)),
+                 auto_backend=None, **kwargs):
+        """
+        :param sizes:        iterable of ``(num_sources, num_variables)``
+        :param auto_backend: (optional) :any:`AutoBackend` object whose choice
+                             is recorded. Default uses default thresholds
+        :param kwargs:       passed to :any:`SyntheticBenchmark`
+        """
+        super().__init__(sizes=sizes, **kwargs)
+        self.auto_backend = auto_backend or AutoBackend()
+
+    def get_config(self):
+        config = super().get_config()
+        del config["max_render_nodes"]
+        config["small_size"] = self.auto_backend.small_size
+        config["max_size"] = self.auto_backend.max_size
+        config["min_density"] = self.auto_backend.min_density
+        return config
+
+    def benchmark_dataset(self, synth, params):
+        """
+        :param synth:  a :any:`SyntheticData` object
+        :param params: dict of parameters describing the dataset
+        :yield: result dicts for running each algorithm with each backend
+        """
+        data = synth.data
+        sc_size = data.num_sources * data.num_claims
+        extra = {
+            "num_claims": data.num_claims,
+            "density": data.sc.nnz / sc_size,
+            "dense_size": sc_size + 2 * data.num_claims ** 2,
+            "auto": ("dense" if self.auto_backend.use_dense(data)
+                     else "sparse")
+        }
+        for alg_label, alg in sorted(self.algorithms.items()):
+            sparse = copy.copy(alg)
+            sparse.backend = SparseBackend()
+            dense = copy.copy(alg)
+            dense.backend = DenseBackend()
+            sparse_stats = self.runner.measure(lambda: sparse.run(data))
+            yield self.make_result(
+                "run", dict(params, algorithm=alg_label, backend="sparse"),
+                sparse_stats, **extra
+            )
+            dense_stats = self.runner.measure(lambda: dense.run(data))
+            yield self.make_result(
+                "run", dict(params, algorithm=alg_label, backend="dense"),
+                dense_stats,
+                speedup=sparse_stats["median"] / dense_stats["median"],
+                max_difference=get_max_difference(
+                    dense.run(data), sparse.run(data)
+                ),
+                **extra
+            )
+
+    def get_crossovers(self, results):
+        """
+        :param results: list of result dicts
+        :return: a list of dicts giving the crossover dense size for each
+                 algorithm and claim probability (see :func:`find_crossover`)
+        """
+        def case(res):
+            return (res["params"]["algorithm"],
+                    res["params"]["claim_probability"])
+
+        dense = [res for res in results if res["params"]["backend"] == "dense"]
+        return [
+            {"algorithm": alg_label,
+             "claim_probability": claim_prob,
+             "crossover": find_crossover(list(case_results))}
+            for (alg_label, claim_prob), case_results in itertools.groupby(
+                sorted(dense, key=case), key=case
+            )
+        ]
+
+    def run(self):
+        report = super().run()
+        report["crossovers"] = self.get_crossovers(report["results"])
+        return report
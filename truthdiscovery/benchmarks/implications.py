@@ -0,0 +1,124 @@
+"""
+Benchmark the effect of sparsifying implication matrices on dataset
+construction, run time and accuracy for datasets with many distinct values per
+variable
+"""
+from truthdiscovery.algorithm import TruthFinder
+from truthdiscovery.benchmarks.base import SyntheticBenchmark
+from truthdiscovery.experiments import seeded_accuracy
+from truthdiscovery.input import (
+    GaussianImplication,
+    MatrixDataset,
+    SparseImplication
+)
+
+
+def get_agreement(results, reference):
+    """
+    :param results:   a :any:`Result` object
+    :param reference: a :any:`Result` object for the same dataset
+    :return: the fraction of variables for which the sets of most believed
+             values are the same in ``results`` and ``reference``
+    """
+    variables = list(reference.belief)
+    if not variables:
+        return None
+    same = sum(
+        set(results.get_most_believed_values(var))
+        == set(reference.get_most_believed_values(var))
+        for var in variables
+    )
+    return same / len(variables)
+
+
+class ImplicationBenchmark(SyntheticBenchmark):
+    """
+    For each dataset size and claim probability, build datasets with dense
+    Gaussian implications between values, and with implications sparsified
+    by :any:`SparseImplication` for each ``top_k`` and ``threshold``. The
+    number of non-zero entries in the implication matrix (``imp_nnz``) and in
+    the implied source-claim matrix ``imp.T @ sc.T`` used by TruthFinder
+    (``influence_nnz``) is recorded, along with build and run times, accuracy,
+    and the fraction of variables whose most believed values agree with those
+    obtained with dense implications (``agreement``).
+    """
+    name = "implications"
+
+    def __init__(self, top_ks=(1, 5, 20), thresholds=(0.5, 0.9), sigma=5,
+                 algorithms=None, domain_size=100, **kwargs):
+        """
+        :param top_ks:      iterable of values for ``top_k``
+        :param thresholds:  iterable of values for ``threshold``
+        :param sigma:       width of the :any:`GaussianImplication` used
+        :param algorithms:  (optional) dict mapping labels to algorithm
+                            objects. Default is TruthFinder only, since other
+                            algorithms ignore implications
+        :param domain_size: number of possible values for each variable
+        :param kwargs:      passed to :any:`SyntheticBenchmark`
+        """
+        if algorithms is None:
+            algorithms = {"truthfinder": TruthFinder()}
+        super().__init__(
+            algorithms=algorithms, domain_size=domain_size, **kwargs
+        )
+        self.top_ks = list(top_ks)
+        self.thresholds = list(thresholds)
+        self.sigma = sigma
+
+    def get_config(self):
+        config = super().get_config()
+        del config["max_render_nodes"]
+        config["top_ks"] = self.top_ks
+        config["thresholds"] = self.thresholds
+        config["sigma"] = self.sigma
+        return config
+
+    def get_implications(self):
+        """
+        :return: a list of ``(label, implication)`` pairs, starting with dense
+                 implications labelled ``dense``
+        """
+        dense = GaussianImplication(self.sigma)
+        imps = [("dense", dense)]
+        imps += [("top-{}".format(k), SparseImplication(dense, top_k=k))
+                 for k in self.top_ks]
+        imps += [("threshold-{}".format(t),
+                  SparseImplication(dense, threshold=t))
+                 for t in self.thresholds]
+        return imps
+
+    def benchmark_dataset(self, synth, params):
+        """
+        :param synth:  a :any:`SyntheticData` object
+        :param params: dict of parameters describing the dataset
+        :yield: result dicts for building the dataset and running each
+                algorithm with each implication
+        """
+        sv = synth.data.sv
+        reference = {}
+        for imp_label, imp in self.get_implications():
+            imp_params = dict(params, implication=imp_label)
+            data = MatrixDataset(sv, implication_function=imp)
+            extra = {
+                "num_claims": data.num_claims,
+                "imp_nnz": data.imp.nnz,
+                "influence_nnz": (data.imp.T @ data.sc.T).nnz
+            }
+            yield self.make_result(
+                "build", imp_params,
+                self.runner.measure(
+                    lambda: MatrixDataset(sv, implication_function=imp)
+                ),
+                **extra
+            )
+            for alg_label, alg in sorted(self.algorithms.items()):
+                results = alg.run(data)
+                reference.setdefault(alg_label, results)
+                yield self.make_result(
+                    "run", dict(imp_params, algorithm=alg_label),
+                    self.runner.measure(lambda: alg.run(data)),
+                    accuracy=seeded_accuracy(synth, results, self.seed),
+                    agreement=get_agreement(results, reference[alg_label]),
+                    iterations=results.iterations,
+                    **extra
+                )
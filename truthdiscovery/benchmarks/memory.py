@@ -0,0 +1,142 @@
+"""
+Benchmark the memory used by each stage of a truth discovery workflow on
+synthetic datasets of varying size and sparsity
+"""
+import gc
+from io import StringIO
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+from truthdiscovery.benchmarks.base import SyntheticBenchmark
+from truthdiscovery.graphs import JsonBackend, MatrixDatasetGraphRenderer
+from truthdiscovery.input import MatrixDataset
+
+
+def get_rss():
+    """
+    :return: the current resident set size of the process in bytes, or None if
+             this is not available on this platform
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):  # pragma: no cover
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_max_rss():
+    """
+    :return: the maximum resident set size of the process so far in bytes, or
+             None if this is not available on this platform
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, and kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def measure_memory(func):
+    """
+    Measure the memory allocated by calling a function, using ``tracemalloc``
+    for Python and numpy allocations, and the process RSS
+
+    :param func: function to call
+    :return: a tuple ``(value, stats)``, where ``value`` is the return value of
+             ``func`` and ``stats`` is a dict of measurements in bytes:
+             ``peak_bytes`` (maximum allocated during the call),
+             ``retained_bytes`` (still allocated after the call, i.e. mostly
+             the size of ``value``), ``rss_delta_bytes`` and ``max_rss_bytes``
+    """
+    gc.collect()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    else:  # pragma: no cover
+        tracemalloc.reset_peak()
+    rss_before = get_rss()
+    before, _ = tracemalloc.get_traced_memory()
+    try:
+        value = func()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    rss_after = get_rss()
+
+    stats = {
+        "peak_bytes": peak - before,
+        "retained_bytes": current - before,
+        "rss_delta_bytes": None,
+        "max_rss_bytes": get_max_rss()
+    }
+    if rss_before is not None and rss_after is not None:
+        stats["rss_delta_bytes"] = rss_after - rss_before
+    return value, stats
+
+
+class MemoryBenchmark(SyntheticBenchmark):
+    """
+    Measure peak and retained memory for dataset construction, each
+    algorithm's run, conversion of scores to results and rendering, for each
+    combination of dataset size and claim probability. Memory use per claim is
+    also reported, so that changes in footprint can be compared across dataset
+    sizes.
+
+    Each stage is measured once, since memory use does not vary between runs
+    in the same way as time (so the runner's ``repeat`` and ``warmup`` are not
+    used)
+    """
+    name = "memory"
+    metric = "peak_bytes"
+
+    def measure(self, func, num_claims):
+        """
+        Measure memory usage of a function call, and add per-claim values to
+        the stats
+
+        :return: tuple ``(value, stats)`` as for :func:`measure_memory`
+        """
+        value, stats = measure_memory(func)
+        for key in ("peak_bytes", "retained_bytes"):
+            stats["{}_per_claim".format(key)] = stats[key] / num_claims
+        return value, stats
+
+    def benchmark_dataset(self, synth, params):
+        sv = synth.data.sv
+        num_claims = synth.data.num_claims
+        extra = {"num_claims": num_claims}
+
+        data, stats = self.measure(lambda: MatrixDataset(sv), num_claims)
+        yield self.make_result("build", params, stats, **extra)
+
+        trust = np.random.uniform(size=(data.num_sources,))
+        belief = np.random.uniform(size=(data.num_claims,))
+        _, stats = self.measure(
+            lambda: (data.get_source_trust_dict(trust),
+                     data.get_belief_dict(belief)),
+            num_claims
+        )
+        yield self.make_result("convert", params, stats, **extra)
+
+        for label, alg in sorted(self.algorithms.items()):
+            alg_params = dict(params, algorithm=label)
+            _, stats = self.measure(lambda: alg.run(data), num_claims)
+            yield self.make_result("run", alg_params, stats, **extra)
+
+        if self.should_render(data):
+            renderer = MatrixDatasetGraphRenderer(backend=JsonBackend())
+            _, stats = self.measure(
+                lambda: renderer.render(data, StringIO()), num_claims
+            )
+            yield self.make_result("render", params, stats, **extra)
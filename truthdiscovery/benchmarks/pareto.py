@@ -0,0 +1,207 @@
+"""
+Benchmark accuracy against run time for combinations of algorithms and
+iterators, and find the Pareto frontier of configurations
+"""
+import copy
+import itertools
+import statistics
+
+from truthdiscovery.algorithm import BaseIterativeAlgorithm
+from truthdiscovery.benchmarks.base import (
+    generate_synthetic_data,
+    SyntheticBenchmark
+)
+from truthdiscovery.client.base import BaseClient
+from truthdiscovery.exceptions import ConvergenceError
+from truthdiscovery.experiments import seeded_accuracy
+
+#: Default iterator specifications, in the format used by the clients
+DEFAULT_ITERATORS = (
+    "fixed-1",
+    "fixed-5",
+    "fixed-20",
+    "fixed-100",
+    "l1-convergence-0.01-limit-500",
+    "l1-convergence-0.0001-limit-500",
+    "deadline-0.001",
+    "deadline-0.01"
+)
+
+
+def pareto_frontier(results):
+    """
+    Find the results for which no other result is both at least as fast and at
+    least as accurate (and strictly better in one of these)
+
+    :param results: iterable of result dicts with ``time`` and ``accuracy``
+                    keys
+    :return: a list of the Pareto-optimal results, ordered by time (and so by
+             accuracy)
+    """
+    frontier = []
+    best_accuracy = None
+    for res in sorted(results, key=lambda r: (r["time"], -r["accuracy"])):
+        if best_accuracy is None or res["accuracy"] > best_accuracy:
+            frontier.append(res)
+            best_accuracy = res["accuracy"]
+    return frontier
+
+
+def cheapest_configuration(frontier, target_accuracy):
+    """
+    :param frontier:        Pareto frontier as returned by
+                            :func:`pareto_frontier`
+    :param target_accuracy: minimum acceptable accuracy
+    :return: the fastest result in the frontier with accuracy at least
+             ``target_accuracy``, or None if there is no such result
+    """
+    for res in frontier:
+        if res["accuracy"] >= target_accuracy:
+            return res
+    return None
+
+
+class ParetoBenchmark(SyntheticBenchmark):
+    """
+    For each dataset size and claim probability, run every combination of
+    algorithm and iterator on several synthetic datasets and record mean
+    accuracy and median run time. The report includes the accuracy/time Pareto
+    frontier for each dataset size and claim probability.
+
+    Iterators only apply to iterative algorithms; other algorithms are run
+    once per dataset with iterator ``none``. Configurations that raise
+    :any:`ConvergenceError` are recorded with ``converged`` set to False, and
+    are excluded from the frontier.
+    """
+    name = "pareto"
+    #: upper limit on the number of iterations for iterator specifications
+    #: that do not give a limit
+    max_iterations = 10 ** 6
+
+    def __init__(self, iterators=DEFAULT_ITERATORS, trials=3, **kwargs):
+        """
+        :param iterators: iterable of iterator specifications, in the format
+                          used by the clients (e.g. ``fixed-20``,
+                          ``l1-convergence-0.01-limit-100``, ``deadline-0.1``)
+        :param trials:    number of synthetic datasets to generate for each
+                          size and claim probability
+        :param kwargs:    passed to :any:`SyntheticBenchmark`
+        :raises ValueError: if an iterator specification is invalid
+        """
+        super().__init__(**kwargs)
+        client = BaseClient()
+        self.iterators = {
+            spec: client.get_iterator(spec, max_limit=self.max_iterations)
+            for spec in iterators
+        }
+        self.trials = trials
+
+    def get_config(self):
+        config = super().get_config()
+        del config["max_render_nodes"]
+        config["iterators"] = sorted(self.iterators)
+        config["trials"] = self.trials
+        return config
+
+    def get_configurations(self):
+        """
+        :yield: tuples ``(alg_label, iterator_spec, alg_object)`` for each
+                configuration to benchmark
+        """
+        for label, alg in sorted(self.algorithms.items()):
+            if not isinstance(alg, BaseIterativeAlgorithm):
+                yield label, "none", alg
+                continue
+            for spec, iterator in sorted(self.iterators.items()):
+                alg_copy = copy.copy(alg)
+                alg_copy.iterator = iterator
+                yield label, spec, alg_copy
+
+    def iter_results(self):
+        cases = itertools.product(self.sizes, self.claim_probabilities)
+        for (num_sources, num_vars), claim_prob in cases:
+            datasets = [
+                generate_synthetic_data(
+                    num_sources, num_vars, claim_prob,
+                    domain_size=self.domain_size, seed=self.seed + trial
+                )
+                for trial in range(self.trials)
+            ]
+            params = {
+                "num_sources": num_sources,
+                "num_variables": num_vars,
+                "claim_probability": claim_prob
+            }
+            for label, spec, alg in self.get_configurations():
+                yield self.benchmark_configuration(
+                    alg, datasets, dict(params, algorithm=label, iterator=spec)
+                )
+
+    def benchmark_configuration(self, alg, datasets, params):
+        """
+        :param alg:      algorithm object
+        :param datasets: list of :any:`SyntheticData` objects
+        :param params:   dict of parameters describing the configuration
+        :return: a result dict
+        """
+        accuracies = []
+        times = []
+        iterations = []
+        for synth in datasets:
+            try:
+                results = alg.run(synth.data)
+            except ConvergenceError:
+                return self.make_result(
+                    "run", params, {}, converged=False, accuracy=None,
+                    time=None, iterations=None
+                )
+            accuracy = seeded_accuracy(synth, results, self.seed)
+            if accuracy is not None:
+                accuracies.append(accuracy)
+            iterations.append(results.iterations)
+            stats = self.runner.measure(lambda: alg.run(synth.data))
+            times.append(stats["median"])
+
+        stats = {"median": statistics.median(times), "times": times}
+        return self.make_result(
+            "run", params, stats, converged=True,
+            accuracy=statistics.mean(accuracies) if accuracies else None,
+            time=stats["median"],
+            iterations=(statistics.mean(iterations)
+                        if None not in iterations else None)
+        )
+
+    def get_frontiers(self, results):
+        """
+        :param results: list of result dicts
+        :return: a list of dicts with the dataset parameters and a summary of
+                 the results on the Pareto frontier for those parameters
+        """
+        dataset_params = ("num_sources", "num_variables", "claim_probability")
+
+        def case(res):
+            return tuple(res["params"][param] for param in dataset_params)
+
+        valid = [res for res in results
+                 if res["converged"] and res["accuracy"] is not None]
+        frontiers = []
+        for key, case_results in itertools.groupby(
+                sorted(valid, key=case), key=case):
+            frontier = pareto_frontier(case_results)
+            frontiers.append({
+                "params": dict(zip(dataset_params, key)),
+                "frontier": [
+                    {"key": res["key"],
+                     "algorithm": res["params"]["algorithm"],
+                     "iterator": res["params"]["iterator"],
+                     "time": res["time"],
+                     "accuracy": res["accuracy"]}
+                    for res in frontier
+                ]
+            })
+        return frontiers
+
+    def run(self):
+        report = super().run()
+        report["frontiers"] = self.get_frontiers(report["results"])
+        return report
@@ -0,0 +1,288 @@
+"""
+Benchmark how the run time of parallel execution paths scales with the number
+of workers
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
+import os
+
+import numpy as np
+import numpy.ma as ma
+from scipy.sparse.csgraph import connected_components
+import scipy.sparse
+
+from truthdiscovery.algorithm import ThreadedBackend
+from truthdiscovery.benchmarks.base import (
+    ALGORITHMS,
+    BaseBenchmark,
+    generate_synthetic_data
+)
+from truthdiscovery.input import MatrixDataset
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor
+}
+
+
+def default_worker_counts():
+    """
+    :return: a list of worker counts to benchmark: powers of two up to the
+             number of CPUs, and the number of CPUs itself
+    """
+    cpu_count = os.cpu_count() or 1
+    counts = []
+    workers = 1
+    while workers < cpu_count:
+        counts.append(workers)
+        workers *= 2
+    counts.append(cpu_count)
+    return counts
+
+
+def block_diagonal_sv(sv_blocks):
+    """
+    :param sv_blocks: list of source-variable masked arrays
+    :return: a masked array with the blocks along the diagonal, so that each
+             block forms a separate connected component
+    """
+    num_sources = sum(block.shape[0] for block in sv_blocks)
+    num_vars = sum(block.shape[1] for block in sv_blocks)
+    sv = ma.masked_all((num_sources, num_vars))
+    row = col = 0
+    for block in sv_blocks:
+        rows, cols = block.shape
+        sv[row:row + rows, col:col + cols] = block
+        row += rows
+        col += cols
+    return sv
+
+
+def split_components(sv):
+    """
+    Split a source-variables matrix into its connected components
+
+    :param sv: source-variables masked array
+    :return: a list of :any:`MatrixDataset` objects, one for each connected
+             component (ignoring sources and variables without any claims)
+    """
+    num_sources, num_vars = sv.shape
+    claims = scipy.sparse.csr_matrix(~ma.getmaskarray(sv))
+    # Bipartite graph with sources as the first nodes and variables after
+    adjacency = scipy.sparse.bmat([[None, claims], [claims.T, None]])
+    num_comps, labels = connected_components(adjacency, directed=False)
+    source_labels = labels[:num_sources]
+    var_labels = labels[num_sources:]
+    shards = []
+    for comp in range(num_comps):
+        sources = source_labels == comp
+        variables = var_labels == comp
+        if sources.any() and variables.any():
+            shards.append(MatrixDataset(sv[np.ix_(sources, variables)]))
+    return shards
+
+
+class ScalingBenchmark(BaseBenchmark):
+    """
+    Measure speedup and efficiency (speedup divided by the number of workers)
+    of parallel execution paths for increasing numbers of workers, on a
+    synthetic dataset made up of several independent components.
+
+    The following modes are benchmarked:
+
+    - ``components``: the dataset is split into its connected components, and
+      an algorithm is run on each component in parallel
+    - ``batch``: an algorithm is run on the whole dataset several times in
+      parallel (e.g. as for a server handling simultaneous requests); a single
+      algorithm object is shared between the runs
+    - ``spmv``: the sparse matrix-vector products performed in each iteration
+      of the algorithms, computed by the :any:`ThreadedMatrix` objects of a
+      :any:`ThreadedBackend` with one block of rows per thread
+    - ``backend``: an algorithm is run on the whole dataset once, using a
+      :any:`ThreadedBackend` with the given number of threads
+    """
+    name = "scaling"
+    modes = ("components", "batch", "spmv", "backend")
+
+    def __init__(self, worker_counts=None, component_size=(100, 100),
+                 num_components=8, claim_probability=0.2, algorithms=None,
+                 batch_size=8, executor="thread", spmv_products=20,
+                 min_block_size=ThreadedBackend.DEFAULT_MIN_BLOCK_SIZE,
+                 domain_size=4, seed=0, **kwargs):
+        """
+        :param worker_counts:     iterable of numbers of workers (default:
+                                  see :func:`default_worker_counts`). A single
+                                  worker is always included, since speedup is
+                                  measured relative to one worker
+        :param component_size:    ``(num_sources, num_variables)`` for each
+                                  component of the dataset
+        :param num_components:    number of components in the dataset
+        :param claim_probability: claim probability within each component
+        :param algorithms:        (optional) dict mapping labels to algorithm
+                                  objects. Default is all algorithms with
+                                  default parameters
+        :param batch_size:        number of runs in ``batch`` mode
+        :param executor:          ``thread`` or ``process``: type of pool used
+                                  in ``components`` and ``batch`` modes
+        :param spmv_products:     number of pairs of products (with the
+                                  source-claim matrix and its transpose) in
+                                  each measurement in ``spmv`` mode
+        :param min_block_size:    minimum number of non-zero entries in each
+                                  row block in ``backend`` mode (see
+                                  :any:`ThreadedBackend`)
+        :param domain_size:       number of possible values for each variable
+        :param seed:              seed for synthetic data generation
+        :param kwargs:            passed to :any:`BaseBenchmark`
+        :raises ValueError: if ``executor`` is invalid
+        """
+        super().__init__(**kwargs)
+        if executor not in EXECUTORS:
+            raise ValueError("Invalid executor '{}': choose from {}".format(
+                executor, ", ".join(sorted(EXECUTORS))
+            ))
+        worker_counts = worker_counts or default_worker_counts()
+        self.worker_counts = sorted(set(worker_counts) | {1})
+        self.component_size = tuple(component_size)
+        self.num_components = num_components
+        self.claim_probability = claim_probability
+        if algorithms is None:
+            algorithms = {label: cls() for label, cls in ALGORITHMS.items()}
+        self.algorithms = algorithms
+        self.batch_size = batch_size
+        self.executor = executor
+        self.spmv_products = spmv_products
+        self.min_block_size = min_block_size
+        self.domain_size = domain_size
+        self.seed = seed
+
+    def get_config(self):
+        return {
+            "worker_counts": self.worker_counts,
+            "component_size": self.component_size,
+            "num_components": self.num_components,
+            "claim_probability": self.claim_probability,
+            "algorithms": sorted(self.algorithms),
+            "batch_size": self.batch_size,
+            "executor": self.executor,
+            "spmv_products": self.spmv_products,
+            "min_block_size": self.min_block_size,
+            "domain_size": self.domain_size,
+            "seed": self.seed
+        }
+
+    def get_sv(self):
+        """
+        :return: source-variables matrix for the benchmark dataset
+        """
+        num_sources, num_vars = self.component_size
+        return block_diagonal_sv([
+            generate_synthetic_data(
+                num_sources, num_vars, self.claim_probability,
+                domain_size=self.domain_size, seed=self.seed + i
+            ).data.sv
+            for i in range(self.num_components)
+        ])
+
+    def iter_results(self):
+        sv = self.get_sv()
+        data = MatrixDataset(sv)
+        shards = split_components(sv)
+        extra = {"num_claims": data.num_claims, "num_shards": len(shards)}
+
+        for label, alg in sorted(self.algorithms.items()):
+            yield from self.scaling_results(
+                "components", {"algorithm": label},
+                lambda executor, _: list(executor.map(alg.run, shards)),
+                EXECUTORS[self.executor], extra
+            )
+            yield from self.scaling_results(
+                "batch", {"algorithm": label},
+                lambda executor, _: list(
+                    executor.map(alg.run, [data] * self.batch_size)
+                ),
+                EXECUTORS[self.executor], extra
+            )
+
+        # Convert the source-claim matrix for each number of threads up
+        # front, with one row block per thread whatever the matrix size
+        matrices = {}
+        for workers in self.worker_counts:
+            backend = ThreadedBackend(num_threads=workers, min_block_size=1)
+            sc = backend.convert(data.sc)
+            sc.get_blocks()
+            sc.T.get_blocks()
+            matrices[workers] = sc
+        trust = np.random.uniform(size=(data.num_sources,))
+
+        def spmv(_, workers):
+            sc = matrices[workers]
+            vec = trust
+            for _ in range(self.spmv_products):
+                belief = sc.T @ vec
+                vec = sc @ belief
+
+        yield from self.scaling_results(
+            "spmv", {}, spmv, None, extra,
+            cleanup=lambda workers: matrices[workers].backend.shutdown()
+        )
+
+        for label, alg in sorted(self.algorithms.items()):
+            if not hasattr(alg, "backend"):
+                continue
+            # One copy of the algorithm per thread count, so that each
+            # backend's thread pool is only created once
+            backend_algs = {}
+            for workers in self.worker_counts:
+                backend_alg = copy.copy(alg)
+                backend_alg.backend = ThreadedBackend(
+                    num_threads=workers, min_block_size=self.min_block_size
+                )
+                backend_algs[workers] = backend_alg
+            yield from self.scaling_results(
+                "backend", {"algorithm": label},
+                lambda _, workers: backend_algs[workers].run(data),
+                None, extra,
+                cleanup=lambda workers: (
+                    backend_algs[workers].backend.shutdown()
+                )
+            )
+
+    def scaling_results(self, mode, params, func, executor_cls, extra,
+                        cleanup=None):
+        """
+        Time a function for each number of workers, and compute speedup and
+        efficiency relative to a single worker
+
+        :param mode:         name of the mode being benchmarked
+        :param params:       dict of parameters for result keys
+        :param func:         function to time, which takes an executor object
+                             and the number of workers as arguments
+        :param executor_cls: executor class, or None if ``func`` manages its
+                             own threads (in which case ``func`` is passed
+                             None as the executor)
+        :param extra:        dict of extra information to add to results
+        :param cleanup:      (optional) function called with the number of
+                             workers once measurements for that number are
+                             finished
+        :yield: result dicts
+        """
+        base_time = None
+        for workers in self.worker_counts:
+            try:
+                if executor_cls is None:
+                    stats = self.runner.measure(lambda: func(None, workers))
+                else:
+                    with executor_cls(max_workers=workers) as executor:
+                        stats = self.runner.measure(
+                            lambda: func(executor, workers)
+                        )
+            finally:
+                if cleanup is not None:
+                    cleanup(workers)
+            if base_time is None:
+                base_time = stats["median"]
+            speedup = base_time / stats["median"]
+            yield self.make_result(
+                mode, dict(params, workers=workers), stats,
+                speedup=speedup, efficiency=speedup / workers, **extra
+            )
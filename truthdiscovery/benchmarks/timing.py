@@ -0,0 +1,68 @@
+"""
+Benchmark the time taken for each stage of a truth discovery workflow on
+synthetic datasets of varying size and sparsity
+"""
+from io import StringIO
+
+import numpy as np
+
+from truthdiscovery.benchmarks.base import SyntheticBenchmark
+from truthdiscovery.graphs import JsonBackend, MatrixDatasetGraphRenderer
+from truthdiscovery.input import MatrixDataset
+
+
+class TimingBenchmark(SyntheticBenchmark):
+    """
+    Time dataset construction, each algorithm's run, conversion of scores to
+    results, accuracy calculation and rendering, for each combination of
+    dataset size and claim probability
+    """
+    name = "timing"
+
+    def benchmark_dataset(self, synth, params):
+        """
+        :param synth:  a :any:`SyntheticData` object
+        :param params: dict of parameters describing the dataset
+        :yield: result dicts for each stage
+        """
+        sv = synth.data.sv
+        data = synth.data
+        extra = {"num_claims": data.num_claims}
+        yield self.make_result(
+            "build", params,
+            self.runner.measure(lambda: MatrixDataset(sv)), **extra
+        )
+
+        # Conversion to dicts does not depend on the actual scores
+        trust = np.random.uniform(size=(data.num_sources,))
+        belief = np.random.uniform(size=(data.num_claims,))
+        yield self.make_result(
+            "convert", params,
+            self.runner.measure(lambda: (data.get_source_trust_dict(trust),
+                                         data.get_belief_dict(belief))),
+            **extra
+        )
+
+        for label, alg in sorted(self.algorithms.items()):
+            alg_params = dict(params, algorithm=label)
+            results = alg.run(data)
+            yield self.make_result(
+                "run", alg_params,
+                self.runner.measure(lambda: alg.run(data)),
+                iterations=results.iterations, **extra
+            )
+            yield self.make_result(
+                "accuracy", alg_params,
+                self.runner.measure(lambda: synth.get_accuracy(results)),
+                accuracy=synth.get_accuracy(results), **extra
+            )
+
+        if self.should_render(data):
+            renderer = MatrixDatasetGraphRenderer(backend=JsonBackend())
+            yield self.make_result(
+                "render", params,
+                self.runner.measure(
+                    lambda: renderer.render(data, StringIO())
+                ),
+                **extra
+            )
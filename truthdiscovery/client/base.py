@@ -4,16 +4,21 @@ import re
 from bidict import bidict
 
 from truthdiscovery.algorithm import (
+    AutoBackend,
     AverageLog,
+    DenseBackend,
     Investment,
     MajorityVoting,
     PooledInvestment,
     PriorBelief,
+    SparseBackend,
     Sums,
+    ThreadedBackend,
     TruthFinder
 )
 from truthdiscovery.utils import (
     ConvergenceIterator,
+    DeadlineIterator,
     DistanceMeasures,
     filter_dict,
     FixedIterator
@@ -78,7 +83,8 @@ class BaseClient:
         # Map param name to a callable to convert string to correct type
         type_mapping = {
             "iterator": self.get_iterator,
-            "priors": PriorBelief
+            "priors": PriorBelief,
+            "backend": self.get_backend
         }
         type_convertor = type_mapping.get(param, float)
         return (param, type_convertor(value))
@@ -92,6 +98,9 @@ class BaseClient:
             r"(?P<measure>[^-]+)-convergence-(?P<threshold>[^-]+)"
             r"(-limit-(?P<limit>\d+))?$"  # optional limit
         )
+        deadline_regex = re.compile(
+            r"deadline-(?P<deadline>[^-]+)(-limit-(?P<limit>\d+))?$"
+        )
         fixed_match = fixed_regex.match(it_string)
         if fixed_match:
             limit = int(fixed_match.group("limit"))
@@ -121,10 +130,47 @@ class BaseClient:
                     )
             return ConvergenceIterator(measure, threshold, limit)
 
+        deadline_match = deadline_regex.match(it_string)
+        if deadline_match:
+            deadline = float(deadline_match.group("deadline"))
+            limit = max_limit
+            if deadline_match.group("limit") is not None:
+                limit = int(deadline_match.group("limit"))
+                if limit > max_limit:
+                    raise ValueError(
+                        "Upper iteration limit cannot exceed {}"
+                        .format(max_limit)
+                    )
+            return DeadlineIterator(deadline, limit)
+
         raise ValueError(
             "invalid iterator specification '{}'".format(it_string)
         )
 
+    def get_backend(self, backend_string):
+        """
+        Parse a :any:`BaseMatrixBackend` object from a string representation:
+        ``sparse``, ``dense``, ``auto`` for an :any:`AutoBackend` with default
+        thresholds, or ``threaded[-<N>]`` for a :any:`ThreadedBackend` with an
+        optional number of threads
+        """
+        if backend_string == "sparse":
+            return SparseBackend()
+        if backend_string == "dense":
+            return DenseBackend()
+        if backend_string == "auto":
+            return AutoBackend()
+        threaded_match = re.match(r"threaded(-(?P<threads>\d+))?$",
+                                  backend_string)
+        if threaded_match:
+            threads = threaded_match.group("threads")
+            return ThreadedBackend(
+                num_threads=int(threads) if threads is not None else None
+            )
+        raise ValueError(
+            "invalid backend specification '{}'".format(backend_string)
+        )
+
     def get_algorithm_object(self, alg_cls, param_dict):
         """
         Instantiate an algorithm object
@@ -11,6 +11,7 @@ from truthdiscovery.client.base import BaseClient, OutputFields
 from truthdiscovery.client.web import run_debug_server
 from truthdiscovery.input import MatrixDataset, SupervisedData, SyntheticData
 from truthdiscovery.graphs import MatrixDatasetGraphRenderer
+from truthdiscovery.utils import tracing
 
 
 def numpy_float_yaml_representer(dumper, val):
@@ -43,6 +44,13 @@ class CommandLineClient(BaseClient):
         :return: argparse ArgumentParser object
         """
         parser = argparse.ArgumentParser(description=__doc__)
+        parser.add_argument(
+            "--trace",
+            help=("Write a trace of the time spent in each stage to FILE, in "
+                  "Chrome trace-event JSON format"),
+            metavar="FILE",
+            type=argparse.FileType("w")
+        )
         subparsers = parser.add_subparsers(
             dest="command",
             metavar="COMMAND",
@@ -76,7 +84,12 @@ class CommandLineClient(BaseClient):
                 the format 'fixed-<N>' for fixed N iterations, or
                 '<measure>-convergence-<threshold>[-limit-<N>]' for convergence
                 in 'measure' within 'threshold', up to an optional maximum
-                number 'limit' iterations.
+                number 'limit' iterations, or 'deadline-<seconds>[-limit-<N>]'
+                to iterate until a time budget is used up. For 'backend', use
+                'auto' (the default) to choose between sparse and dense
+                matrices by dataset size, 'sparse', 'dense', or
+                'threaded[-<N>]' to compute matrix-vector products in N
+                threads.
             """),
             dest="alg_params",
             metavar="PARAM",
@@ -175,6 +188,11 @@ class CommandLineClient(BaseClient):
             metavar="DOMAIN_SIZE",
             type=int
         )
+        synth_parser.add_argument(
+            "-o", "--outfile",
+            help="Path to save output CSV to (default: standard output)",
+            type=argparse.FileType("w")
+        )
         # Graph generation sub-command
         graph_parser = subparsers.add_parser(
             "graph",
@@ -249,6 +267,18 @@ class CommandLineClient(BaseClient):
         parser = self.get_parser()
         args = parser.parse_args(cli_args)
 
+        if args.trace:
+            tracer = tracing.enable_tracing()
+            try:
+                self.run_command(args, parser)
+            finally:
+                tracing.disable_tracing()
+                tracer.write(args.trace)
+                args.trace.close()
+        else:
+            self.run_command(args, parser)
+
+    def run_command(self, args, parser):
         if args.command == "run":
             self.run_algorithm(args, parser)
         elif args.command == "synth":
@@ -281,7 +311,7 @@ class CommandLineClient(BaseClient):
             # not supervised
             if OutputFields.ACCURACY in args.output_fields:
                 parser.error("cannot calculate accuracy without --supervised")
-            dataset = MatrixDataset.from_csv(args.dataset)
+            dataset = MatrixDataset.from_csv(args.dataset, keep_sv=False)
 
         output_obj = {}
         for alg in alg_objs:
@@ -306,9 +336,10 @@ class CommandLineClient(BaseClient):
         }
         kwargs = {k: v for k, v in kwargs.items() if v is not None}
         try:
-            print(SyntheticData(**kwargs).to_csv())
+            synth = SyntheticData(**kwargs)
         except ValueError as ex:
             parser.error(ex)
+        synth.write_csv(args.outfile or sys.stdout)
 
     def get_graph_renderer(self, args):
         """
@@ -330,7 +361,7 @@ class CommandLineClient(BaseClient):
     def generate_graph(self, args, parser):
         try:
             renderer = self.get_graph_renderer(args)
-            dataset = MatrixDataset.from_csv(args.dataset)
+            dataset = MatrixDataset.from_csv(args.dataset, keep_sv=False)
         except ValueError as ex:  # pragma: no cover
             parser.error(ex)
         renderer.render(dataset, args.outfile)
@@ -14,7 +14,7 @@ from truthdiscovery.graphs import (
     MatrixDatasetGraphRenderer,
     ResultsGradientColourScheme
 )
-from truthdiscovery.utils import DistanceMeasures
+from truthdiscovery.utils import DistanceMeasures, tracing
 
 
 class route:
@@ -115,6 +115,7 @@ class WebClient(BaseClient):
         return render_template("index.html", data_json=json.dumps(static_data))
 
     @route("/run/", methods=["GET"])
+    @tracing.traced("WebClient.run")
     def run(self):
         """
         Run an algorithm on a user-supplied dataset. Required HTTP parameters:
@@ -141,7 +142,8 @@ class WebClient(BaseClient):
         params_str = request.args.get("parameters")
         try:
             all_params = self.get_param_dict(params_str)
-            dataset = MatrixDataset.from_csv(StringIO(matrix_csv))
+            dataset = MatrixDataset.from_csv(StringIO(matrix_csv),
+                                             keep_sv=False)
         except ValueError as ex:
             return jsonify(ok=False, error=str(ex)), 400
 
@@ -7,9 +7,7 @@ the distance between old and new trust vectors at each iteration.
 These distances are then plotted, so that the convergence (or otherwise) of
 each algorithm can be compared.
 """
-from io import StringIO
 from os import path
-import sys
 
 import matplotlib.pyplot as plt
 
@@ -47,26 +45,16 @@ def main(csv_file):
 
     # map algorithm names to list of distances over time
     distances = {}
-    iterator = ConvergenceIterator(MEASURE, 0, limit=100, debug=True)
+    iterator = ConvergenceIterator(MEASURE, 0, limit=100, record_history=True)
     for cls in ALGORITHMS:
         name = cls.__name__
         print("running {} using {} measure".format(name, MEASURE))
         alg = cls(iterator=iterator)
-        stdout = StringIO()
-        sys.stdout = stdout
         try:
-            _res = alg.run(sup.data)
-        except ConvergenceError:
-            pass
-        finally:
-            sys.stdout = sys.__stdout__
-
-        distances[name] = []
-        for line in stdout.getvalue().split("\n"):
-            if not line:
-                continue
-            _, dist = line.split(",")
-            distances[name].append(float(dist))
+            history = alg.run(sup.data).history
+        except ConvergenceError as ex:
+            history = ex.history
+        distances[name] = list(history["distance"])
 
     max_its = max(len(dists) for dists in distances.values())
     x = range(1, max_its + 1)
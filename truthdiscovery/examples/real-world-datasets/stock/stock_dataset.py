@@ -15,7 +15,20 @@ from truthdiscovery.algorithm import (
     Sums,
     TruthFinder
 )
-from truthdiscovery.input import FileDataset, FileSupervisedData
+from truthdiscovery.input import (
+    CanonicaliserChain,
+    FileDataset,
+    FileSupervisedData,
+    NumericCanonicaliser,
+    UnitCanonicaliser
+)
+
+#: Merge values that differ only in formatting, e.g. '1.50' and '1.5', or
+#: '1.2M' and '1,200,000'
+CANONICALISER = CanonicaliserChain(
+    UnitCanonicaliser({"K": 1e3, "M": 1e6, "B": 1e9}, ignore_chars=","),
+    NumericCanonicaliser(decimals=2)
+)
 
 
 class StockBase:
@@ -91,7 +104,7 @@ def main():
         data_path, truth_path = sys.argv[1:]
         print("loading data...")
         start = time.time()
-        dataset = StockDataset(data_path)
+        dataset = StockDataset(data_path, canonicaliser=CANONICALISER)
         end = time.time()
         print("  loaded in {:.3f} seconds".format(end - start))
 
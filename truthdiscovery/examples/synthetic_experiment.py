@@ -3,14 +3,15 @@ Script to run various experiments measuring the accuracy of algorithms on
 synthetic datasets, and graphing results
 """
 from collections import OrderedDict
-import itertools
 import json
+import os
 import sys
+import tempfile
 
 import numpy as np
 import matplotlib.pyplot as plt
 
-from truthdiscovery.input import SyntheticData
+from truthdiscovery import experiments
 from truthdiscovery.algorithm import (
     AverageLog,
     Investment,
@@ -39,45 +40,23 @@ class Experiment:
     # number of trials to perform for each value
     reps = 10
     # parameters to pass to synthetic data generation. Value for independent
-    # variable should be an iterable of values of callables
+    # variable should be a list of values or callables
     synth_params = None
-
-    def __init__(self):
-        for key, val in self.synth_params.items():
-            # If not an iterable, repeat the value endlessly
-            try:
-                self.synth_params[key] = iter(val)
-            except TypeError:
-                self.synth_params[key] = itertools.repeat(val)
+    # number of worker processes (default: number of CPUs)
+    workers = None
+    # directory to cache generated datasets in between runs
+    cache_dir = os.path.join(
+        tempfile.gettempdir(), "truthdiscovery-experiment-cache"
+    )
 
     def run(self):
-        out = {}
-        for var_label in self.labels:
-            # results dict: {alg_label: [acc, ...], ...}
-            results = {}
-            params = dict(self.get_synth_params())
-            for _ in range(self.reps):
-                this_params = {}
-                for key, val in params.items():
-                    try:
-                        this_params[key] = val()
-                    except TypeError:
-                        this_params[key] = val
-
-                synth = SyntheticData(**this_params)
-                for alg_label, alg in self.algorithms.items():
-                    acc = synth.get_accuracy(alg.run(synth.data))
-                    this_res = results.setdefault(alg_label, [])
-                    this_res.append(acc)
-            out[var_label] = results
-        return out
-
-    def get_synth_params(self):
-        def inner():
-            for key, seq in self.synth_params.items():
-                val = next(seq)
-                yield key, val
-        return dict(inner())
+        experiment = experiments.Experiment(
+            self.algorithms, self.labels, self.synth_params, reps=self.reps
+        )
+        runner = experiments.ExperimentRunner(
+            workers=self.workers, cache_dir=self.cache_dir
+        )
+        return runner.run(experiment)
 
     @classmethod
     def run_multiple(cls, *args):
@@ -116,9 +95,8 @@ class TrustDistExperiment(Experiment):
                 0, 1
             ),
         })
-        self.labels = trust_dists.keys()
-        self.synth_params["trust"] = trust_dists.values()
-        super().__init__()
+        self.labels = list(trust_dists.keys())
+        self.synth_params["trust"] = list(trust_dists.values())
 
     @classmethod
     def graph(cls, res):
@@ -131,7 +109,9 @@ class TrustDistExperiment(Experiment):
         for i, (dist, results) in enumerate(res.items()):
             # Get mean accuracy scores for all algorithms for this trust
             # distribution
-            acc_scores = list(np.mean(results[alg]) for alg in alg_labels)
+            acc_scores = list(
+                experiments.mean_accuracy(results[alg]) for alg in alg_labels
+            )
             ax.bar(
                 index + i * bar_width,
                 acc_scores,
@@ -169,7 +149,6 @@ class ClaimDensityExperiment(Experiment):
         claim_probs = list(np.clip(np.arange(0.1, 1.025, 0.05), 0, 1))
         self.synth_params["claim_probability"] = claim_probs
         self.labels = claim_probs
-        super().__init__()
 
     @classmethod
     def graph(cls, res):
@@ -177,7 +156,7 @@ class ClaimDensityExperiment(Experiment):
         # JSON does not support non-string keys, so convert to float
         xs = list(map(float, res.keys()))
         for alg in cls.algorithms:
-            ys = [np.mean(res[str(x)][alg]) for x in xs]
+            ys = [experiments.mean_accuracy(res[str(x)][alg]) for x in xs]
             ax.plot(xs, ys, "x-", label=alg, linewidth=3)
 
         ax.set_title(
@@ -205,14 +184,13 @@ class DomainSizeExperiment(Experiment):
         domain_sizes = list(range(2, 21))
         self.labels = domain_sizes
         self.synth_params["domain_size"] = domain_sizes
-        super().__init__()
 
     @classmethod
     def graph(cls, res):
         _fig, ax = plt.subplots()
         xs = list(map(int, res.keys()))
         for alg in cls.algorithms:
-            ys = [np.mean(res[str(x)][alg]) for x in xs]
+            ys = [experiments.mean_accuracy(res[str(x)][alg]) for x in xs]
             ax.plot(xs, ys, "x-", label=alg, linewidth=3)
 
         ax.set_title(
@@ -1,7 +1,11 @@
 class ConvergenceError(Exception):
     """
-    An algorithm failed to converge within the iteration limit
+    An algorithm failed to converge within the iteration limit. If the iterator
+    was recording history, it is available as the ``history`` attribute
     """
+    def __init__(self, *args, history=None):
+        super().__init__(*args)
+        self.history = history
 
 
 class EarlyFinishError(Exception):
@@ -0,0 +1,12 @@
+from truthdiscovery.experiments.experiment import (
+    Experiment,
+    Trial,
+    trial_seed
+)
+from truthdiscovery.experiments.runner import (
+    DatasetCache,
+    ExperimentRunner,
+    mean_accuracy,
+    run_trial,
+    seeded_accuracy
+)
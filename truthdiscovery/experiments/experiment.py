@@ -0,0 +1,112 @@
+"""
+Definitions of experiments measuring the accuracy of algorithms on synthetic
+datasets
+"""
+import hashlib
+
+import numpy as np
+
+
+def trial_seed(base_seed, value_index, rep):
+    """
+    :return: a deterministic seed for a single trial, in the range accepted by
+             ``numpy.random.seed``
+    """
+    return (base_seed * 1000003 + value_index * 10007 + rep) % (2 ** 32)
+
+
+class Trial:
+    """
+    A single trial in an experiment: generation of one synthetic dataset, on
+    which all algorithms are run
+    """
+    def __init__(self, label, value_index, rep, seed, synth_params):
+        """
+        :param label:        label for the value of the independent variable
+        :param value_index:  index of the value of the independent variable
+        :param rep:          repetition number for this value
+        :param seed:         seed for random number generation
+        :param synth_params: dict of keyword arguments for
+                             :any:`SyntheticData`, with all random values
+                             already drawn
+        """
+        self.label = label
+        self.value_index = value_index
+        self.rep = rep
+        self.seed = seed
+        self.synth_params = synth_params
+
+    def get_cache_key(self):
+        """
+        :return: a string that uniquely identifies the dataset generated for
+                 this trial, computed from the parameters and seed
+        """
+        digest = hashlib.sha256(str(self.seed).encode())
+        for key in sorted(self.synth_params):
+            value = np.asarray(self.synth_params[key])
+            digest.update(key.encode())
+            digest.update(str((value.dtype.str, value.shape)).encode())
+            digest.update(value.tobytes())
+        return digest.hexdigest()
+
+
+class Experiment:
+    """
+    An experiment in which the accuracy of algorithms is measured on synthetic
+    datasets, as an independent variable (e.g. claim probability) varies.
+
+    Each value of ``synth_params`` is either a list with one entry for each
+    label (the independent variable), or a single value used for all labels.
+    Entries may be callables, which are called once per trial to draw random
+    parameters (e.g. trust vectors); the random number generator is seeded
+    beforehand so that experiments are reproducible.
+    """
+    def __init__(self, algorithms, labels, synth_params, reps=10, seed=0):
+        """
+        :param algorithms:   dict mapping labels to algorithm objects
+        :param labels:       list of labels for the values of the independent
+                             variable
+        :param synth_params: dict of keyword arguments for
+                             :any:`SyntheticData` as described above
+        :param reps:         number of trials for each label
+        :param seed:         base seed from which seeds for each trial are
+                             derived
+        :raises ValueError: if a list in ``synth_params`` does not have one
+                            entry per label
+        """
+        self.algorithms = algorithms
+        self.labels = list(labels)
+        self.reps = reps
+        self.seed = seed
+        self.synth_params = {}
+        for key, val in synth_params.items():
+            if isinstance(val, (list, tuple)):
+                if len(val) != len(self.labels):
+                    raise ValueError(
+                        "Expected {} values for '{}', got {}"
+                        .format(len(self.labels), key, len(val))
+                    )
+                self.synth_params[key] = list(val)
+            else:
+                self.synth_params[key] = [val] * len(self.labels)
+
+    def get_trials(self):
+        """
+        :yield: :any:`Trial` objects for each label and repetition
+        """
+        for value_index, label in enumerate(self.labels):
+            for rep in range(self.reps):
+                seed = trial_seed(self.seed, value_index, rep)
+                # Draw random parameters with the trial's seed
+                np.random.seed(seed)
+                params = {}
+                for key, values in self.synth_params.items():
+                    val = values[value_index]
+                    params[key] = val() if callable(val) else val
+                yield Trial(label, value_index, rep, seed, params)
+
+    def get_num_trials(self):
+        """
+        :return: the total number of trials in the experiment
+        """
+        return len(self.labels) * self.reps
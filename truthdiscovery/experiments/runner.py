@@ -0,0 +1,245 @@
+"""
+Run experiments in parallel, caching generated datasets on disk
+"""
+from concurrent.futures import (
+    as_completed,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+import json
+import os
+import random
+import tempfile
+import threading
+
+import numpy as np
+import numpy.ma as ma
+
+from truthdiscovery.exceptions import ConvergenceError
+from truthdiscovery.input import MatrixDataset, SupervisedData, SyntheticData
+
+# Dataset generation and accuracy calculation use the global random number
+# generators, which are shared between threads
+_RANDOM_LOCK = threading.Lock()
+
+
+class DatasetCache:
+    """
+    On-disk cache of generated synthetic datasets, stored as compressed numpy
+    ``.npz`` files keyed by :meth:`Trial.get_cache_key`
+    """
+    def __init__(self, directory):
+        """
+        :param directory: path to the cache directory, which is created if it
+                          does not exist
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        return os.path.join(self.directory, "{}.npz".format(key))
+
+    def load(self, key):
+        """
+        :return: a :any:`SupervisedData` object, or None if the key is not in
+                 the cache
+        """
+        try:
+            with np.load(self.get_path(key)) as npz:
+                sv = ma.masked_array(npz["data"], npz["mask"])
+                true_values = dict(zip(npz["true_vars"].tolist(),
+                                       npz["true_vals"].tolist()))
+        except FileNotFoundError:
+            return None
+        return SupervisedData(MatrixDataset(sv), true_values)
+
+    def save(self, key, sup_data):
+        """
+        Save a :any:`SupervisedData` object whose dataset is a
+        :any:`MatrixDataset`. The file is written atomically, so that several
+        processes may share a cache
+        """
+        sv = sup_data.data.sv
+        true_vars = list(sup_data.values.keys())
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as outfile:
+                np.savez_compressed(
+                    outfile,
+                    data=ma.getdata(sv),
+                    mask=ma.getmaskarray(sv),
+                    true_vars=np.array(true_vars),
+                    true_vals=np.array([sup_data.values[v] for v in true_vars])
+                )
+            os.replace(temp_path, self.get_path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def run_trial(trial, algorithms, cache_dir=None):
+    """
+    Generate (or load from the cache) the dataset for a trial and run each
+    algorithm on it. This is a module-level function so that it can be used in
+    a process pool
+
+    :param trial:      :any:`Trial` object
+    :param algorithms: dict mapping labels to algorithm objects
+    :param cache_dir:  (optional) path to dataset cache directory
+    :return: a list of result dicts, one for each algorithm, with keys
+             ``label``, ``value_index``, ``rep``, ``seed``, ``algorithm``,
+             ``accuracy``, ``time`` and ``iterations``. Accuracy is None if
+             the algorithm did not converge, or if no variable has more than
+             one claimed value
+    """
+    cache = DatasetCache(cache_dir) if cache_dir is not None else None
+    sup_data = None
+    key = None
+    if cache is not None:
+        key = trial.get_cache_key()
+        sup_data = cache.load(key)
+    if sup_data is None:
+        with _RANDOM_LOCK:
+            np.random.seed(trial.seed)
+            sup_data = SyntheticData(**trial.synth_params)
+        if cache is not None:
+            cache.save(key, sup_data)
+
+    out = []
+    for alg_label, alg in sorted(algorithms.items()):
+        res = {
+            "label": trial.label,
+            "value_index": trial.value_index,
+            "rep": trial.rep,
+            "seed": trial.seed,
+            "algorithm": alg_label,
+            "accuracy": None,
+            "time": None,
+            "iterations": None
+        }
+        try:
+            results = alg.run(sup_data.data)
+        except ConvergenceError:
+            pass
+        else:
+            res["time"] = results.time_taken
+            res["iterations"] = results.iterations
+            res["accuracy"] = seeded_accuracy(sup_data, results, trial.seed)
+        out.append(res)
+    return out
+
+
+def seeded_accuracy(sup_data, results, seed):
+    """
+    Calculate the accuracy of results reproducibly. Accuracy calculation
+    breaks ties between most believed values randomly, so the global random
+    number generator is seeded first.
+
+    :param sup_data: :any:`SupervisedData` object
+    :param results:  :any:`Result` object for ``sup_data.data``
+    :param seed:     seed for the random number generator
+    :return: the accuracy, or None if it cannot be calculated (e.g. when no
+             variables with known true values have conflicting claims)
+    """
+    with _RANDOM_LOCK:
+        random.seed(seed)
+        try:
+            return sup_data.get_accuracy(results)
+        except ValueError:
+            return None
+
+
+def mean_accuracy(accuracies):
+    """
+    :param accuracies: list of accuracies, as returned for each label and
+                       algorithm by :meth:`ExperimentRunner.run`. Trials for
+                       which accuracy could not be computed have accuracy
+                       None
+    :return: the mean of the accuracies that are not None, or NaN if there
+             are none
+    """
+    values = np.array([acc for acc in accuracies if acc is not None],
+                      dtype=float)
+    return float(values.mean()) if len(values) else float("nan")
+
+
+class ExperimentRunner:
+    """
+    Run the trials of an :any:`Experiment` in a pool of workers
+    """
+    EXECUTORS = {
+        "process": ProcessPoolExecutor,
+        "thread": ThreadPoolExecutor
+    }
+
+    def __init__(self, workers=None, executor="process", cache_dir=None):
+        """
+        :param workers:   number of workers (default: number of CPUs). If 1,
+                          trials are run serially in the current process
+        :param executor:  ``process`` or ``thread``
+        :param cache_dir: (optional) directory in which to cache generated
+                          datasets between runs
+        :raises ValueError: if ``executor`` is invalid
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError("Invalid executor '{}': choose from {}".format(
+                executor, ", ".join(sorted(self.EXECUTORS))
+            ))
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.cache_dir = cache_dir
+
+    def iter_results(self, experiment, outfile=None):
+        """
+        Run an experiment, yielding results as soon as each trial finishes
+        (so not necessarily in order)
+
+        :param experiment: :any:`Experiment` object
+        :param outfile:    (optional) file object to write each result to as
+                           a line of JSON
+        :yield: result dicts as returned by :func:`run_trial`
+        """
+        for trial_results in self._iter_trial_results(experiment):
+            for res in trial_results:
+                if outfile is not None:
+                    outfile.write(json.dumps(res, default=str) + "\n")
+                    outfile.flush()
+                yield res
+
+    def _iter_trial_results(self, experiment):
+        args = (experiment.algorithms, self.cache_dir)
+        if self.workers == 1:
+            for trial in experiment.get_trials():
+                yield run_trial(trial, *args)
+            return
+
+        # Resolve all trials before starting any workers, since generating
+        # trial parameters may use the global random number generator
+        trials = list(experiment.get_trials())
+        executor_cls = self.EXECUTORS[self.executor]
+        with executor_cls(max_workers=self.workers) as executor:
+            futures = [executor.submit(run_trial, trial, *args)
+                       for trial in trials]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run(self, experiment, outfile=None):
+        """
+        Run an experiment and collect accuracy results
+
+        :param experiment: :any:`Experiment` object
+        :param outfile:    see :meth:`iter_results`
+        :return: a dict ``{label: {alg_label: [accuracy, ...], ...}, ...}``,
+                 where accuracies are ordered by repetition number, and are
+                 None for trials where accuracy could not be computed (see
+                 :func:`mean_accuracy`)
+        """
+        results = sorted(
+            self.iter_results(experiment, outfile=outfile),
+            key=lambda res: (res["value_index"], res["rep"])
+        )
+        out = {label: {} for label in experiment.labels}
+        for res in results:
+            accs = out[res["label"]].setdefault(res["algorithm"], [])
+            accs.append(res["accuracy"])
+        return out
@@ -50,12 +50,14 @@ class BaseAnimator:
         """
         A generator of ``buffer_cls`` objects for each frame in the animation
         """
-        # Note: must collect all results so we can get total number of
-        # iterations to work out completion percentage at each step
-        all_results = tuple(algorithm.run_iter(dataset))
-        num_iterations = len(all_results) - 1
-
-        for i, results in enumerate(all_results):
+        # Note: must collect all snapshots so we can get total number of
+        # iterations to work out completion percentage at each step. Snapshots
+        # are only converted to full results when the frame is drawn
+        all_snapshots = tuple(algorithm.run_iter(dataset))
+        num_iterations = len(all_snapshots) - 1
+
+        for i, snapshot in enumerate(all_snapshots):
+            results = snapshot.to_result(dataset)
             self.renderer.colours = ResultsGradientColourScheme(results)
             # Draw frame to in-memory buffer
             buf = self.buffer_cls()
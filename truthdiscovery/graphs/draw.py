@@ -5,6 +5,7 @@ import numpy as np
 from truthdiscovery.graphs.backends import PngBackend
 from truthdiscovery.graphs.colours import NodeType, GraphColourScheme
 from truthdiscovery.graphs.entities import Rectangle, Circle, Line, Label
+from truthdiscovery.utils import tracing
 
 
 def _sort_keys_by_value(dct):
@@ -101,7 +102,13 @@ class GraphRenderer:
         """
         self.height = self.get_height(dataset)
         entities = self.compile(dataset, animation_progress=animation_progress)
-        self.backend.draw_entities(entities, outfile, self.width, self.height)
+        # Entities are compiled lazily as the backend draws them, so this span
+        # covers both
+        backend_name = self.backend.__class__.__name__
+        with tracing.span("GraphRenderer.render", backend=backend_name):
+            self.backend.draw_entities(
+                entities, outfile, self.width, self.height
+            )
 
     def compile(self, dataset, animation_progress=None):
         """
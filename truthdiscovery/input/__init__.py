@@ -1,5 +1,30 @@
-from truthdiscovery.input.dataset import Dataset, IDMapping
+from truthdiscovery.input.canonicalisers import (
+    BaseCanonicaliser,
+    CaseFoldCanonicaliser,
+    CanonicaliserChain,
+    KeyCanonicaliser,
+    NumericCanonicaliser,
+    UnitCanonicaliser
+)
+from truthdiscovery.input.collapsed_dataset import CollapsedDataset
+from truthdiscovery.input.dataset import (
+    ClaimIDMapping,
+    Dataset,
+    IDMapping,
+    IdentityMapping
+)
 from truthdiscovery.input.file_helpers import FileDataset, FileSupervisedData
+from truthdiscovery.input.implications import (
+    BaseImplication,
+    GaussianImplication,
+    RelativeDifferenceImplication,
+    SparseImplication
+)
 from truthdiscovery.input.matrix_dataset import MatrixDataset
+from truthdiscovery.input.memmap_dataset import MemmapCSR, MemmapDataset
+from truthdiscovery.input.sharded_dataset import (
+    ShardedDataset,
+    shard_triples
+)
 from truthdiscovery.input.supervised_data import SupervisedData
 from truthdiscovery.input.synthetic_data import SyntheticData
@@ -0,0 +1,227 @@
+import numbers
+
+import numpy as np
+
+
+def to_object_array(values):
+    """
+    :param values: iterable of values of any type
+    :return: a 1D numpy array of dtype ``object`` containing ``values``
+             unchanged (in particular, tuples are not expanded into extra
+             dimensions)
+    """
+    values = list(values)
+    arr = np.empty(len(values), dtype=object)
+    for i, val in enumerate(values):
+        arr[i] = val
+    return arr
+
+
+def to_value_array(values):
+    """
+    :param values: iterable of values of any type
+    :return: a numeric 1D numpy array if every value is a number of the same
+             type, or an array of dtype ``object`` (as for
+             :func:`to_object_array`) otherwise, so that values of different
+             types (e.g. ``1`` and ``'1'``) are never converted to a common
+             type, and ``tolist()`` gives back values equal to and of the same
+             type as the originals
+    """
+    values = list(values)
+    if (len({type(val) for val in values}) <= 1
+            and all(isinstance(val, numbers.Number) for val in values)):
+        return np.array(values)
+    return to_object_array(values)
+
+
+def parse_number(value, ignore_chars=""):
+    """
+    :param value:        a value of any type
+    :param ignore_chars: characters to remove from strings before parsing
+    :return: ``value`` as a float if it is a number or a string representing
+             one, or None otherwise. NaN is not considered a number, since it
+             is not equal to itself and so cannot be used to merge values
+    """
+    if isinstance(value, str):
+        for char in ignore_chars:
+            value = value.replace(char, "")
+    elif isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(number) else number
+
+
+class BaseCanonicaliser:
+    """
+    Base class for value canonicalisers, which map equivalent values (e.g.
+    ``"1.50"`` and ``"1.5"``) to a single canonical value, so that claims for
+    equivalent values are merged when a dataset is built.
+
+    Canonicalisers operate on all the distinct values in a dataset at once.
+    """
+    def canonicalise(self, values):
+        """
+        :param values: 1D numpy array of distinct values. For datasets created
+                       from triples this has dtype ``object``; for matrix
+                       datasets it is numeric
+        :return: array or list of the same length giving the canonical form of
+                 each value. Canonical values must be hashable
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    def __call__(self, value):
+        """
+        Canonicalise a single value
+        """
+        return self.canonicalise(to_object_array([value]))[0]
+
+
+class NumericCanonicaliser(BaseCanonicaliser):
+    """
+    Convert numbers and strings representing numbers to floats, optionally
+    rounded to a number of decimal places. Other values are left unchanged.
+    """
+    def __init__(self, decimals=None, ignore_chars=""):
+        """
+        :param decimals:     (optional) number of decimal places to round to
+        :param ignore_chars: characters to remove from strings before parsing
+                             (e.g. ``","`` for thousands separators)
+        """
+        self.decimals = decimals
+        self.ignore_chars = ignore_chars
+
+    def round(self, arr):
+        """
+        :param arr: numpy array of floats
+        :return: ``arr`` rounded to :attr:`decimals`, with negative zero
+                 replaced by zero
+        """
+        if self.decimals is not None:
+            arr = np.round(arr, self.decimals)
+        return arr + 0.0
+
+    def canonicalise(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind in "iuf":
+            return self.round(values.astype(float))
+
+        numbers = [parse_number(val, self.ignore_chars) for val in values]
+        is_number = np.array([num is not None for num in numbers], dtype=bool)
+        canonical = to_object_array(values)
+        if is_number.any():
+            parsed = np.array(
+                [num for num in numbers if num is not None], dtype=float
+            )
+            canonical[is_number] = self.round(parsed).tolist()
+        return canonical
+
+
+class UnitCanonicaliser(BaseCanonicaliser):
+    """
+    Convert strings consisting of a number followed by a unit (e.g.
+    ``"1.5k"``, ``"12 kg"``) to floats in a common unit. Strings without a
+    known unit that represent numbers are converted to floats as they are;
+    other values are left unchanged.
+    """
+    def __init__(self, units, case_sensitive=False, ignore_chars=""):
+        """
+        :param units:          dict mapping unit suffixes to the factor to
+                               multiply by, e.g.
+                               ``{"k": 1e3, "M": 1e6, "%": 0.01}``
+        :param case_sensitive: if False (default), match units regardless of
+                               case
+        :param ignore_chars:   characters to remove from strings before
+                               parsing
+        """
+        self.case_sensitive = case_sensitive
+        self.ignore_chars = ignore_chars
+        # Try longer suffixes first, so that e.g. 'km' is preferred to 'm'
+        self.units = sorted(
+            ((self.fold(unit), factor) for unit, factor in units.items()),
+            key=lambda item: -len(item[0])
+        )
+
+    def fold(self, string):
+        return string if self.case_sensitive else string.casefold()
+
+    def convert(self, value):
+        """
+        :return: ``value`` converted to a float in the common unit, or None
+                 if it is not a number with an optional unit
+        """
+        if not isinstance(value, str):
+            return parse_number(value)
+        string = value.strip()
+        folded = self.fold(string)
+        for unit, factor in self.units:
+            if unit and folded.endswith(unit):
+                number = parse_number(string[:-len(unit)], self.ignore_chars)
+                if number is not None:
+                    return number * factor
+        return parse_number(string, self.ignore_chars)
+
+    def canonicalise(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind in "iuf":
+            return values.astype(float)
+        canonical = to_object_array(values)
+        for i, val in enumerate(values):
+            converted = self.convert(val)
+            if converted is not None:
+                canonical[i] = converted
+        return canonical
+
+
+class CaseFoldCanonicaliser(BaseCanonicaliser):
+    """
+    Case-fold strings, strip leading and trailing whitespace, and collapse
+    runs of internal whitespace to a single space. Other values are left
+    unchanged.
+    """
+    def canonicalise(self, values):
+        canonical = to_object_array(values)
+        for i, val in enumerate(canonical):
+            if isinstance(val, str):
+                canonical[i] = " ".join(val.casefold().split())
+        return canonical
+
+
+class KeyCanonicaliser(BaseCanonicaliser):
+    """
+    Canonicalise values with a user-supplied key function
+    """
+    def __init__(self, key, vectorised=False):
+        """
+        :param key:        function to compute the canonical form of values
+        :param vectorised: if True, ``key`` is called once with the array of
+                           all values and should return an array or list of
+                           canonical values. Otherwise (default) it is called
+                           once for each value
+        """
+        self.key = key
+        self.vectorised = vectorised
+
+    def canonicalise(self, values):
+        if self.vectorised:
+            return self.key(values)
+        return to_object_array(self.key(val) for val in values)
+
+
+class CanonicaliserChain(BaseCanonicaliser):
+    """
+    Apply several canonicalisers in turn
+    """
+    def __init__(self, *canonicalisers):
+        """
+        :param canonicalisers: :any:`BaseCanonicaliser` objects, in the order
+                               they should be applied
+        """
+        self.canonicalisers = canonicalisers
+
+    def canonicalise(self, values):
+        for canonicaliser in self.canonicalisers:
+            values = canonicaliser.canonicalise(values)
+        return values
@@ -0,0 +1,96 @@
+import numpy as np
+import scipy.sparse
+
+from truthdiscovery.input.dataset import Dataset, IDMapping
+
+
+def find_duplicate_rows(mat):
+    """
+    Group identical rows of a sparse matrix, considering only the positions of
+    non-zero entries
+
+    :param mat: ``scipy.sparse`` matrix
+    :return: a tuple ``(groups, representatives)``, where ``groups[i]`` is the
+             index of the group containing row ``i``, and
+             ``representatives[g]`` is the first row in group ``g``. Groups
+             are numbered in order of their first row
+    """
+    mat = scipy.sparse.csr_matrix(mat)
+    mat.sort_indices()
+    indices = mat.indices.astype(np.int64, copy=False)
+    indptr = mat.indptr
+    group_ids = {}
+    groups = np.empty(mat.shape[0], dtype=np.int64)
+    representatives = []
+    for row in range(mat.shape[0]):
+        key = indices[indptr[row]:indptr[row + 1]].tobytes()
+        group = group_ids.get(key)
+        if group is None:
+            group = len(representatives)
+            group_ids[key] = group
+            representatives.append(row)
+        groups[row] = group
+    return groups, np.array(representatives, dtype=np.int64)
+
+
+class CollapsedDataset(Dataset):
+    """
+    A view of a dataset in which sources that make exactly the same set of
+    claims (e.g. mirrors of one another) are collapsed into a single
+    *super-source*, whose weight is the number of sources it replaces.
+
+    Algorithms run on the smaller source-claims matrix, and count each
+    super-source according to its weight, so that results are the same as for
+    the original dataset (up to floating point rounding). Source trust
+    scores in results are expanded back to the original source labels.
+    """
+    def __init__(self, dataset):
+        """
+        :param dataset: :any:`Dataset` object to collapse
+        """
+        groups, representatives = find_duplicate_rows(dataset.sc)
+        labels = dataset.source_ids.inverse
+        self.source_ids = IDMapping([labels[i] for i in representatives])
+        # Weights add up if the dataset is itself collapsed
+        self.source_weights = np.bincount(
+            groups, weights=dataset.source_weights
+        )
+        #: Index of the super-source for each source in the original dataset,
+        #: ordered by original source ID
+        self.source_groups = groups
+        #: ID mapping for sources in the original dataset
+        self.original_source_ids = dataset.source_ids
+        if isinstance(dataset, CollapsedDataset):
+            self.source_groups = groups[dataset.source_groups]
+            self.original_source_ids = dataset.original_source_ids
+
+        self.var_ids = dataset.var_ids
+        self.val_hashes = dataset.val_hashes
+        self.claim_ids = dataset.claim_ids
+        self.canonicaliser = dataset.canonicaliser
+        self.num_sources = len(representatives)
+        self.num_variables = dataset.num_variables
+        self.num_claims = dataset.num_claims
+        self.sc = dataset.sc[representatives]
+        self.mut_ex = dataset.mut_ex
+        self.imp = dataset.imp
+
+    def expand_source_scores(self, source_scores):
+        """
+        :param source_scores: numpy array of scores for each super-source
+        :return: numpy array of scores for each source in the original
+                 dataset, ordered by original source ID
+        """
+        return np.asarray(source_scores)[self.source_groups]
+
+    def get_source_trust_dict(self, trust):
+        """
+        :param trust: numpy array of trust values for each super-source
+        :return: a dict of trust values for each source in the original
+                 dataset, in the format required for :any:`Result`
+        """
+        labels = self.original_source_ids.inverse
+        return {
+            labels[i]: trust_val
+            for i, trust_val in enumerate(self.expand_source_scores(trust))
+        }
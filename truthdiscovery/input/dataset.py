@@ -1,13 +1,84 @@
-import itertools
+import array
+from collections.abc import Mapping, Sequence
 
-from bidict import bidict
+import numpy as np
 import scipy.sparse
 
+from truthdiscovery.input.canonicalisers import (
+    to_object_array,
+    to_value_array
+)
+from truthdiscovery.input.implications import BaseImplication
+from truthdiscovery.utils import tracing
 
-class IDMapping(bidict):
+
+def factorise(arr):
+    """
+    Encode the entries of an array as integer codes, where codes are assigned
+    to distinct values in order of first appearance
+
+    :param arr: 1D numpy array
+    :return: a tuple ``(codes, uniques)``, where ``codes`` has the same length
+             as ``arr`` and ``uniques[codes]`` is equal to ``arr``
+    """
+    uniques, first, inverse = np.unique(arr, return_index=True,
+                                        return_inverse=True)
+    order = np.argsort(first)
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return ranks[inverse.reshape(-1)], uniques[order]
+
+
+class IDMapping(Mapping):
     """
     Bi-directional mapping from *labels* (of arbitrary type) to integer IDs
+    ``0, 1, ..., n - 1``, assigned in order of insertion.
+
+    Labels are stored in a sequence indexed by ID, so that :attr:`inverse`
+    lookups are O(1) list accesses. The forward index from labels to IDs is a
+    dict, which is only built when first needed; mappings created from a
+    sequence of labels and only ever used to look up labels by ID never build
+    it.
     """
+    def __init__(self, labels=()):
+        """
+        :param labels: (optional) iterable of initial labels, ordered by ID.
+                       Labels must be distinct
+        """
+        self.labels = self.make_label_sequence(labels)
+        self._index = None
+
+    def make_label_sequence(self, labels):
+        """
+        :return: sequence to store the labels in
+        """
+        return list(labels)
+
+    def get_key(self, label):
+        """
+        :return: the key used for ``label`` in the forward index
+        """
+        return label
+
+    def build_index(self):
+        """
+        :return: dict mapping keys (see :meth:`get_key`) to IDs
+        """
+        return {label: i for i, label in enumerate(self.labels)}
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.build_index()
+        return self._index
+
+    @property
+    def inverse(self):
+        """
+        Sequence mapping IDs to labels
+        """
+        return self.labels
+
     def get_id(self, label, insert=True):
         """
         :param label:  label to return ID for
@@ -16,9 +87,164 @@ class IDMapping(bidict):
         :return: the ID for the ``label``
         :raises KeyError: if ``insert=False`` and ``label`` is not present
         """
-        if label not in self and insert:
-            self[label] = len(self)
-        return self[label]
+        key = self.get_key(label)
+        try:
+            return self.index[key]
+        except KeyError:
+            if not insert:
+                raise
+        new_id = len(self.labels)
+        self.index[key] = new_id
+        self.labels.append(label)
+        return new_id
+
+    def __getitem__(self, label):
+        return self.index[self.get_key(label)]
+
+    def __contains__(self, label):
+        return self.get_key(label) in self.index
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def values(self):
+        return range(len(self.labels))
+
+    def items(self):
+        return zip(self.labels, range(len(self.labels)))
+
+
+class IdentityMapping(IDMapping):
+    """
+    :any:`IDMapping` where the labels are the integers ``0, ..., n - 1`` and
+    each label is its own ID. Nothing is stored apart from ``n``, and lookups
+    in either direction do not require hashing
+    """
+    def __init__(self, size=0):
+        """
+        :param size: number of labels
+        """
+        self.size = size
+        self._index = None
+
+    @classmethod
+    def matches(cls, labels):
+        """
+        :param labels: sequence of labels ordered by ID
+        :return: True if each label is an integer equal to its position in
+                 ``labels``
+        """
+        return all(cls.is_integer(label) and label == i
+                   for i, label in enumerate(labels))
+
+    @classmethod
+    def is_integer(cls, label):
+        return (isinstance(label, (int, np.integer)) and
+                not isinstance(label, bool))
+
+    @property
+    def labels(self):
+        return range(self.size)
+
+    def get_id(self, label, insert=True):
+        if label in self:
+            return int(label)
+        if not insert:
+            raise KeyError(label)
+        if not self.is_integer(label) or label != self.size:
+            raise ValueError(
+                "Only the next integer ({}) can be inserted into an identity "
+                "mapping".format(self.size)
+            )
+        self.size += 1
+        return int(label)
+
+    def __getitem__(self, label):
+        if label not in self:
+            raise KeyError(label)
+        return int(label)
+
+    def __contains__(self, label):
+        return self.is_integer(label) and 0 <= label < self.size
+
+    def __len__(self):
+        return self.size
+
+
+class PairSequence(Sequence):
+    """
+    Sequence of pairs of non-negative integers, stored as two compact arrays
+    """
+    def __init__(self, firsts=(), seconds=()):
+        self.firsts = array.array("q", firsts)
+        self.seconds = array.array("q", seconds)
+
+    def __getitem__(self, i):
+        return (self.firsts[i], self.seconds[i])
+
+    def __len__(self):
+        return len(self.firsts)
+
+    def append(self, pair):
+        first, second = pair
+        self.firsts.append(first)
+        self.seconds.append(second)
+
+    def get_arrays(self):
+        """
+        :return: numpy arrays of the first and second elements of each pair
+        """
+        return (np.frombuffer(self.firsts, dtype=np.int64).copy(),
+                np.frombuffer(self.seconds, dtype=np.int64).copy())
+
+
+class ClaimIDMapping(IDMapping):
+    """
+    :any:`IDMapping` for claims, whose labels are ``(var_id, val_hash)`` pairs.
+    Pairs are stored in integer arrays rather than as tuples, and the forward
+    index is keyed by a single integer encoding each pair
+    """
+    #: Number of bits used for the value hash in index keys
+    VAL_BITS = 32
+
+    def make_label_sequence(self, labels):
+        if isinstance(labels, PairSequence):
+            return labels
+        seq = PairSequence()
+        for label in labels:
+            seq.append(label)
+        return seq
+
+    def get_key(self, label):
+        var_id, val_hash = label
+        return (var_id << self.VAL_BITS) | val_hash
+
+    def build_index(self):
+        var_ids, val_hashes = self.labels.get_arrays()
+        keys = (var_ids << self.VAL_BITS) | val_hashes
+        return dict(zip(keys.tolist(), range(len(keys))))
+
+    @classmethod
+    def from_arrays(cls, var_ids, val_hashes):
+        """
+        :param var_ids:    array of variable IDs, ordered by claim ID
+        :param val_hashes: array of value hashes, ordered by claim ID
+        :return: a :any:`ClaimIDMapping` object
+        """
+        seq = PairSequence()
+        seq.firsts.frombytes(np.asarray(var_ids, dtype=np.int64).tobytes())
+        seq.seconds.frombytes(np.asarray(val_hashes, dtype=np.int64).tobytes())
+        return cls(seq)
+
+    def get_arrays(self):
+        """
+        :return: numpy arrays ``(var_ids, val_hashes)`` for all claims, ordered
+                 by claim ID
+        """
+        return self.labels.get_arrays()
 
 
 class Dataset:
@@ -45,9 +271,13 @@ class Dataset:
     var_ids = None
     claim_ids = None
     val_hashes = None
+    canonicaliser = None
+    #: Weight of each source in sums over sources, or None if all sources
+    #: have weight 1 (see :any:`CollapsedDataset`)
+    source_weights = None
 
     def __init__(self, triples, allow_multiple=False,
-                 implication_function=None):
+                 implication_function=None, canonicaliser=None):
         """
         :param triples:        iterable of ``(source_label, var_label, value)``
                                as described above
@@ -58,12 +288,20 @@ class Dataset:
                                      values between claims (see above). This
                                      should take ``(var, val1, val2)`` as
                                      arguments and return an implication value
-                                     in [-1, 1], or None
+                                     in [-1, 1], or None. Alternatively, a
+                                     :any:`BaseImplication` object may be
+                                     given to compute implications for all
+                                     claims about a variable at once
+        :param canonicaliser: (optional) :any:`BaseCanonicaliser` object used
+                              to merge claims for equivalent values. Values
+                              in the dataset (and in results) are replaced
+                              with their canonical forms
         """
+        trace = tracing.phases("Dataset")
         self.source_ids = IDMapping()  # Map source label to integer IDs
         self.var_ids = IDMapping()     # Variable labels to IDs
         self.val_hashes = IDMapping()  # Values to IDs (hashes)
-        self.claim_ids = IDMapping()   # (var_id, val_hash) tuples to IDs
+        self.claim_ids = ClaimIDMapping()  # (var_id, val_hash) pairs to IDs
 
         # Keep track of (source, var) pairs to detect if a source makes more
         # than one claim for a single variable
@@ -76,11 +314,6 @@ class Dataset:
         sc_rows = []
         sc_cols = []
 
-        # Keep track of all claims IDs for each variable, to populate the
-        # mutual exclusion matrix. The keys are variable IDs, and values are
-        # sets of claim IDs
-        mut_ex_claims = {}
-
         for source_label, var_label, val in triples:
             s_id = self.source_ids.get_id(source_label)
             var_id = self.var_ids.get_id(var_label)
@@ -102,10 +335,71 @@ class Dataset:
             sc_rows.append(s_id)
             sc_cols.append(claim_id)
 
-            if var_id not in mut_ex_claims:
-                mut_ex_claims[var_id] = set()
-            mut_ex_claims[var_id].add(claim_id)
+        # Sources and variables are often labelled 0, 1, ..., in which case
+        # their mappings do not need to be stored
+        if IdentityMapping.matches(self.source_ids):
+            self.source_ids = IdentityMapping(len(self.source_ids))
+        if IdentityMapping.matches(self.var_ids):
+            self.var_ids = IdentityMapping(len(self.var_ids))
+
+        trace.checkpoint("read_triples", num_claims=len(self.claim_ids))
+        if canonicaliser is not None:
+            sc_cols = self.merge_equivalent_values(canonicaliser, sc_cols)
+            trace.checkpoint("canonicalise", num_claims=len(self.claim_ids))
+        self.build_matrices(sc_rows, sc_cols, trace, implication_function)
+
+    def merge_equivalent_values(self, canonicaliser, sc_cols):
+        """
+        Replace values with their canonical forms, merging claims about the
+        same variable whose values have the same canonical form. Claim IDs are
+        reassigned in order of first appearance of the merged claims.
+
+        :param canonicaliser: a :any:`BaseCanonicaliser` object
+        :param sc_cols:       claim IDs for each claim made, as for
+                              :meth:`build_matrices`
+        :return: numpy array of the new claim IDs corresponding to ``sc_cols``
+        :raises ValueError: if the canonicaliser does not return one value for
+                            each input value
+        """
+        self.canonicaliser = canonicaliser
+        canonical = canonicaliser.canonicalise(
+            to_object_array(self.val_hashes.inverse)
+        )
+        if len(canonical) != len(self.val_hashes):
+            raise ValueError(
+                "Canonicaliser returned {} values for {} inputs"
+                .format(len(canonical), len(self.val_hashes))
+            )
+        if isinstance(canonical, np.ndarray):
+            canonical = canonical.tolist()
+
+        # Map old value hashes to hashes of canonical values
+        self.val_hashes = IDMapping()
+        new_hashes = np.array(
+            [self.val_hashes.get_id(val) for val in canonical], dtype=np.int64
+        )
+        claim_vars, claim_vals = self.claim_ids.get_arrays()
+        keys = (claim_vars << ClaimIDMapping.VAL_BITS) | new_hashes[claim_vals]
+        new_claim_ids, keys = factorise(keys)
+        self.claim_ids = ClaimIDMapping.from_arrays(
+            keys >> ClaimIDMapping.VAL_BITS,
+            keys & ((1 << ClaimIDMapping.VAL_BITS) - 1)
+        )
+        return new_claim_ids[np.asarray(sc_cols, dtype=np.int64)]
+
+    def build_matrices(self, sc_rows, sc_cols, trace,
+                       implication_function=None):
+        """
+        Create the source-claims, mutual exclusion and implication matrices
+        once the ID mappings have been populated
 
+        :param sc_rows:    source IDs for each claim made
+        :param sc_cols:    claim IDs for each claim made, in the same order as
+                           ``sc_rows``
+        :param trace:      tracing phase recorder from
+                           :func:`~truthdiscovery.utils.tracing.phases`
+        :param implication_function: see :meth:`__init__`
+        """
         self.num_sources = len(self.source_ids)
         self.num_variables = len(self.var_ids)
         self.num_claims = len(self.claim_ids)
@@ -113,61 +407,159 @@ class Dataset:
         # Create source-claim matrix: entry (i, j) is 1 if source i makes claim
         # j, and 0 otherwise
         self.sc = scipy.sparse.csr_matrix(
-            ([1] * len(sc_rows), (sc_rows, sc_cols)),
+            (np.ones(len(sc_rows), dtype=int), (sc_rows, sc_cols)),
             shape=(self.num_sources, self.num_claims)
         )
+        trace.checkpoint("build_sc")
 
-        # Create mutual exclusion matrix: entry (i, j) is 1 if claims i and j
-        # relate to the same variable (including when i=j) and 0 otherwise
-        mut_ex_rows = []  # Construct in the same way as for sc
-        mut_ex_cols = []
-        for claim_ids in mut_ex_claims.values():
-            for i, j in itertools.product(claim_ids, repeat=2):
-                mut_ex_rows.append(i)
-                mut_ex_cols.append(j)
-
-        self.mut_ex = scipy.sparse.csr_matrix(
-            ([1] * len(mut_ex_rows), (mut_ex_rows, mut_ex_cols)),
-            shape=(self.num_claims, self.num_claims)
-        )
+        self.mut_ex = self.get_mutual_exclusion_matrix()
+        trace.checkpoint("build_mut_ex")
 
         # Create implication matrix, for implications between claims
+        self.imp = self.get_implication_matrix(implication_function)
+        trace.checkpoint("build_imp")
+
+    def get_mutual_exclusion_matrix(self):
+        """
+        Compute the mutual exclusion matrix: entry ``(i, j)`` is 1 if claims
+        ``i`` and ``j`` relate to the same variable (including when ``i = j``)
+        and 0 otherwise
+
+        :return: ``num_claims x num_claims`` sparse matrix
+        """
+        # This is the product of the claim-variable incidence matrix with its
+        # transpose
+        claim_vars, _ = self.claim_ids.get_arrays()
+        claim_var = scipy.sparse.csr_matrix(
+            (np.ones(self.num_claims, dtype=int),
+             (np.arange(self.num_claims), claim_vars)),
+            shape=(self.num_claims, self.num_variables)
+        )
+        mut_ex = (claim_var @ claim_var.T).tocsr()
+        mut_ex.sort_indices()
+        return mut_ex
+
+    def get_implication_matrix(self, implication_function=None):
+        """
+        Compute the implication matrix between claims. Claims are assumed to
+        be mutually exclusive iff they are about the same variable.
+
+        :param implication_function: see :meth:`__init__`
+        :return: ``num_claims x num_claims`` sparse matrix of implication
+                 values
+        """
+        shape = (self.num_claims, self.num_claims)
+        if implication_function is None:
+            return scipy.sparse.csr_matrix(shape)
+
+        if isinstance(implication_function, BaseImplication):
+            imp_rows, imp_cols, imp_entries = self.get_implication_blocks(
+                implication_function
+            )
+        else:
+            imp_rows, imp_cols, imp_entries = self.get_implication_entries(
+                implication_function
+            )
+
+        if len(imp_entries) == 0:
+            return scipy.sparse.csr_matrix(shape)
+        return scipy.sparse.csr_matrix(
+            (imp_entries, (imp_rows, imp_cols)), shape=shape
+        )
+
+    def get_implication_entries(self, implication_function):
+        """
+        Call a per-pair implication function for each pair of distinct claims
+        about the same variable.
+
+        :return: ``(rows, cols, entries)`` lists for the non-zero entries of
+                 the implication matrix
+        """
         imp_rows = []
         imp_cols = []
         imp_entries = []
-        if implication_function is not None:
-            # Iterate over non-zero entries in mut ex
-            for j1, j2 in zip(*self.mut_ex.nonzero()):
-                if j1 == j2:
-                    continue
-                # Note that claims j1 and j2 are for the same variable, since
-                # mut ex is 1 at this point
-                var_id, val1_hash = self.claim_ids.inverse[j1]
-                _, val2_hash = self.claim_ids.inverse[j2]
-
-                var = self.var_ids.inverse[var_id]
-                val1 = self.val_hashes.inverse[val1_hash]
-                val2 = self.val_hashes.inverse[val2_hash]
-                imp_value = implication_function(var, val1, val2)
-
-                if imp_value is not None:
-                    if imp_value < -1 or imp_value > 1:
-                        raise ValueError(
-                            "Implication values must be in [-1, 1]"
-                        )
-                    imp_entries.append(imp_value)
-                    imp_rows.append(j1)
-                    imp_cols.append(j2)
-
-        if imp_entries:
-            self.imp = scipy.sparse.csr_matrix(
-                (imp_entries, (imp_rows, imp_cols)),
-                shape=(self.num_claims, self.num_claims)
-            )
-        else:
-            self.imp = scipy.sparse.csr_matrix(
-                (self.num_claims, self.num_claims)
+        # Iterate over non-zero entries in mut ex
+        for j1, j2 in zip(*self.mut_ex.nonzero()):
+            if j1 == j2:
+                continue
+            # Note that claims j1 and j2 are for the same variable, since
+            # mut ex is 1 at this point
+            var_id, val1_hash = self.claim_ids.inverse[j1]
+            _, val2_hash = self.claim_ids.inverse[j2]
+
+            var = self.var_ids.inverse[var_id]
+            val1 = self.val_hashes.inverse[val1_hash]
+            val2 = self.val_hashes.inverse[val2_hash]
+            imp_value = implication_function(var, val1, val2)
+
+            if imp_value is not None:
+                if imp_value < -1 or imp_value > 1:
+                    raise ValueError(
+                        "Implication values must be in [-1, 1]"
+                    )
+                imp_entries.append(imp_value)
+                imp_rows.append(j1)
+                imp_cols.append(j2)
+        return imp_rows, imp_cols, imp_entries
+
+    def get_value_array(self):
+        """
+        :return: numpy array of all values, ordered by value hash. Unless
+                 every value is a number of the same type, the array has dtype
+                 ``object`` and holds the values unchanged (see
+                 :func:`to_value_array`)
+        """
+        return to_value_array(self.val_hashes.inverse)
+
+    def get_implication_blocks(self, implication):
+        """
+        Call a vectorised implication function once for each variable with
+        more than one claim, and collect the resulting blocks.
+
+        :param implication: a :any:`BaseImplication` object
+        :return: ``(rows, cols, entries)`` arrays for the non-zero entries of
+                 the implication matrix
+        """
+        var_ids, val_hashes = self.claim_ids.get_arrays()
+        values = self.get_value_array()
+        # Group claim IDs by variable
+        order = np.argsort(var_ids, kind="stable")
+        boundaries = np.flatnonzero(np.diff(var_ids[order])) + 1
+
+        imp_rows = []
+        imp_cols = []
+        imp_entries = []
+        for claims in np.split(order, boundaries):
+            num = len(claims)
+            if num < 2:
+                continue
+            var = self.var_ids.inverse[var_ids[claims[0]]]
+            # Copy the block, since the diagonal is overwritten below and the
+            # function may return an array it holds on to
+            block = np.array(
+                implication.get_block(var, values[val_hashes[claims]]),
+                dtype=float
             )
+            if block.shape != (num, num):
+                raise ValueError(
+                    "Expected implication block of shape {}, got {}"
+                    .format((num, num), block.shape)
+                )
+            np.fill_diagonal(block, np.nan)
+            present = ~np.isnan(block)
+            entries = block[present]
+            if np.any((entries < -1) | (entries > 1)):
+                raise ValueError("Implication values must be in [-1, 1]")
+            keep = present & (block != 0)
+            rows, cols = np.nonzero(keep)
+            imp_rows.append(claims[rows])
+            imp_cols.append(claims[cols])
+            imp_entries.append(block[keep])
+
+        if not imp_entries:
+            return [], [], []
+        return (np.concatenate(imp_rows), np.concatenate(imp_cols),
+                np.concatenate(imp_entries))
 
     def get_belief_dict(self, claim_beliefs):
         """
@@ -179,25 +571,49 @@ class Dataset:
                        values, in the format required for :any:`Result`
         """
         var_beliefs = {}
-        for claim_id, belief_score in enumerate(claim_beliefs):
-            var_id, val_hash = self.claim_ids.inverse[claim_id]
-            var_label = self.var_ids.inverse[var_id]
-            val = self.val_hashes.inverse[val_hash]
-            if var_label not in var_beliefs:
-                var_beliefs[var_label] = {}
-            var_beliefs[var_label][val] = belief_score
+        with tracing.span("Dataset.get_belief_dict"):
+            for claim_id, belief_score in enumerate(claim_beliefs):
+                var_id, val_hash = self.claim_ids.inverse[claim_id]
+                var_label = self.var_ids.inverse[var_id]
+                val = self.val_hashes.inverse[val_hash]
+                if var_label not in var_beliefs:
+                    var_beliefs[var_label] = {}
+                var_beliefs[var_label][val] = belief_score
         return var_beliefs
 
+    def apply_source_weights(self, source_scores):
+        """
+        :param source_scores: numpy array of scores for each source
+        :return: ``source_scores`` multiplied entry-wise by
+                 :attr:`source_weights`, or ``source_scores`` unchanged if
+                 sources are not weighted
+        """
+        if self.source_weights is None:
+            return source_scores
+        return self.source_weights * source_scores
+
+    def get_claim_totals(self, source_scores):
+        """
+        Sum the scores of the sources making each claim, taking source weights
+        into account
+
+        :param source_scores: numpy array of scores for each source
+        :return: numpy array whose ``j``-th entry is the total score of the
+                 sources making claim ``j``
+        """
+        return self.sc.T @ self.apply_source_weights(source_scores)
+
     def get_source_trust_dict(self, trust):
         """
         :param trust: numpy array of source trust values, ordered by source ID
         :return:      a dict of source trusts in the format required for
                       :any:`Result`
         """
-        return {
-            self.source_ids.inverse[i]: trust_val
-            for i, trust_val in enumerate(trust)
-        }
+        with tracing.span("Dataset.get_source_trust_dict"):
+            return {
+                self.source_ids.inverse[i]: trust_val
+                for i, trust_val in enumerate(trust)
+            }
 
     def num_connected_components(self):
         """
@@ -0,0 +1,164 @@
+import numpy as np
+
+from truthdiscovery.input.canonicalisers import to_value_array
+
+
+class BaseImplication:
+    """
+    Base class for vectorised implication functions.
+
+    Instead of computing implication values one pair of claims at a time, a
+    vectorised implication function is given a variable and an array of all
+    the values claimed for it, and computes implication values for all pairs
+    at once. Entries on the diagonal (implication of a claim on itself) are
+    ignored, and NaN entries indicate that there is no implication between the
+    corresponding claims.
+
+    Objects of this class are also callable as ``(var, val1, val2)``, so may be
+    used anywhere a per-pair implication function is accepted.
+    """
+    def get_block(self, var, values):
+        """
+        :param var:    label of the variable the claims are about
+        :param values: numpy array of the ``k`` distinct values claimed for
+                       ``var``. The array has dtype ``object`` unless every
+                       value is a number of the same type
+        :return:       ``k x k`` numpy array whose ``(i, j)`` entry is the
+                       implication of ``var = values[i]`` on
+                       ``var = values[j]``, or NaN for no implication
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    def __call__(self, var, val1, val2):
+        block = self.get_block(var, to_value_array([val1, val2]))
+        imp_value = block[0, 1]
+        return None if np.isnan(imp_value) else float(imp_value)
+
+
+class GaussianImplication(BaseImplication):
+    """
+    Implication for numeric values based on a Gaussian kernel of the
+    difference between them: claims with close values imply each other
+    positively, and claims with distant values imply each other negatively.
+
+    The implication between ``x`` and ``y`` is
+    ``2 * exp(-(x - y)^2 / (2 * sigma^2)) - 1``.
+    """
+    def __init__(self, sigma=1):
+        """
+        :param sigma: width of the kernel (default: 1). The implication is 0
+                      when ``|x - y| = sigma * sqrt(2 ln 2)``
+        """
+        if sigma <= 0:
+            raise ValueError("sigma must be positive")
+        self.sigma = sigma
+
+    def get_block(self, var, values):
+        values = np.asarray(values, dtype=float)
+        diff = values[:, np.newaxis] - values[np.newaxis, :]
+        return 2 * np.exp(-diff ** 2 / (2 * self.sigma ** 2)) - 1
+
+
+class RelativeDifferenceImplication(BaseImplication):
+    """
+    Implication for numeric values based on their relative difference
+    ``|x - y| / max(|x|, |y|)``.
+
+    The implication decreases linearly from 1 for identical values to 0 when
+    the relative difference reaches ``tolerance``, and is clipped at -1 for
+    larger differences.
+    """
+    def __init__(self, tolerance=0.1):
+        """
+        :param tolerance: relative difference at which the implication is 0
+                          (default: 0.1)
+        """
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+        self.tolerance = tolerance
+
+    def get_block(self, var, values):
+        values = np.asarray(values, dtype=float)
+        diff = np.abs(values[:, np.newaxis] - values[np.newaxis, :])
+        scale = np.maximum(np.abs(values)[:, np.newaxis],
+                           np.abs(values)[np.newaxis, :])
+        # Two zero values have relative difference 0
+        rel_diff = np.divide(
+            diff, scale, out=np.zeros_like(diff), where=(scale > 0)
+        )
+        return np.maximum(1 - rel_diff / self.tolerance, -1)
+
+
+class SparseImplication(BaseImplication):
+    """
+    Wrapper around another implication function that discards weak
+    implications, so that the implication matrix stays sparse for variables
+    with many distinct values.
+
+    For each claim only the ``top_k`` implications of largest magnitude on
+    other claims are kept, and/or only those whose magnitude is at least
+    ``threshold``. With ``top_k`` set, the number of non-zero entries in the
+    implication matrix is at most ``top_k`` times the number of claims, rather
+    than quadratic in the number of values per variable.
+    """
+    def __init__(self, implication, top_k=None, threshold=None):
+        """
+        :param implication: a :any:`BaseImplication` object, or a per-pair
+                            implication function taking ``(var, val1, val2)``
+        :param top_k:       (optional) maximum number of implications to keep
+                            for each claim
+        :param threshold:   (optional) minimum magnitude of implications to
+                            keep
+        :raises ValueError: if neither ``top_k`` nor ``threshold`` is given,
+                            or if they are invalid
+        """
+        if top_k is None and threshold is None:
+            raise ValueError("At least one of top_k and threshold is required")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        if threshold is not None and not 0 <= threshold <= 1:
+            raise ValueError("threshold must be in [0, 1]")
+        self.implication = implication
+        self.top_k = top_k
+        self.threshold = threshold
+
+    def get_full_block(self, var, values):
+        """
+        :return: the implication block computed by the wrapped implication
+                 function, with NaN on the diagonal
+        """
+        if isinstance(self.implication, BaseImplication):
+            block = np.array(
+                self.implication.get_block(var, values), dtype=float
+            )
+        else:
+            # Per-pair functions are given the original Python values rather
+            # than numpy scalars, as when used without this wrapper
+            labels = (values.tolist() if isinstance(values, np.ndarray)
+                      else list(values))
+            num = len(labels)
+            block = np.full((num, num), np.nan)
+            for i, val1 in enumerate(labels):
+                for j, val2 in enumerate(labels):
+                    if i != j:
+                        imp_value = self.implication(var, val1, val2)
+                        if imp_value is not None:
+                            block[i, j] = imp_value
+        np.fill_diagonal(block, np.nan)
+        return block
+
+    def get_block(self, var, values):
+        block = self.get_full_block(var, values)
+        # Magnitudes, with -1 for entries that are not present so that they
+        # are never preferred over genuine implications
+        magnitude = np.abs(block)
+        magnitude[np.isnan(block)] = -1
+        if self.threshold is not None:
+            block[magnitude < self.threshold] = np.nan
+        if self.top_k is not None and self.top_k < len(values) - 1:
+            # Indices of the top_k entries of largest magnitude in each row
+            top = np.argpartition(-magnitude, self.top_k - 1, axis=1)
+            keep = np.zeros(block.shape, dtype=bool)
+            np.put_along_axis(keep, top[:, :self.top_k], True, axis=1)
+            block[~keep] = np.nan
+        return block
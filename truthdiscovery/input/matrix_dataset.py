@@ -1,35 +1,204 @@
-import os
+import io
+import re
+import warnings
 
 import numpy as np
 import numpy.ma as ma
+import scipy.sparse
 
-from truthdiscovery.input.dataset import Dataset
+from truthdiscovery.input.dataset import (
+    ClaimIDMapping,
+    Dataset,
+    factorise,
+    IDMapping,
+    IdentityMapping
+)
+from truthdiscovery.utils import tracing
 
 
-def csv_to_masked_array(fileobj):
+#: Number of characters to read from a CSV file at a time
+CSV_CHUNK_SIZE = 2 ** 20
+#: Approximate number of matrix entries to convert at a time when iterating
+#: over rows (e.g. when writing a CSV file)
+BLOCK_ENTRIES = 2 ** 16
+
+WHITESPACE = " \t\r\f\v"
+BLANK_ENTRY = re.compile(r",[{}]+(?=,)".format(WHITESPACE))
+
+
+def iter_csv_blocks(fileobj, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Read a file in fixed-size chunks and yield blocks of complete lines.
+    Leading and trailing blank lines are skipped, as is leading whitespace on
+    the first line and trailing whitespace on the last.
+
+    :param fileobj:    file object to read from. Objects which are not
+                       instances of ``io.IOBase`` are read in one go
+    :param chunk_size: number of characters to read at a time
+    :yield: strings of one or more lines separated by new lines, without a
+            terminating new line
+    """
+    if not isinstance(fileobj, io.IOBase):
+        # Other objects with a read() method may not accept a size argument
+        fileobj = io.StringIO(fileobj.read())
+
+    pending = ""
+    started = False
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        text = pending + chunk
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        # Only emit lines which are followed by a non-blank line, since blank
+        # lines at the end of the file are ignored
+        cut = text.rfind("\n", 0, len(text.rstrip()))
+        if cut == -1:
+            pending = text
+            continue
+        yield text[:cut]
+        pending = text[cut + 1:]
+
+    last = pending.rstrip()
+    if last or not started:
+        yield last
+
+
+def get_row_widths(text):
+    """
+    Count the entries in each line of comma-separated values, without looping
+    over lines in python
+
+    :param text: comma-separated values, with lines separated by new lines
+    :return:     1D numpy array with the number of entries in each line
+    """
+    # Commas and new lines are single bytes in UTF-8, and bytes of multi-byte
+    # characters never match them
+    buf = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    commas = np.concatenate(([0], np.cumsum(buf == ord(","))))
+    line_ends = np.flatnonzero(buf == ord("\n"))
+    bounds = np.concatenate(([0], commas[line_ends], commas[-1:]))
+    return np.diff(bounds) + 1
+
+
+def parse_csv_values(text, count):
+    """
+    Convert comma-separated values to a flat array of floats, where empty
+    entries are converted to NaN
+
+    :param text:        comma-separated values
+    :param count:       number of entries in ``text``
+    :return:            1D numpy array of length ``count``
+    :raises ValueError: if an entry cannot be converted to a float
     """
-    Parse a CSV file and return a numpy masked array
+    # Whitespace-only entries need to be made empty so that they can be
+    # detected below
+    if any(char in text for char in WHITESPACE):
+        text = BLANK_ENTRY.sub(",", "," + text + ",")[1:-1]
+    # Replace empty entries with NaN. Two passes are required since
+    # consecutive empty entries share a comma
+    padded = "," + text + ","
+    padded = padded.replace(",,", ",nan,").replace(",,", ",nan,")
+    try:
+        with warnings.catch_warnings():
+            # Older numpy versions warn rather than raising on invalid data
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(padded[1:-1], sep=",")
+        if values.size == count:
+            return values
+    except ValueError:
+        pass
+    # Fall back to converting each entry in python, which gives the offending
+    # value in the error message
+    return np.array([float(val) if val.strip() else np.nan
+                     for val in text.split(",")])
+
+
+def index_labels(labels, size):
+    """
+    Assign IDs to integer labels in ``0, ..., size - 1``, in increasing order
+    of label and skipping labels which do not appear
+
+    :param labels: 1D numpy array of labels
+    :param size:   upper bound for labels
+    :return: a tuple ``(ids, mapping)``, where ``ids`` gives the ID of each
+             entry in ``labels`` as a 64-bit integer array and ``mapping`` is
+             an :any:`IDMapping`. If all labels appear, this is an
+             :any:`IdentityMapping`
+    """
+    # Sparse matrix indices are typically 32-bit, which is not enough to
+    # combine IDs for wide matrices without overflow
+    labels = labels.astype(np.int64, copy=False)
+    present = np.bincount(labels, minlength=size) > 0
+    if present.all():
+        return labels, IdentityMapping(size)
+    new_ids = np.cumsum(present) - 1
+    return new_ids[labels], IDMapping(np.flatnonzero(present).tolist())
+
+
+def sparse_to_masked_array(mat):
+    """
+    Convert a sparse matrix to a dense masked array, where entries which are
+    not stored in the sparse matrix are masked
+
+    :param mat: a ``scipy.sparse`` matrix
+    :return:    a 2D numpy masked array
+    """
+    coo = mat.tocoo()
+    data = np.zeros(coo.shape, dtype=coo.dtype)
+    mask = np.ones(coo.shape, dtype=bool)
+    data[coo.row, coo.col] = coo.data
+    mask[coo.row, coo.col] = False
+    return ma.masked_array(data, mask)
+
+
+def write_csv_rows(fileobj, block):
+    """
+    Write the rows of a matrix to a file in CSV format, where masked entries
+    are left empty. Each row (including the last) is terminated by a new line
+
+    :param fileobj: file object to write to
+    :param block:   2D (possibly masked) numpy array
+    """
+    cells = ma.getdata(block).astype(str)
+    cells[ma.getmaskarray(block)] = ""
+    fileobj.write("".join(",".join(row) + "\n" for row in cells.tolist()))
+
+
+def csv_to_masked_array(fileobj, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Parse a CSV file and return a numpy masked array. The file is read and
+    converted in chunks, so that the whole file is never held in memory as a
+    string. Empty entries are masked.
 
     :param fileobj:     fileobj to read from
+    :param chunk_size:  number of characters to read at a time
     :return:            a numpy masked array representing the matrix encoded by
                         the CSV
     :raises ValueError: if CSV contains values that cannot be converted to
                         floats, or if shape is invalid
     """
-    entries = []
+    blocks = []
     width = None
-    csv = fileobj.read().strip()
-    for i, line in enumerate(csv.split(os.linesep)):
-        # Split by comma and remove extra whitespace from each value
-        row = list(map(str.strip, line.split(",")))
+    num_rows = 0
+    for text in iter_csv_blocks(fileobj, chunk_size):
+        # Check every row has the same number of entries
+        widths = get_row_widths(text)
         if width is None:
-            width = len(row)
-        elif len(row) != width:
+            width = widths[0]
+        bad_rows = np.flatnonzero(widths != width)
+        if bad_rows.size > 0:
+            row = bad_rows[0]
             raise ValueError("Expected {} entries in row {}, got {}"
-                             .format(width, i + 1, len(row)))
-        entries.append([float(val) if val else np.nan for val in row])
+                             .format(width, num_rows + row + 1, widths[row]))
+
+        values = parse_csv_values(text.replace("\n", ","), len(widths) * width)
+        blocks.append(values.reshape(len(widths), width))
+        num_rows += len(widths)
 
-    matrix = np.array(entries)
+    matrix = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
     return ma.masked_array(matrix, np.isnan(matrix))
 
 
@@ -44,18 +213,193 @@ class MatrixDataset(Dataset):
 
     No entry at ``(i, j)`` means that ``s_i`` does not make any assertions
     regarding the value of ``X_j``.
+
+    The matrix may also be given as a ``scipy.sparse`` matrix, in which case
+    the entries *stored* in the matrix are the claims, and all others are
+    missing. A claimed value of 0 is represented by an explicitly stored zero
+    (note that some sparse operations, such as ``eliminate_zeros()``, remove
+    these).
     """
-    def __init__(self, sv_mat, *args, **kwargs):
+    def __init__(self, sv_mat, implication_function=None, keep_sv=True,
+                 canonicaliser=None):
         """
-        :param sv_mat: source-variables matrix as a 2D numpy array. May be a
-                       masked array to encode missing values
-        :raises ValueError: if the dimension of the input is invalid
+        :param sv_mat: source-variables matrix as a 2D numpy array, or a
+                       ``scipy.sparse`` matrix. May be a masked array to encode
+                       missing values
+        :param implication_function: see :any:`Dataset`
+        :param keep_sv: if False, do not keep a reference to ``sv_mat`` once
+                        the dataset has been built. The matrix is then
+                        reconstructed from the claims whenever :attr:`sv` is
+                        accessed (default: True)
+        :param canonicaliser: (optional) :any:`BaseCanonicaliser` object used
+                              to merge claims for equivalent values (e.g. by
+                              rounding). Canonical values must be numeric.
+                              Note that :attr:`sv` still holds the original
+                              values when ``keep_sv`` is True
+        :raises ValueError: if the dimension of the input is invalid, if a
+                            sparse matrix contains duplicate entries, or if
+                            canonical values are not numeric
         """
-        self.sv = sv_mat
-        if self.sv.ndim != 2:
+        if sv_mat.ndim != 2:
             raise ValueError("Source/variables matrix must be two dimensional")
+        self._sv = sv_mat
+        self.shape = sv_mat.shape
+        # Format of the input if sparse (e.g. 'csr'), or None if dense
+        self.sv_format = None
+        if scipy.sparse.issparse(sv_mat):
+            self.sv_format = sv_mat.format
+
+        # Rather than going through the triples one by one, compute IDs for
+        # all entries at once. Source and variable IDs follow the row and
+        # column order (skipping empty rows and columns), and claim and value
+        # IDs are assigned in order of first appearance as in
+        # :any:`Dataset`
+        trace = tracing.phases("Dataset")
+        sources, variables, values = self.get_entries()
+        sc_rows, self.source_ids = index_labels(sources, self.shape[0])
+        var_ids, self.var_ids = index_labels(variables, self.shape[1])
+        val_hashes, val_labels = factorise(values)
+        if canonicaliser is not None:
+            self.canonicaliser = canonicaliser
+            canonical = np.asarray(
+                canonicaliser.canonicalise(val_labels), dtype=float
+            )
+            canonical_hashes, val_labels = factorise(canonical)
+            val_hashes = canonical_hashes[val_hashes]
+
+        num_vals = max(len(val_labels), 1)
+        sc_cols, claims = factorise(var_ids * num_vals + val_hashes)
+        claim_vars, claim_vals = np.divmod(claims, num_vals)
 
-        super().__init__(self.get_triples(), *args, **kwargs)
+        self.val_hashes = IDMapping(val_labels)
+        self.claim_ids = ClaimIDMapping.from_arrays(claim_vars, claim_vals)
+        trace.checkpoint("read_triples", num_claims=len(claims))
+        self.build_matrices(sc_rows, sc_cols, trace, implication_function)
+        if not keep_sv:
+            self._sv = None
+
+    @property
+    def sv(self):
+        """
+        The source-variables matrix, in the same form (dense, masked or sparse)
+        as given to the constructor. If the dataset was created with
+        ``keep_sv=False``, a new copy is reconstructed on each access (see
+        :meth:`reconstruct_sv`)
+        """
+        if self._sv is None:
+            return self.reconstruct_sv()
+        return self._sv
+
+    def reconstruct_sv(self):
+        """
+        Build the source-variables matrix from the source-claims matrix, the
+        ID mappings and the table of values
+
+        :return: a masked array, or a sparse matrix if the dataset was created
+                 from one
+        """
+        rows, cols, data = self.get_claim_entries(self.sc)
+        rows = np.array(self.source_ids.inverse, dtype=int)[rows]
+        if self.sv_format is not None:
+            sparse = scipy.sparse.coo_matrix((data, (rows, cols)),
+                                             shape=self.shape)
+            return sparse.asformat(self.sv_format)
+        sv_mat = ma.masked_all(self.shape, dtype=data.dtype)
+        sv_mat[rows, cols] = data
+        return sv_mat
+
+    def get_claim_entries(self, sc):
+        """
+        :param sc: the source-claims matrix, or a block of its rows
+        :return: a tuple ``(rows, variables, values)`` of 1D numpy arrays
+                 giving the row in ``sc``, and the column and value in the
+                 source-variables matrix, of each claim made in ``sc``
+        """
+        claim_vars, claim_vals = self.claim_ids.get_arrays()
+        values = np.array(self.val_hashes.inverse)
+        sc = sc.tocoo()
+        cols = np.array(self.var_ids.inverse, dtype=int)[claim_vars[sc.col]]
+        return sc.row, cols, values[claim_vals[sc.col]]
+
+    def get_entries(self):
+        """
+        :return: a tuple ``(sources, variables, values)`` of 1D numpy arrays
+                 giving the row, column and value of each non-empty entry in
+                 the matrix, in row-major order
+        """
+        sv_mat = self.sv
+        if not scipy.sparse.issparse(sv_mat):
+            sources, variables = np.nonzero(~ma.getmaskarray(sv_mat))
+            values = ma.getdata(sv_mat)[sources, variables]
+            return sources, variables, values
+
+        coo = sv_mat.tocoo()
+        order = np.lexsort((coo.col, coo.row))
+        sources = coo.row[order]
+        variables = coo.col[order]
+        duplicates = np.flatnonzero((np.diff(sources) == 0) &
+                                    (np.diff(variables) == 0))
+        if duplicates.size > 0:
+            first = duplicates[0]
+            raise ValueError(
+                "Source '{}' claimed more than one value for variable '{}'"
+                .format(sources[first], variables[first])
+            )
+        return sources, variables, coo.data[order]
+
+    def iter_blocks(self, block_size=None):
+        """
+        :param block_size: maximum number of rows in each block (default:
+                           enough rows for roughly :data:`BLOCK_ENTRIES`
+                           entries)
+        :yield: consecutive blocks of rows of the source-variables matrix as
+                2D masked arrays. Only one block of a sparse matrix is
+                converted to dense form at a time. If the dataset was created
+                with ``keep_sv=False``, each block is rebuilt from the
+                corresponding rows of the source-claims matrix, so the whole
+                matrix is never reconstructed
+        """
+        if block_size is None:
+            block_size = max(BLOCK_ENTRIES // max(self.shape[1], 1), 1)
+        if self._sv is None:
+            yield from self.iter_reconstructed_blocks(block_size)
+            return
+
+        sv_mat = self._sv
+        if scipy.sparse.issparse(sv_mat):
+            sv_mat = sv_mat.tocsr()
+        for start in range(0, sv_mat.shape[0], block_size):
+            block = sv_mat[start:start + block_size]
+            if scipy.sparse.issparse(block):
+                yield sparse_to_masked_array(block)
+            else:
+                yield ma.asarray(block)
+
+    def iter_reconstructed_blocks(self, block_size):
+        """
+        :param block_size: number of rows in each block
+        :yield: consecutive blocks of rows of the source-variables matrix as
+                2D masked arrays, built from the source-claims matrix
+        """
+        # Rows of sc are the non-empty rows of the matrix, in order
+        source_rows = np.array(self.source_ids.inverse, dtype=int)
+        sc = self.sc.tocsr()
+        dtype = np.array(self.val_hashes.inverse).dtype
+        for start in range(0, self.shape[0], block_size):
+            end = min(start + block_size, self.shape[0])
+            first, last = np.searchsorted(source_rows, [start, end])
+            rows, cols, data = self.get_claim_entries(sc[first:last])
+            block = ma.masked_all((end - start, self.shape[1]), dtype=dtype)
+            block[source_rows[first:last][rows] - start, cols] = data
+            yield block
+
+    def iter_rows(self, block_size=None):
+        """
+        :param block_size: see :meth:`iter_blocks`
+        :yield: each row of the source-variables matrix as a 1D masked array
+        """
+        for block in self.iter_blocks(block_size):
+            yield from block
 
     def get_triples(self):
         """
@@ -63,30 +407,43 @@ class MatrixDataset(Dataset):
                 matrix. Source and variable labels are defined as their row and
                 column numbers respectively.
         """
-        for source, row in enumerate(self.sv):
-            for var, val in enumerate(row):
-                if not ma.is_masked(val):
-                    yield (source, var, val)
+        sources, variables, values = self.get_entries()
+        yield from zip(sources.tolist(), variables.tolist(), values)
 
     @classmethod
-    def from_csv(cls, fileobj):
+    def from_csv(cls, fileobj, **kwargs):
         """
         Load a matrix from a CSV file
 
         :param fileobj:     file object to read from
+        :param kwargs:      keyword arguments for the constructor (e.g.
+                            ``keep_sv``)
         :return:            a :any:`MatrixDataset` object
         :raises ValueError: if CSV is invalid
         """
         try:
-            return cls(csv_to_masked_array(fileobj))
+            return cls(csv_to_masked_array(fileobj), **kwargs)
         except ValueError as ex:
             raise ValueError("invalid matrix CSV: {}".format(ex))
 
+    def write_csv(self, fileobj, block_size=None):
+        """
+        Write the dataset to a file in CSV format. Rows are formatted and
+        written in blocks, so only one block is held in memory as strings at
+        a time
+
+        :param fileobj:    file object to write to
+        :param block_size: number of rows to format at a time (see
+                           :meth:`iter_blocks`)
+        """
+        for block in self.iter_blocks(block_size):
+            write_csv_rows(fileobj, block)
+
     def to_csv(self):
         """
         :return: a string representation of the dataset in CSV format
         """
-        return "\n".join(
-            ",".join("" if ma.is_masked(val) else str(val) for val in row)
-            for row in self.sv
-        )
+        buf = io.StringIO()
+        self.write_csv(buf)
+        # Remove the line terminator from the last row
+        return buf.getvalue()[:-1]
@@ -0,0 +1,677 @@
+"""
+Out-of-core datasets, whose matrices are stored on disk as memory-mapped CSR
+arrays and multiplied by vectors in streamed blocks of rows
+"""
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import threading
+
+import numpy as np
+import scipy.sparse
+
+from truthdiscovery.input.dataset import (
+    ClaimIDMapping,
+    Dataset,
+    IDMapping,
+    IdentityMapping
+)
+
+#: Name of the file holding ID mappings and matrix metadata for a dataset
+MANIFEST_FILENAME = "manifest.pickle"
+#: Default (approximate) number of non-zero entries in each block of rows
+DEFAULT_BLOCK_SIZE = 2 ** 20
+#: Default number of triples or matrix entries processed at a time when
+#: building a dataset
+DEFAULT_CHUNK_SIZE = 2 ** 20
+
+
+def get_matrix_path(directory, name, array_name):
+    return os.path.join(directory, "{}.{}".format(name, array_name))
+
+
+def open_array(path, dtype, size, mode="r"):
+    """
+    :return: a memory-mapped 1D array of the given size stored in ``path``.
+             Empty arrays cannot be memory-mapped, so an in-memory array is
+             returned if ``size`` is 0
+    """
+    if size == 0:
+        if mode != "r":
+            open(path, "wb").close()
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(size,))
+
+
+def save_csr(matrix, directory, name, pattern_only=False):
+    """
+    Save a sparse matrix as raw CSR arrays that can be loaded by
+    :any:`MemmapCSR`
+
+    :param matrix:       ``scipy.sparse`` matrix
+    :param directory:    directory to save the arrays in
+    :param name:         name of the matrix, used as a prefix for file names
+    :param pattern_only: if True, only store the positions of non-zero
+                         entries, and not their values (which are taken to be
+                         1)
+    :return: dict of metadata to pass to :any:`MemmapCSR`
+    """
+    matrix = scipy.sparse.csr_matrix(matrix)
+    path = get_matrix_path(directory, name, "{}")
+    matrix.indptr.astype(np.int64).tofile(path.format("indptr"))
+    matrix.indices.astype(np.int64).tofile(path.format("indices"))
+    if not pattern_only:
+        matrix.data.tofile(path.format("data"))
+    return {
+        "shape": matrix.shape,
+        "nnz": matrix.nnz,
+        "dtype": matrix.dtype.str,
+        "pattern_only": pattern_only
+    }
+
+
+class BlockOperator:
+    """
+    Base class for matrices whose products with vectors are computed without
+    holding the whole matrix in memory.
+
+    Operators support the operations the algorithms perform on dataset
+    matrices: transposition (:attr:`T`), entry-wise multiplication by a
+    vector with one entry per column (:meth:`multiply`), multiplication by a
+    scalar, addition, products with other operators, and products with
+    vectors. Apart from products with vectors, these operations build new
+    operators lazily rather than computing any entries.
+    """
+    shape = None
+    # Make numpy defer to the operators defined here, e.g. so that
+    # ``np.float64(2) * operator`` is an operator rather than an object array
+    __array_ufunc__ = None
+
+    def matvec(self, vec):
+        """
+        :param vec: 1D numpy array with one entry for each column
+        :return: the product of this matrix and ``vec``
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    def rmatvec(self, vec):
+        """
+        :param vec: 1D numpy array with one entry for each row
+        :return: the product of the transpose of this matrix and ``vec``
+        """
+        raise NotImplementedError("Must be implemented in child classes")
+
+    @property
+    def T(self):
+        return TransposedOperator(self)
+
+    def multiply(self, vec):
+        """
+        :param vec: vector with one entry for each column
+        :return: an operator for this matrix with each column multiplied by
+                 the corresponding entry of ``vec``
+        """
+        return ColumnScaledOperator(self, vec)
+
+    def __mul__(self, scalar):
+        if not np.isscalar(scalar):
+            return NotImplemented
+        return ScaledOperator(self, scalar)
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        if not isinstance(other, BlockOperator):
+            return NotImplemented
+        return SumOperator(self, other)
+
+    def __matmul__(self, other):
+        if isinstance(other, BlockOperator):
+            return ProductOperator(self, other)
+        vec = np.asarray(other)
+        if vec.shape != (self.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((self.shape[1],), vec.shape)
+            )
+        return self.matvec(vec)
+
+
+class TransposedOperator(BlockOperator):
+    def __init__(self, operator):
+        self.operator = operator
+        self.shape = operator.shape[::-1]
+
+    def matvec(self, vec):
+        return self.operator.rmatvec(vec)
+
+    def rmatvec(self, vec):
+        return self.operator.matvec(vec)
+
+    @property
+    def T(self):
+        return self.operator
+
+
+class ColumnScaledOperator(BlockOperator):
+    def __init__(self, operator, vec):
+        vec = np.asarray(vec)
+        if vec.shape != (operator.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((operator.shape[1],), vec.shape)
+            )
+        self.operator = operator
+        self.vec = vec
+        self.shape = operator.shape
+
+    def matvec(self, vec):
+        return self.operator.matvec(self.vec * vec)
+
+    def rmatvec(self, vec):
+        return self.vec * self.operator.rmatvec(vec)
+
+
+class ScaledOperator(BlockOperator):
+    def __init__(self, operator, scalar):
+        self.operator = operator
+        self.scalar = scalar
+        self.shape = operator.shape
+
+    def matvec(self, vec):
+        return self.scalar * self.operator.matvec(vec)
+
+    def rmatvec(self, vec):
+        return self.scalar * self.operator.rmatvec(vec)
+
+
+class SumOperator(BlockOperator):
+    def __init__(self, first, second):
+        if first.shape != second.shape:
+            raise ValueError(
+                "Cannot add matrices of shapes {} and {}"
+                .format(first.shape, second.shape)
+            )
+        self.first = first
+        self.second = second
+        self.shape = first.shape
+
+    def matvec(self, vec):
+        return self.first.matvec(vec) + self.second.matvec(vec)
+
+    def rmatvec(self, vec):
+        return self.first.rmatvec(vec) + self.second.rmatvec(vec)
+
+
+class ProductOperator(BlockOperator):
+    """
+    Product of two operators. The product matrix is never formed: products
+    with vectors are computed by multiplying by each operator in turn
+    """
+    def __init__(self, first, second):
+        if first.shape[1] != second.shape[0]:
+            raise ValueError(
+                "Cannot multiply matrices of shapes {} and {}"
+                .format(first.shape, second.shape)
+            )
+        self.first = first
+        self.second = second
+        self.shape = (first.shape[0], second.shape[1])
+
+    def matvec(self, vec):
+        return self.first.matvec(self.second.matvec(vec))
+
+    def rmatvec(self, vec):
+        return self.second.rmatvec(self.first.rmatvec(vec))
+
+
+class MemmapCSR(BlockOperator):
+    """
+    Sparse matrix stored on disk as memory-mapped CSR arrays (see
+    :func:`save_csr`).
+
+    Products with vectors are computed one block of rows at a time, with
+    blocks chosen to contain roughly ``block_size`` non-zero entries, so only
+    one or two blocks are held in memory at once. Products with the
+    transpose stream the same row blocks and accumulate the result, so no
+    CSC copy of the matrix is needed. If ``prefetch`` is True, the next block
+    is read by a background thread while the current one is being multiplied.
+    The thread is started on first use and reused for every product until
+    :meth:`close` is called.
+    """
+    def __init__(self, directory, name, shape, nnz, dtype, pattern_only=False,
+                 block_size=DEFAULT_BLOCK_SIZE, prefetch=True):
+        """
+        :param directory:    directory the arrays are saved in
+        :param name:         name of the matrix
+        :param shape:        shape of the matrix
+        :param nnz:          number of non-zero entries
+        :param dtype:        numpy dtype of the matrix entries
+        :param pattern_only: True if only the positions of non-zero entries
+                             are stored
+        :param block_size:   approximate number of non-zero entries in each
+                             block of rows
+        :param prefetch:     whether to read blocks in a background thread
+        """
+        if block_size < 1:
+            raise ValueError("Block size must be positive")
+        self.shape = tuple(shape)
+        self.nnz = nnz
+        self.dtype = np.dtype(dtype)
+        self.prefetch = prefetch
+        self._reader = None
+        self._lock = threading.Lock()
+        path = get_matrix_path(directory, name, "{}")
+        # Row pointers have one entry per row, so are small enough to read
+        # into memory
+        self.indptr = np.fromfile(path.format("indptr"), dtype=np.int64)
+        self.indices = open_array(path.format("indices"), np.int64, nnz)
+        self.data = None
+        if not pattern_only:
+            self.data = open_array(path.format("data"), self.dtype, nnz)
+
+        # Start a new block at the first row reaching each multiple of
+        # block_size entries
+        targets = np.arange(block_size, nnz, block_size)
+        starts = np.searchsorted(self.indptr, targets, side="left")
+        #: Row index at which each block starts, followed by the number of
+        #: rows
+        self.block_bounds = np.unique(
+            np.concatenate(([0], starts, [self.shape[0]]))
+        )
+
+    def read_block(self, index):
+        """
+        :param index: index of a block of rows
+        :return: the block as an in-memory ``scipy.sparse.csr_matrix``
+        """
+        start = self.block_bounds[index]
+        end = self.block_bounds[index + 1]
+        first = self.indptr[start]
+        last = self.indptr[end]
+        # Copy from the memory map, so that the disk is read here rather than
+        # during the product
+        indices = np.array(self.indices[first:last])
+        if self.data is None:
+            data = np.ones(last - first, dtype=self.dtype)
+        else:
+            data = np.array(self.data[first:last])
+        return scipy.sparse.csr_matrix(
+            (data, indices, self.indptr[start:end + 1] - first),
+            shape=(end - start, self.shape[1])
+        )
+
+    def get_reader(self):
+        """
+        :return: the single-threaded executor used to prefetch blocks, which is
+                 created on first use and shared by all products
+        """
+        with self._lock:
+            if self._reader is None:
+                self._reader = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="MemmapCSR"
+                )
+            return self._reader
+
+    def close(self):
+        """
+        Stop the prefetch thread, if it has been started. A new thread is
+        started if the matrix is used again
+        """
+        with self._lock:
+            reader = self._reader
+            self._reader = None
+        if reader is not None:
+            reader.shutdown()
+
+    def iter_blocks(self):
+        """
+        :yield: tuples ``(start, end, block)`` for each block of rows, where
+                ``block`` is a ``scipy.sparse.csr_matrix`` for rows ``start``
+                to ``end - 1``
+        """
+        num_blocks = len(self.block_bounds) - 1
+        bounds = self.block_bounds
+        if not self.prefetch:
+            for i in range(num_blocks):
+                yield bounds[i], bounds[i + 1], self.read_block(i)
+            return
+
+        reader = self.get_reader()
+        future = reader.submit(self.read_block, 0) if num_blocks else None
+        for i in range(num_blocks):
+            block = future.result()
+            if i + 1 < num_blocks:
+                future = reader.submit(self.read_block, i + 1)
+            yield bounds[i], bounds[i + 1], block
+
+    def matvec(self, vec):
+        result = np.zeros(self.shape[0],
+                          dtype=np.result_type(self.dtype, vec.dtype))
+        for start, end, block in self.iter_blocks():
+            result[start:end] = block @ vec
+        return result
+
+    def rmatvec(self, vec):
+        result = np.zeros(self.shape[1],
+                          dtype=np.result_type(self.dtype, vec.dtype))
+        for start, end, block in self.iter_blocks():
+            result += block.T @ vec[start:end]
+        return result
+
+    def toarray(self):
+        """
+        :return: the matrix as a dense numpy array
+        """
+        result = np.zeros(self.shape, dtype=self.dtype)
+        for start, end, block in self.iter_blocks():
+            result[start:end] = block.toarray()
+        return result
+
+
+class MemmapDataset(Dataset):
+    """
+    A dataset whose source-claims, mutual exclusion and implication matrices
+    are stored on disk as memory-mapped :any:`MemmapCSR` matrices, for
+    datasets whose matrices do not fit in memory. Only the ID mappings and
+    per-source and per-claim vectors are held in memory.
+
+    Algorithms can be run on a memory-mapped dataset as for any other dataset;
+    each matrix-vector product streams through the relevant matrix one block
+    of rows at a time. Results are the same as for a :any:`Dataset` created
+    from the same triples, up to floating point rounding.
+
+    A dataset is built in (or loaded from) a directory. When building from
+    triples, the source-claims matrix is assembled on disk: triples are read
+    in chunks, and claims are written to disk before being sorted into rows.
+    """
+    def __init__(self, directory, triples=None, allow_multiple=False,
+                 implication_function=None, canonicaliser=None,
+                 block_size=DEFAULT_BLOCK_SIZE, prefetch=True,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param directory:  directory to load the dataset from, or to build it
+                           in if ``triples`` is given
+        :param triples:    (optional) iterable of
+                           ``(source_label, var_label, value)`` to build the
+                           dataset from. Any existing dataset in
+                           ``directory`` is overwritten
+        :param allow_multiple:       see :any:`Dataset`
+        :param implication_function: see :any:`Dataset`
+        :param canonicaliser:        see :any:`Dataset`
+        :param block_size: approximate number of non-zero matrix entries in
+                           each block processed at a time
+        :param prefetch:   whether to read blocks in a background thread while
+                           the previous block is being processed
+        :param chunk_size: number of triples or matrix entries processed at a
+                           time when building the dataset
+        """
+        if triples is not None:
+            self.build(directory, triples, allow_multiple,
+                       implication_function, canonicaliser, chunk_size)
+
+        with open(os.path.join(directory, MANIFEST_FILENAME), "rb") as infile:
+            manifest = pickle.load(infile)
+        self.source_ids = manifest["source_ids"]
+        self.var_ids = manifest["var_ids"]
+        self.val_hashes = manifest["val_hashes"]
+        self.claim_ids = manifest["claim_ids"]
+        self.canonicaliser = manifest["canonicaliser"]
+        self.num_sources = len(self.source_ids)
+        self.num_variables = len(self.var_ids)
+        self.num_claims = len(self.claim_ids)
+        for name, meta in manifest["matrices"].items():
+            matrix = MemmapCSR(directory, name, block_size=block_size,
+                               prefetch=prefetch, **meta)
+            setattr(self, name, matrix)
+
+    def close(self):
+        """
+        Stop the prefetch threads of the dataset's matrices
+        """
+        for name in ("sc", "mut_ex", "imp"):
+            getattr(self, name).close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def from_dataset(cls, dataset, directory, **kwargs):
+        """
+        Save an existing dataset as a memory-mapped dataset
+
+        :param dataset:   :any:`Dataset` object
+        :param directory: directory to save the dataset in
+        :param kwargs:    passed to :any:`MemmapDataset` when loading
+        :return: a :any:`MemmapDataset` object
+        """
+        cls.save_manifest(directory, dataset, {
+            "sc": save_csr(dataset.sc, directory, "sc", pattern_only=True),
+            "mut_ex": save_csr(dataset.mut_ex, directory, "mut_ex"),
+            "imp": save_csr(dataset.imp, directory, "imp")
+        })
+        return cls(directory, **kwargs)
+
+    @classmethod
+    def save_manifest(cls, directory, dataset, matrices):
+        """
+        :param dataset:  dataset to save ID mappings for
+        :param matrices: dict of metadata for each matrix, as returned by
+                         :func:`save_csr`
+        """
+        path = os.path.join(directory, MANIFEST_FILENAME)
+        with open(path, "wb") as outfile:
+            pickle.dump({
+                "source_ids": dataset.source_ids,
+                "var_ids": dataset.var_ids,
+                "val_hashes": dataset.val_hashes,
+                "claim_ids": dataset.claim_ids,
+                "canonicaliser": dataset.canonicaliser,
+                "matrices": matrices
+            }, outfile)
+
+    def build(self, directory, triples, allow_multiple, implication_function,
+              canonicaliser, chunk_size):
+        """
+        Build a dataset from triples in ``directory``. The source-claims
+        matrix is built in three passes:
+
+        * Read the triples, assigning IDs and writing ``(source, claim)``
+          pairs to disk in chunks, and count the claims made by each source
+        * Read the pairs back, and place each claim in its source's row of a
+          memory-mapped CSR index array
+        * Scan the rows for sources making more than one claim about a
+          variable, removing all but the first if ``allow_multiple`` is set
+        """
+        self.source_ids = IDMapping()
+        self.var_ids = IDMapping()
+        self.val_hashes = IDMapping()
+        self.claim_ids = ClaimIDMapping()
+        pairs_path = get_matrix_path(directory, "sc", "pairs")
+        counts = np.zeros(0, dtype=np.int64)
+        sources = array("q")
+        claims = array("q")
+
+        def flush(counts):
+            chunk = np.stack((np.frombuffer(sources, dtype=np.int64),
+                              np.frombuffer(claims, dtype=np.int64)), axis=1)
+            chunk.tofile(pairs_file)
+            chunk_counts = np.bincount(chunk[:, 0],
+                                       minlength=len(self.source_ids))
+            chunk_counts[:len(counts)] += counts
+            del sources[:]
+            del claims[:]
+            return chunk_counts
+
+        with open(pairs_path, "wb") as pairs_file:
+            for source_label, var_label, val in triples:
+                var_id = self.var_ids.get_id(var_label)
+                val_hash = self.val_hashes.get_id(val)
+                sources.append(self.source_ids.get_id(source_label))
+                claims.append(self.claim_ids.get_id((var_id, val_hash)))
+                if len(sources) >= chunk_size:
+                    counts = flush(counts)
+            counts = flush(counts)
+
+        if IdentityMapping.matches(self.source_ids):
+            self.source_ids = IdentityMapping(len(self.source_ids))
+        if IdentityMapping.matches(self.var_ids):
+            self.var_ids = IdentityMapping(len(self.var_ids))
+
+        claim_remap = None
+        if canonicaliser is not None:
+            claim_remap = self.merge_equivalent_values(
+                canonicaliser, np.arange(len(self.claim_ids))
+            )
+
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        indices = self.sort_pairs(directory, pairs_path, indptr, claim_remap,
+                                  chunk_size)
+        os.remove(pairs_path)
+        indptr, indices = self.remove_multiple_claims(
+            directory, indptr, indices, allow_multiple, chunk_size
+        )
+        self.num_sources = len(self.source_ids)
+        self.num_variables = len(self.var_ids)
+        self.num_claims = len(self.claim_ids)
+
+        sc_path = get_matrix_path(directory, "sc", "{}")
+        indptr.tofile(sc_path.format("indptr"))
+        sc_meta = {
+            "shape": (self.num_sources, self.num_claims),
+            "nnz": int(indptr[-1]),
+            "dtype": np.dtype(int).str,
+            "pattern_only": True
+        }
+        # Claim-claim matrices only have entries for claims about the same
+        # variable, so are built in memory
+        self.mut_ex = self.get_mutual_exclusion_matrix()
+        self.imp = self.get_implication_matrix(implication_function)
+        self.save_manifest(directory, self, {
+            "sc": sc_meta,
+            "mut_ex": save_csr(self.mut_ex, directory, "mut_ex"),
+            "imp": save_csr(self.imp, directory, "imp")
+        })
+
+    def sort_pairs(self, directory, pairs_path, indptr, claim_remap,
+                   chunk_size):
+        """
+        Place claims from ``(source, claim)`` pairs saved on disk into CSR
+        rows. The order in which claims were read is kept within each row
+
+        :return: memory-mapped array of column indices
+        """
+        nnz = int(indptr[-1])
+        indices = open_array(get_matrix_path(directory, "sc", "indices"),
+                             np.int64, nnz, mode="w+")
+        # Position to write the next claim for each source
+        cursor = indptr[:-1].copy()
+        pairs = open_array(pairs_path, np.int64, 2 * nnz).reshape(-1, 2)
+        for start in range(0, nnz, chunk_size):
+            chunk = np.array(pairs[start:start + chunk_size])
+            rows = chunk[:, 0]
+            cols = chunk[:, 1]
+            if claim_remap is not None:
+                cols = claim_remap[cols]
+            order = np.argsort(rows, kind="stable")
+            sorted_rows = rows[order]
+            # Rank of each claim among the claims for its source in this chunk
+            group_starts = np.flatnonzero(
+                np.concatenate(([True], sorted_rows[1:] != sorted_rows[:-1]))
+            )
+            group_sizes = np.diff(np.append(group_starts, len(sorted_rows)))
+            ranks = np.arange(len(sorted_rows)) - np.repeat(group_starts,
+                                                            group_sizes)
+            indices[cursor[sorted_rows] + ranks] = cols[order]
+            cursor += np.bincount(rows, minlength=len(cursor))
+        del pairs
+        return indices
+
+    def remove_multiple_claims(self, directory, indptr, indices,
+                               allow_multiple, chunk_size):
+        """
+        Check for sources making more than one claim about a variable. If
+        ``allow_multiple`` is True, keep only the first such claim, and
+        discard claims that are left with no sources
+
+        :return: ``(indptr, indices)`` for the remaining claims
+        :raises ValueError: if a source makes more than one claim about a
+                            variable and ``allow_multiple`` is False
+        """
+        claim_vars, claim_vals = self.claim_ids.get_arrays()
+        num_vars = max(len(self.var_ids), 1)
+        num_rows = len(indptr) - 1
+        new_indptr = np.zeros_like(indptr)
+        written = 0
+        targets = np.arange(chunk_size, indptr[-1], chunk_size)
+        bounds = np.unique(np.concatenate((
+            [0], np.searchsorted(indptr, targets), [num_rows]
+        )))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            first = indptr[start]
+            cols = np.array(indices[first:indptr[end]])
+            rows = np.repeat(np.arange(end - start),
+                             np.diff(indptr[start:end + 1]))
+            keys = rows * num_vars + claim_vars[cols]
+            keep = np.zeros(len(keys), dtype=bool)
+            keep[np.unique(keys, return_index=True)[1]] = True
+            if not keep.all() and not allow_multiple:
+                dup = np.flatnonzero(~keep)[0]
+                raise ValueError(
+                    "Source '{}' claimed more than one value for variable '{}'"
+                    .format(self.source_ids.inverse[start + rows[dup]],
+                            self.var_ids.inverse[claim_vars[cols[dup]]])
+                )
+            # Compact in place: the write position never passes the start of
+            # the current block
+            if written != first or not keep.all():
+                indices[written:written + keep.sum()] = cols[keep]
+            new_indptr[start + 1:end + 1] = written + np.cumsum(
+                np.bincount(rows[keep], minlength=end - start)
+            )
+            written += keep.sum()
+
+        if written == indptr[-1]:
+            return indptr, indices
+
+        # Remove claims that were only made in discarded triples, and
+        # renumber the remaining claims
+        claim_counts = np.zeros(len(self.claim_ids), dtype=np.int64)
+        for start in range(0, written, chunk_size):
+            claim_counts += np.bincount(
+                indices[start:min(start + chunk_size, written)],
+                minlength=len(claim_counts)
+            )
+        has_sources = claim_counts > 0
+        new_ids = np.cumsum(has_sources) - 1
+        self.claim_ids = ClaimIDMapping.from_arrays(
+            claim_vars[has_sources], claim_vals[has_sources]
+        )
+        for start in range(0, written, chunk_size):
+            end = min(start + chunk_size, written)
+            indices[start:end] = new_ids[indices[start:end]]
+
+        path = get_matrix_path(directory, "sc", "indices")
+        indices.flush()
+        del indices
+        os.truncate(path, written * np.dtype(np.int64).itemsize)
+        return new_indptr, open_array(path, np.int64, written)
+
+    def num_connected_components(self):
+        # As for Dataset, but streaming through the rows of the source-claims
+        # matrix
+        claim_vars, _ = self.claim_ids.get_arrays()
+        seen_vars = set()
+        comps = 0
+        for _, _, block in self.sc.iter_blocks():
+            for row in range(block.shape[0]):
+                cols = block.indices[block.indptr[row]:block.indptr[row + 1]]
+                var_ids = set(claim_vars[cols].tolist())
+                if not seen_vars.intersection(var_ids):
+                    comps += 1
+                seen_vars.update(var_ids)
+        return comps
@@ -0,0 +1,605 @@
+"""
+Partition datasets into shards by variable, and run algorithms on sharded
+datasets with the matrices for each shard held in separate worker processes
+"""
+import itertools
+import multiprocessing
+import numbers
+import os
+import pickle
+import threading
+import weakref
+import zlib
+
+import numpy as np
+import scipy.sparse
+
+from truthdiscovery.input.dataset import Dataset, IdentityMapping, IDMapping
+
+#: Name of the file listing the shards and sources of a sharded dataset
+MANIFEST_FILENAME = "manifest.pickle"
+#: Number of triples buffered for each shard before they are written to disk
+SHARD_BUFFER_SIZE = 10000
+
+# Layouts of matrices split between shards. Claims are numbered shard by
+# shard, so that each shard holds a contiguous range of claim IDs
+#: ``num_sources x num_claims`` matrix: each shard holds a range of columns
+COLUMNS = "columns"
+#: ``num_claims x num_sources`` matrix: each shard holds a range of rows
+ROWS = "rows"
+#: ``num_claims x num_claims`` block diagonal matrix: each shard holds one
+#: block
+DIAGONAL = "diagonal"
+
+TRANSPOSED_LAYOUTS = {COLUMNS: ROWS, ROWS: COLUMNS, DIAGONAL: DIAGONAL}
+
+
+def get_shard_index(var_label, num_shards):
+    """
+    :param var_label:  variable label
+    :param num_shards: number of shards
+    :return: index of the shard that claims about ``var_label`` belong to.
+             This is a hash of ``repr(var_label)``, so is the same across
+             processes and runs (unlike Python's built-in :func:`hash`)
+    """
+    if (isinstance(var_label, numbers.Integral)
+            and not isinstance(var_label, bool)):
+        # Make sure numpy integers are placed with equal Python integers
+        var_label = int(var_label)
+    return zlib.crc32(repr(var_label).encode("utf-8")) % num_shards
+
+
+def get_shard_filename(index):
+    return "shard-{:04d}.pickle".format(index)
+
+
+def iter_pickled_chunks(path):
+    """
+    :yield: the items in each list pickled to a file in turn
+    """
+    with open(path, "rb") as infile:
+        while True:
+            try:
+                yield from pickle.load(infile)
+            except EOFError:
+                return
+
+
+def shard_triples(triples, directory, num_shards, **kwargs):
+    """
+    Partition a stream of triples into shards by variable, and save each shard
+    as a pickled :any:`Dataset` in ``directory``. Since all claims about a
+    variable are in the same shard, mutual exclusion and implications between
+    claims only ever relate claims within a shard.
+
+    Triples are written to disk as they are read, so that only one shard is
+    held in memory at a time.
+
+    :param triples:    iterable of ``(source_label, var_label, value)``
+    :param directory:  path to an existing directory to save shards in
+    :param num_shards: number of shards
+    :param kwargs:     passed to :any:`Dataset` for each shard
+    :return: list of paths to the shard files
+    :raises ValueError: if ``num_shards`` is not positive
+    """
+    if num_shards < 1:
+        raise ValueError("Number of shards must be positive")
+    tmp_paths = [
+        os.path.join(directory, "shard-{:04d}.triples".format(i))
+        for i in range(num_shards)
+    ]
+    buffers = [[] for _ in range(num_shards)]
+    # Record sources in order of first appearance, so that sharded datasets
+    # number sources in the same way as a single dataset would
+    sources = IDMapping()
+    tmp_files = [open(path, "wb") for path in tmp_paths]
+    try:
+        for source, var, val in triples:
+            sources.get_id(source)
+            index = get_shard_index(var, num_shards)
+            buf = buffers[index]
+            buf.append((source, var, val))
+            if len(buf) >= SHARD_BUFFER_SIZE:
+                pickle.dump(buf, tmp_files[index])
+                buf.clear()
+        for buf, tmp_file in zip(buffers, tmp_files):
+            if buf:
+                pickle.dump(buf, tmp_file)
+    finally:
+        for tmp_file in tmp_files:
+            tmp_file.close()
+
+    paths = []
+    for i, tmp_path in enumerate(tmp_paths):
+        shard = Dataset(iter_pickled_chunks(tmp_path), **kwargs)
+        path = os.path.join(directory, get_shard_filename(i))
+        with open(path, "wb") as outfile:
+            pickle.dump(shard, outfile)
+        os.remove(tmp_path)
+        paths.append(path)
+
+    with open(os.path.join(directory, MANIFEST_FILENAME), "wb") as outfile:
+        pickle.dump({
+            "shards": [os.path.basename(path) for path in paths],
+            "sources": sources.inverse
+        }, outfile)
+    return paths
+
+
+class Shard:
+    """
+    State for one shard held by a worker process: the shard's dataset, and
+    blocks of matrices computed from it
+    """
+    def __init__(self, path):
+        with open(path, "rb") as infile:
+            self.data = pickle.load(infile)
+        self.claim_offset = None
+        self.leaves = None
+        self.cache = {}
+
+    def set_sources(self, source_ids, num_sources, claim_offset):
+        """
+        :param source_ids:   array of global source IDs, indexed by the
+                             shard's source IDs
+        :param num_sources:  total number of sources across all shards
+        :param claim_offset: global ID of the shard's first claim
+        """
+        sc = self.data.sc.tocoo()
+        self.claim_offset = claim_offset
+        self.leaves = {
+            "sc": scipy.sparse.csr_matrix(
+                (sc.data, (source_ids[sc.row], sc.col)),
+                shape=(num_sources, self.data.num_claims)
+            ),
+            "mut_ex": self.data.mut_ex,
+            "imp": self.data.imp
+        }
+
+    def get_local_vector(self, vec, layout):
+        """
+        :return: the part of a vector that applies to this shard: the entries
+                 for the shard's claims if it is indexed by claims (i.e. it
+                 multiplies the columns of a matrix in ``COLUMNS`` or
+                 ``DIAGONAL`` layout), and the whole vector otherwise
+        """
+        if layout == ROWS:
+            return vec
+        end = self.claim_offset + self.data.num_claims
+        return vec[self.claim_offset:end]
+
+    def evaluate(self, expr):
+        """
+        :param expr: expression tree (see :any:`ShardedMatrix`)
+        :return: this shard's block of the matrix ``expr`` evaluates to
+        """
+        op = expr[0]
+        if op == "leaf":
+            return self.leaves[expr[1]]
+        if op == "transpose":
+            return self.evaluate(expr[1]).T.tocsr()
+        if op == "multiply":
+            _, sub_expr, vec, layout = expr
+            local_vec = self.get_local_vector(vec, layout)
+            return self.evaluate(sub_expr).multiply(local_vec).tocsr()
+        if op == "scale":
+            return self.evaluate(expr[1]) * expr[2]
+        if op == "add":
+            return self.evaluate(expr[1]) + self.evaluate(expr[2])
+        if op == "matmul":
+            return (self.evaluate(expr[1]) @ self.evaluate(expr[2])).tocsr()
+        raise ValueError("Invalid operation '{}'".format(op))
+
+    def matvec(self, token, expr, vec):
+        """
+        :param token: ID of the matrix
+        :param expr:  expression for the matrix, or None if it has already
+                      been evaluated
+        :param vec:   vector to multiply by
+        """
+        if expr is not None:
+            self.cache[token] = self.evaluate(expr)
+        return self.cache[token] @ vec
+
+    def release(self, token):
+        self.cache.pop(token, None)
+
+
+def run_worker(conn, paths):
+    """
+    Main loop for a worker process. Commands are received as tuples
+    ``(command, *args)`` from ``conn``, and replies are sent as
+    ``("ok", value)`` or ``("error", exception)``
+
+    :param conn:  connection to the parent process
+    :param paths: paths to the shards this worker holds
+    """
+    try:
+        shards = [Shard(path) for path in paths]
+        conn.send(("ok", [
+            (shard.data.source_ids.inverse, shard.data.num_claims,
+             shard.data.num_variables)
+            for shard in shards
+        ]))
+    except Exception as ex:  # pragma: no cover
+        conn.send(("error", ex))
+        return
+
+    while True:
+        command, *args = conn.recv()
+        if command == "close":
+            break
+        if command == "release":
+            for shard in shards:
+                shard.release(args[0])
+            continue
+        try:
+            if command == "sources":
+                source_ids, num_sources, offsets = args
+                for shard, ids, offset in zip(shards, source_ids, offsets):
+                    shard.set_sources(ids, num_sources, offset)
+                reply = None
+            elif command == "matvec":
+                token, expr, vectors = args
+                reply = [shard.matvec(token, expr, vec)
+                         for shard, vec in zip(shards, vectors)]
+            elif command == "beliefs":
+                reply = {}
+                for shard, belief in zip(shards, args[0]):
+                    reply.update(shard.data.get_belief_dict(belief))
+            else:
+                raise ValueError("Invalid command '{}'".format(command))
+        except Exception as ex:
+            conn.send(("error", ex))
+        else:
+            conn.send(("ok", reply))
+    conn.close()
+
+
+def shutdown_workers(conns, processes):
+    """
+    Tell worker processes to exit, and wait for them to do so
+    """
+    for conn in conns:
+        try:
+            conn.send(("close",))
+        except (OSError, ValueError):  # pragma: no cover
+            pass
+        conn.close()
+    for process in processes:
+        process.join()
+
+
+class ShardedMatrix:
+    """
+    A matrix split between the shards of a :any:`ShardedDataset`, whose blocks
+    are computed and stored in the worker processes.
+
+    The matrix is represented by an expression tree built from the dataset's
+    ``sc``, ``mut_ex`` and ``imp`` matrices. Trees are tuples
+    ``(operation, *args)``, and are evaluated for each shard the first time
+    the matrix is multiplied by a vector. The operations supported are those
+    used by the algorithms: transposition (:attr:`T`), entry-wise
+    multiplication by a vector with one entry per column (:meth:`multiply`),
+    multiplication by a scalar, addition, products of matrices whose blocks
+    line up, and products with vectors.
+
+    The transpose is cached, so that repeated products with the transpose (as
+    performed in every iteration of most algorithms) reuse the blocks already
+    evaluated in the worker processes.
+    """
+    def __init__(self, dataset, layout, shape, expr):
+        """
+        :param dataset: the :any:`ShardedDataset` the matrix belongs to
+        :param layout:  how the matrix is split between shards: one of
+                        ``COLUMNS``, ``ROWS`` or ``DIAGONAL``
+        :param shape:   shape of the matrix
+        :param expr:    expression tree
+        """
+        self.dataset = dataset
+        self.layout = layout
+        self.shape = shape
+        self.expr = expr
+        #: ID of the evaluated matrix in worker processes, or None if it has
+        #: not been evaluated yet
+        self.token = None
+        self._transpose = None
+
+    def derive(self, layout, shape, expr):
+        return ShardedMatrix(self.dataset, layout, shape, expr)
+
+    @property
+    def T(self):
+        if self._transpose is None:
+            self._transpose = self.derive(
+                TRANSPOSED_LAYOUTS[self.layout], self.shape[::-1],
+                ("transpose", self.expr)
+            )
+            self._transpose._transpose = self
+        return self._transpose
+
+    def multiply(self, vec):
+        """
+        :param vec: vector with one entry for each column
+        :return: the matrix with each column multiplied by the corresponding
+                 entry of ``vec``
+        """
+        vec = np.asarray(vec)
+        if vec.shape != (self.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((self.shape[1],), vec.shape)
+            )
+        return self.derive(
+            self.layout, self.shape,
+            ("multiply", self.expr, vec, self.layout)
+        )
+
+    def __mul__(self, scalar):
+        if not np.isscalar(scalar):
+            return NotImplemented
+        return self.derive(
+            self.layout, self.shape, ("scale", self.expr, scalar)
+        )
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        if (not isinstance(other, ShardedMatrix)
+                or other.dataset is not self.dataset
+                or other.layout != self.layout):
+            return NotImplemented
+        return self.derive(
+            self.layout, self.shape, ("add", self.expr, other.expr)
+        )
+
+    def __matmul__(self, other):
+        if isinstance(other, ShardedMatrix):
+            if other.dataset is not self.dataset:
+                return NotImplemented
+            if self.layout == DIAGONAL:
+                layout = other.layout
+            elif other.layout == DIAGONAL:
+                layout = self.layout
+            else:
+                raise NotImplementedError(
+                    "Product of {} and {} sharded matrices is not supported"
+                    .format(self.layout, other.layout)
+                )
+            return self.derive(
+                layout, (self.shape[0], other.shape[1]),
+                ("matmul", self.expr, other.expr)
+            )
+        return self.dataset.matvec(self, np.asarray(other))
+
+
+class ShardedDataset(Dataset):
+    """
+    A dataset made up of shards saved by :func:`shard_triples`. Each shard is
+    loaded by one of a pool of worker processes, which hold the matrices for
+    their shards; only vectors of trust and belief scores are held in the
+    main process.
+
+    Algorithms can be run on a sharded dataset as for any other dataset. The
+    ``sc``, ``mut_ex`` and ``imp`` attributes are :any:`ShardedMatrix`
+    objects: each product with a vector is computed shard by shard in the
+    worker processes, and the per-shard results are combined in the main
+    process (summed for per-source totals, and concatenated for per-claim
+    scores). Results are the same as for a single :any:`Dataset` of all the
+    triples, up to floating point rounding.
+
+    Claims are numbered shard by shard. Worker processes are started when the
+    dataset is created, and should be stopped with :meth:`close` (or by using
+    the dataset as a context manager).
+    """
+    def __init__(self, directory, num_workers=None):
+        """
+        :param directory:   directory that shards were saved to by
+                            :func:`shard_triples`
+        :param num_workers: (optional) number of worker processes. Default is
+                            the number of shards or CPUs, whichever is
+                            smaller
+        """
+        with open(os.path.join(directory, MANIFEST_FILENAME), "rb") as infile:
+            manifest = pickle.load(infile)
+        paths = [os.path.join(directory, name) for name in manifest["shards"]]
+        self.num_shards = len(paths)
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        num_workers = max(min(num_workers, self.num_shards), 1)
+
+        # Give each worker a contiguous range of shards, so that results
+        # from workers can be concatenated in shard order
+        self._lock = threading.RLock()
+        self._tokens = itertools.count()
+        self._pending_releases = []
+        self._conns = []
+        processes = []
+        shard_infos = []
+        mp_context = multiprocessing.get_context()
+        for worker_paths in np.array_split(paths, num_workers):
+            parent_conn, child_conn = mp_context.Pipe()
+            process = mp_context.Process(
+                target=run_worker, args=(child_conn, list(worker_paths)),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            processes.append(process)
+        self._finalizer = weakref.finalize(
+            self, shutdown_workers, self._conns, processes
+        )
+        self._shard_counts = []
+        for conn in self._conns:
+            infos = self._receive(conn)
+            self._shard_counts.append(len(infos))
+            shard_infos.extend(infos)
+
+        self.source_ids = IDMapping(manifest["sources"])
+        if IdentityMapping.matches(self.source_ids):
+            self.source_ids = IdentityMapping(len(self.source_ids))
+        claim_counts = [num_claims for _, num_claims, _ in shard_infos]
+        #: global ID of the first claim in each shard
+        self.claim_offsets = np.cumsum([0] + claim_counts[:-1])
+        self.num_sources = len(self.source_ids)
+        self.num_claims = sum(claim_counts)
+        self.num_variables = sum(num_vars for _, _, num_vars in shard_infos)
+
+        # Tell each shard the global IDs of its sources and claims
+        shard_source_ids = [
+            np.array([self.source_ids.get_id(label, insert=False)
+                      for label in labels], dtype=np.int64)
+            for labels, _, _ in shard_infos
+        ]
+        self._broadcast(
+            "sources",
+            self._split_by_worker(shard_source_ids),
+            self.num_sources,
+            self._split_by_worker(list(self.claim_offsets))
+        )
+
+        self.sc = ShardedMatrix(
+            self, COLUMNS, (self.num_sources, self.num_claims), ("leaf", "sc")
+        )
+        self.mut_ex = ShardedMatrix(
+            self, DIAGONAL, (self.num_claims, self.num_claims),
+            ("leaf", "mut_ex")
+        )
+        self.imp = ShardedMatrix(
+            self, DIAGONAL, (self.num_claims, self.num_claims),
+            ("leaf", "imp")
+        )
+
+    def _receive(self, conn):
+        status, value = conn.recv()
+        if status == "error":
+            raise value
+        return value
+
+    def _broadcast(self, command, *args):
+        """
+        Send a command to all workers and wait for replies
+
+        :param args: arguments for the command. Lists with one entry per
+                     worker are split so that each worker receives its own
+                     entry (see :meth:`_split_by_worker`)
+        :return: list of replies from each worker
+        :raises: the first error reported by any worker, once replies from all
+                 workers have been received
+        """
+        with self._lock:
+            self._flush_releases()
+            for i, conn in enumerate(self._conns):
+                conn.send((command,) + tuple(
+                    arg[i] if isinstance(arg, PerWorker) else arg
+                    for arg in args
+                ))
+            # Read every reply before raising, so that no stale replies are
+            # left in the pipes for later commands
+            replies = [conn.recv() for conn in self._conns]
+        for status, value in replies:
+            if status == "error":
+                raise value
+        return [value for _, value in replies]
+
+    def _split_by_worker(self, per_shard):
+        """
+        :param per_shard: list with one entry for each shard
+        :return: a :any:`PerWorker` list with the entries for each worker's
+                 shards
+        """
+        split = PerWorker()
+        start = 0
+        for count in self._shard_counts:
+            split.append(per_shard[start:start + count])
+            start += count
+        return split
+
+    def _flush_releases(self):
+        while self._pending_releases:
+            token = self._pending_releases.pop()
+            for conn in self._conns:
+                conn.send(("release", token))
+
+    def _release(self, token):
+        # Called when a ShardedMatrix is garbage collected. Releases are sent
+        # with the next command rather than immediately, since this may be
+        # called while another command is being sent
+        self._pending_releases.append(token)
+
+    def get_claim_slices(self, vec):
+        """
+        :param vec: vector with one entry for each claim
+        :return: list of the parts of ``vec`` for each shard
+        """
+        ends = list(self.claim_offsets[1:]) + [self.num_claims]
+        return [vec[start:end] for start, end in zip(self.claim_offsets, ends)]
+
+    def matvec(self, matrix, vec):
+        """
+        :param matrix: a :any:`ShardedMatrix` for this dataset
+        :param vec:    1D numpy array
+        :return: the product of ``matrix`` and ``vec`` as a numpy array
+        """
+        if vec.shape != (matrix.shape[1],):
+            raise ValueError(
+                "Expected vector of shape {}, got {}"
+                .format((matrix.shape[1],), vec.shape)
+            )
+        with self._lock:
+            expr = None
+            if matrix.token is None:
+                expr = matrix.expr
+                matrix.token = next(self._tokens)
+                weakref.finalize(matrix, self._release, matrix.token)
+            if matrix.layout == ROWS:
+                vectors = [vec] * self.num_shards
+            else:
+                vectors = self.get_claim_slices(vec)
+            replies = self._broadcast(
+                "matvec", matrix.token, expr, self._split_by_worker(vectors)
+            )
+        results = [res for reply in replies for res in reply]
+        if matrix.layout == COLUMNS:
+            # Sum per-source contributions from each shard
+            total = np.zeros(matrix.shape[0])
+            for res in results:
+                total += res
+            return total
+        return np.concatenate(results) if results else np.zeros(0)
+
+    def get_belief_dict(self, claim_beliefs):
+        beliefs = {}
+        replies = self._broadcast(
+            "beliefs",
+            self._split_by_worker(
+                self.get_claim_slices(np.asarray(claim_beliefs))
+            )
+        )
+        for reply in replies:
+            beliefs.update(reply)
+        return beliefs
+
+    def num_connected_components(self):
+        raise NotImplementedError(
+            "Connected components are not supported for sharded datasets"
+        )
+
+    def close(self):
+        """
+        Stop the worker processes
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PerWorker(list):
+    """
+    List of arguments for a command with one entry for each worker
+    """
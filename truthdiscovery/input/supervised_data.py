@@ -2,6 +2,7 @@ import random
 
 import numpy.ma as ma
 
+from truthdiscovery.input.canonicalisers import to_object_array
 from truthdiscovery.input.matrix_dataset import (
     csv_to_masked_array,
     MatrixDataset
@@ -17,10 +18,18 @@ class SupervisedData:
         """
         :param dataset:     a :any:`Dataset` (or sub-class) object
         :param true_values: dict of the form ``{var_label: true_value, ...}``
-                            pairs for the known true values
+                            pairs for the known true values. If the dataset
+                            was built with a canonicaliser, the true values
+                            are canonicalised in the same way
         """
         self.data = dataset
         self.values = true_values
+        canonicaliser = getattr(dataset, "canonicaliser", None)
+        if canonicaliser is not None and true_values:
+            canonical = canonicaliser.canonicalise(
+                to_object_array(true_values.values())
+            )
+            self.values = dict(zip(true_values.keys(), canonical))
 
     def get_accuracy(self, results):
         """
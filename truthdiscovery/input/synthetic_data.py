@@ -1,7 +1,12 @@
+import io
+
 import numpy as np
 import numpy.ma as ma
 
-from truthdiscovery.input.matrix_dataset import MatrixDataset
+from truthdiscovery.input.matrix_dataset import (
+    MatrixDataset,
+    write_csv_rows
+)
 from truthdiscovery.input.supervised_data import SupervisedData
 
 
@@ -87,15 +92,25 @@ class SyntheticData(SupervisedData):
         # Draw claimed value from domain with above probability distribution
         return np.random.choice(range(domain_size), p=prob_dist)
 
+    def write_csv(self, fileobj):
+        """
+        Write data and generated true values to a file in CSV format. The
+        first row contains the true values, and subsequent rows the source
+        claims
+
+        :param fileobj: file object to write to
+        """
+        true_values = ma.masked_all((1, self.data.shape[1]))
+        # var labels coincide with index in matrix here
+        true_values[0, list(self.values.keys())] = list(self.values.values())
+        write_csv_rows(fileobj, true_values)
+        self.data.write_csv(fileobj)
+
     def to_csv(self):
         """
         :return: a string representation of data and generated true values in
                  CSV format
         """
-        rows, cols = self.data.sv.shape
-        temp = ma.masked_all((rows + 1, cols))
-        for var, val in self.values.items():
-            # var labels coincide with index in matrix here
-            temp[0, var] = val
-        temp[1:, :] = self.data.sv
-        return MatrixDataset(temp).to_csv()
+        buf = io.StringIO()
+        self.write_csv(buf)
+        return buf.getvalue()[:-1]
@@ -1,2 +1,3 @@
 from truthdiscovery.output.result import Result
 from truthdiscovery.output.diff import ResultDiff
+from truthdiscovery.output.snapshot import Snapshot
@@ -9,7 +9,8 @@ class Result:
     """
     Object to hold the results of truth discovery.
     """
-    def __init__(self, trust, belief, time_taken, iterations=None):
+    def __init__(self, trust, belief, time_taken, iterations=None,
+                 history=None):
         """
         :param trust:  a mapping of the form ``{source_label: trust_val, ..}``
                        containing trust values for sources
@@ -19,11 +20,15 @@ class Result:
         :param time_taken: seconds taken to produce these results
         :param iterations: number of iterations the algorithm ran for, or None
                            if not applicable
+        :param history:    numpy structured array of per-iteration convergence
+                           history recorded by the :any:`Iterator`, or None if
+                           not recorded
         """
         self.trust = trust
         self.belief = belief
         self.time_taken = time_taken
         self.iterations = iterations
+        self.history = history
 
     def get_most_believed_values(self, var):
         """
@@ -63,7 +68,8 @@ class Result:
                 new_scores.append(copy.deepcopy(full_scores))
         new_trust, new_belief = new_scores
 
-        return Result(new_trust, new_belief, self.time_taken, self.iterations)
+        return Result(new_trust, new_belief, self.time_taken, self.iterations,
+                      history=self.history)
 
     def _get_stats(self, scores_dict):
         """
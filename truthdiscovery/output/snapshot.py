@@ -0,0 +1,35 @@
+from truthdiscovery.output.result import Result
+
+
+class Snapshot:
+    """
+    Compact record of the trust and belief scores at one iteration of an
+    iterative algorithm. Scores are kept as numpy arrays in source/claim ID
+    order, and are only converted to the (much larger) :any:`Result` format on
+    request.
+    """
+    def __init__(self, trust, belief, time_taken, iterations):
+        """
+        :param trust:      numpy array of source trust values, ordered by
+                           source ID
+        :param belief:     numpy array of claim belief values, ordered by claim
+                           ID
+        :param time_taken: seconds elapsed since the start of the run
+        :param iterations: number of iterations completed
+        """
+        self.trust = trust
+        self.belief = belief
+        self.time_taken = time_taken
+        self.iterations = iterations
+
+    def to_result(self, data):
+        """
+        :param data: the :any:`Dataset` the scores were computed for
+        :return: a :any:`Result` object
+        """
+        return Result(
+            trust=data.get_source_trust_dict(self.trust),
+            belief=data.get_belief_dict(self.belief),
+            time_taken=self.time_taken,
+            iterations=self.iterations
+        )
@@ -1,22 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 import math
 from os import path
+import pickle
 
 import numpy as np
 import pytest
+import scipy.sparse
 
 from truthdiscovery.algorithm import (
+    AlgorithmHook,
+    AutoBackend,
     AverageLog,
     BaseIterativeAlgorithm,
+    DenseBackend,
+    DenseMatrix,
     Investment,
     MajorityVoting,
     PooledInvestment,
     PriorBelief,
+    ProfiledRunContext,
+    ProfilerHook,
+    SparseBackend,
     Sums,
+    ThreadedBackend,
+    ThreadedMatrix,
     TruthFinder
 )
+from truthdiscovery.algorithm.backends import get_row_blocks
 from truthdiscovery.exceptions import EmptyDatasetError
-from truthdiscovery.input import Dataset, MatrixDataset
+from truthdiscovery.input import (
+    CollapsedDataset,
+    Dataset,
+    MatrixDataset,
+    MemmapDataset,
+    ShardedDataset,
+    SyntheticData,
+    shard_triples
+)
+from truthdiscovery.output import Snapshot
 from truthdiscovery.utils import (
     ConvergenceIterator,
     DistanceMeasures,
@@ -42,6 +64,32 @@ class BaseTest:
     def data(self, triples):
         return Dataset(triples)
 
+    def assert_same_results(self, expected_data, actual_data, alg,
+                            actual_alg=None, exact=False):
+        """
+        Run an algorithm on two datasets and check that the results agree
+
+        :param actual_alg: (optional) algorithm to run on ``actual_data``
+                           instead of ``alg``
+        :param exact:      if True, scores must be identical rather than
+                           approximately equal
+        """
+        expected = alg.run(expected_data)
+        results = (actual_alg or alg).run(actual_data)
+        assert results.iterations == expected.iterations
+        if exact:
+            assert results.trust == expected.trust
+            assert results.belief == expected.belief
+            return
+        assert results.trust.keys() == expected.trust.keys()
+        for source, trust in expected.trust.items():
+            assert results.trust[source] == pytest.approx(trust)
+        assert results.belief.keys() == expected.belief.keys()
+        for var, beliefs in expected.belief.items():
+            assert results.belief[var].keys() == beliefs.keys()
+            for val, belief in beliefs.items():
+                assert results.belief[var][val] == pytest.approx(belief)
+
 
 class TestBase(BaseTest):
     def test_empty_dataset(self):
@@ -62,11 +110,11 @@ class TestBase(BaseTest):
     def test_get_parameter_names(self):
         assert MajorityVoting.get_parameter_names() == set([])
         assert PooledInvestment.get_parameter_names() == {
-            "priors", "iterator", "g"
+            "priors", "iterator", "backend", "g"
         }
         assert TruthFinder.get_parameter_names() == {
-            "priors", "iterator", "influence_param", "dampening_factor",
-            "initial_trust"
+            "priors", "iterator", "backend", "influence_param",
+            "dampening_factor", "initial_trust"
         }
 
 
@@ -523,7 +571,6 @@ class TestTruthFinder(BaseTest):
         alg = TruthFinder(iterator=it)
         res = alg.run(data)
         # Iteration should stop after only 7 iterations, instead of 100
-        assert it.it_count == 7
         assert res.iterations == 7
 
 
@@ -607,6 +654,314 @@ class TestOnLargeData:
         self.check_results(voting, data, "voting_results.json")
 
 
+class TestCollapsedSources(BaseTest):
+    @pytest.mark.parametrize("alg", [
+        MajorityVoting(),
+        Sums(),
+        AverageLog(),
+        Investment(),
+        PooledInvestment(),
+        TruthFinder(),
+        Sums(priors=PriorBelief.VOTED),
+        Sums(iterator=ConvergenceIterator(DistanceMeasures.L1, 0.001)),
+        AverageLog(iterator=ConvergenceIterator(DistanceMeasures.L2, 0.001)),
+        Investment(iterator=ConvergenceIterator(DistanceMeasures.COSINE,
+                                                1e-6)),
+    ])
+    def test_same_results(self, alg):
+        np.random.seed(1234)
+        synth = SyntheticData(
+            np.random.uniform(size=(10,)), num_variables=30,
+            claim_probability=0.5
+        )
+        sv = synth.data.sv
+        # Add mirrors of some sources
+        mirrored = np.ma.concatenate([sv, sv[:4], sv[:2], sv[7:8]])
+        data = MatrixDataset(mirrored)
+        collapsed = CollapsedDataset(data)
+        assert collapsed.num_sources == 10
+        self.assert_same_results(data, collapsed, alg)
+
+
+def shard_implication(var, val1, val2):
+    return 0.5 if abs(val1 - val2) == 1 else None
+
+
+@pytest.fixture(scope="module")
+def shard_test_triples():
+    rng = np.random.RandomState(4321)
+    return [
+        ("source {}".format(source), var, int(rng.randint(4)))
+        for source in range(12)
+        for var in range(40)
+        if rng.uniform() < 0.5
+    ]
+
+
+@pytest.fixture(scope="module")
+def shard_test_data(shard_test_triples):
+    return Dataset(shard_test_triples, implication_function=shard_implication)
+
+
+@pytest.fixture(scope="module")
+def sharded_data(shard_test_triples, tmpdir_factory):
+    directory = str(tmpdir_factory.mktemp("shards"))
+    shard_triples(
+        shard_test_triples, directory, 5,
+        implication_function=shard_implication
+    )
+    with ShardedDataset(directory, num_workers=2) as data:
+        yield data
+
+
+class TestShardedDataset(BaseTest):
+    @pytest.mark.parametrize("alg", [
+        MajorityVoting(),
+        Sums(),
+        AverageLog(),
+        Investment(),
+        PooledInvestment(),
+        TruthFinder(),
+        TruthFinder(iterator=FixedIterator(10)),
+        Sums(priors=PriorBelief.VOTED),
+        Investment(priors=PriorBelief.UNIFORM),
+    ])
+    def test_same_results(self, alg, shard_test_data, sharded_data):
+        assert sharded_data.num_sources == shard_test_data.num_sources
+        assert sharded_data.num_claims == shard_test_data.num_claims
+        self.assert_same_results(shard_test_data, sharded_data, alg)
+
+
+class TestMemmapDataset(BaseTest):
+    @pytest.mark.parametrize("alg", [
+        MajorityVoting(),
+        Sums(),
+        AverageLog(),
+        Investment(),
+        PooledInvestment(),
+        TruthFinder(),
+        TruthFinder(iterator=FixedIterator(10)),
+        Sums(priors=PriorBelief.VOTED),
+        Investment(priors=PriorBelief.UNIFORM),
+    ])
+    @pytest.mark.parametrize("prefetch", [True, False])
+    def test_same_results(self, alg, prefetch, shard_test_triples,
+                          shard_test_data, tmpdir):
+        memmap = MemmapDataset(
+            str(tmpdir), shard_test_triples,
+            implication_function=shard_implication, block_size=20,
+            prefetch=prefetch
+        )
+        assert len(memmap.sc.block_bounds) > 2
+        self.assert_same_results(shard_test_data, memmap, alg)
+
+
+class TestBackends(BaseTest):
+    def test_row_blocks(self):
+        mat = scipy.sparse.csr_matrix(np.array([
+            [1, 1, 1, 1],
+            [0, 0, 0, 0],
+            [1, 0, 0, 0],
+            [0, 1, 0, 0],
+            [0, 0, 1, 1],
+            [1, 1, 1, 1]
+        ]))
+        blocks = get_row_blocks(mat, 3)
+        assert [(start, end) for start, end, _ in blocks] == [
+            (0, 1), (1, 5), (5, 6)
+        ]
+        assert [block.nnz for _, _, block in blocks] == [4, 4, 4]
+        # Blocks should not copy the matrix data
+        assert np.shares_memory(blocks[1][2].indices, mat.indices)
+        # Blocks should cover all rows, even with more blocks than rows
+        many = get_row_blocks(mat, 100)
+        assert many[0][0] == 0 and many[-1][1] == 6
+        assert all(end == next_start for (_, end, _), (next_start, _, _)
+                   in zip(many, many[1:]))
+        assert sum(block.nnz for _, _, block in many) == mat.nnz
+        assert len(get_row_blocks(mat, 1)) == 1
+
+    def test_prepare(self, tmpdir):
+        data = Dataset([("s1", "x", 1), ("s2", "x", 2), ("s2", "y", 3)])
+        assert SparseBackend().prepare(data) is data
+
+        backend = ThreadedBackend(num_threads=2)
+        view = backend.prepare(data)
+        assert view is not data
+        assert isinstance(data.sc, scipy.sparse.spmatrix)
+        for name in ("sc", "mut_ex", "imp"):
+            assert isinstance(getattr(view, name), ThreadedMatrix)
+        assert view.sc.T.T is view.sc
+        assert view.get_belief_dict([1, 2, 3]) == data.get_belief_dict(
+            [1, 2, 3]
+        )
+        # Datasets whose matrices are not scipy matrices are left alone
+        memmap = MemmapDataset.from_dataset(data, str(tmpdir))
+        assert backend.prepare(memmap) is memmap
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ThreadedBackend(num_threads=0)
+        with pytest.raises(ValueError):
+            ThreadedBackend(min_block_size=0)
+        assert ThreadedBackend().num_threads >= 1
+
+    def test_threaded_matrix(self):
+        mat = scipy.sparse.random(50, 30, density=0.2, format="csr",
+                                  random_state=np.random.RandomState(1))
+        mat2 = scipy.sparse.random(30, 30, density=0.2, format="csr",
+                                   random_state=np.random.RandomState(2))
+        backend = ThreadedBackend(num_threads=4, min_block_size=1)
+        threaded = backend.convert(mat)
+        threaded2 = backend.convert(mat2)
+        assert len(threaded.get_blocks()) == 4
+        vec = np.random.uniform(size=(30,))
+        rvec = np.random.uniform(size=(50,))
+        assert np.array_equal(threaded @ vec, mat @ vec)
+        assert np.array_equal(threaded.T @ rvec, mat.T @ rvec)
+        assert np.array_equal(threaded.multiply(vec) @ vec,
+                              mat.multiply(vec) @ vec)
+        assert np.array_equal(
+            (threaded.T + np.float64(0.5) * (threaded2.T @ threaded.T)) @ rvec,
+            (mat.T + 0.5 * (mat2.T @ mat.T)) @ rvec
+        )
+        with pytest.raises(ValueError):
+            threaded @ rvec
+
+        # Backends should survive being copied (e.g. to worker processes)
+        backend.get_executor()
+        clone = pickle.loads(pickle.dumps(backend))
+        assert clone.num_threads == 4
+        assert np.array_equal(clone.convert(mat) @ vec, mat @ vec)
+
+        # Pools can be shut down, and are created again if needed
+        executor = backend.get_executor()
+        backend.shutdown()
+        assert backend.get_executor() is not executor
+        assert np.array_equal(threaded @ vec, mat @ vec)
+        backend.shutdown()
+        backend.shutdown()
+
+    @pytest.mark.parametrize("alg_cls", [
+        Sums, AverageLog, Investment, PooledInvestment, TruthFinder
+    ])
+    def test_same_results(self, alg_cls, shard_test_data):
+        backend = ThreadedBackend(num_threads=3, min_block_size=1)
+        # Rows are computed exactly as for a single product, so results
+        # should be identical
+        self.assert_same_results(
+            shard_test_data, shard_test_data,
+            alg_cls(iterator=FixedIterator(10), backend=SparseBackend()),
+            actual_alg=alg_cls(iterator=FixedIterator(10), backend=backend),
+            exact=True
+        )
+
+    def test_dense_matrix(self):
+        mat = scipy.sparse.random(50, 30, density=0.2, format="csr",
+                                  random_state=np.random.RandomState(1))
+        mat2 = scipy.sparse.random(30, 30, density=0.2, format="csr",
+                                   random_state=np.random.RandomState(2))
+        dense = DenseBackend().convert(mat)
+        dense2 = DenseBackend().convert(mat2)
+        assert isinstance(dense, DenseMatrix)
+        assert dense.shape == (50, 30)
+        assert dense.nnz == mat.nnz
+        vec = np.random.uniform(size=(30,))
+        rvec = np.random.uniform(size=(50,))
+        assert np.allclose(dense @ vec, mat @ vec)
+        assert np.allclose(dense.T @ rvec, mat.T @ rvec)
+        assert np.allclose(dense.multiply(vec) @ vec, mat.multiply(vec) @ vec)
+        assert np.allclose(
+            (dense.T + np.float64(0.5) * (dense2.T @ dense.T)) @ rvec,
+            (mat.T + 0.5 * (mat2.T @ mat.T)) @ rvec
+        )
+        with pytest.raises(ValueError):
+            dense @ rvec
+
+        # Zero entries should stay zero when multiplied by infinity, as for
+        # sparse matrices
+        sc = scipy.sparse.csr_matrix(np.array([[1, 0], [0, 0]]))
+        weights = np.array([[2], [np.inf]])
+        assert np.array_equal(
+            DenseBackend().convert(sc).multiply(weights).toarray(),
+            sc.multiply(weights).toarray()
+        )
+
+    def test_dense_prepare(self):
+        data = Dataset([("s1", "x", 1), ("s2", "x", 2), ("s2", "y", 3)])
+        backend = DenseBackend()
+        view = backend.prepare(data)
+        assert view.sc.shape == (2, 3)
+        # Matrices are only converted when used
+        assert not any(getattr(view, name).is_converted()
+                       for name in ("sc", "mut_ex", "imp"))
+        Sums(iterator=FixedIterator(3), backend=backend).run(data)
+        assert view.sc.is_converted()
+        assert not view.mut_ex.is_converted()
+        assert not view.imp.is_converted()
+        # Conversions are cached for each dataset
+        assert backend.prepare(data) is view
+        other = Dataset([("s1", "x", 1)])
+        assert backend.prepare(other) is not view
+        data.sc = data.sc.copy()
+        assert backend.prepare(data) is not view
+
+        clone = pickle.loads(pickle.dumps(backend))
+        assert isinstance(clone.prepare(data).sc, DenseMatrix)
+
+    @pytest.mark.parametrize("alg_cls", [
+        Sums, AverageLog, Investment, PooledInvestment, TruthFinder
+    ])
+    def test_dense_same_results(self, alg_cls, shard_test_data):
+        # Summation order differs from sparse products, so results agree up
+        # to rounding only
+        self.assert_same_results(
+            shard_test_data, shard_test_data,
+            alg_cls(iterator=FixedIterator(10), backend=SparseBackend()),
+            actual_alg=alg_cls(
+                iterator=FixedIterator(10), backend=DenseBackend()
+            )
+        )
+
+    def test_auto(self, tmpdir):
+        data = Dataset([("s1", "x", 1), ("s2", "x", 2), ("s2", "y", 3)])
+        # 2 sources, 3 claims: dense size is 2 * 3 + 2 * 3 * 3 = 24
+        assert AutoBackend(small_size=24).use_dense(data)
+        assert not AutoBackend(small_size=23, max_size=23).use_dense(data)
+        # Density of sc is 1/2
+        assert AutoBackend(small_size=0, min_density=0.5).use_dense(data)
+        assert not AutoBackend(small_size=0, min_density=0.6).use_dense(data)
+        assert isinstance(AutoBackend().prepare(data).sc, DenseMatrix)
+        assert AutoBackend(small_size=0, max_size=0).prepare(data) is data
+        threaded = AutoBackend(
+            small_size=0, max_size=0, fallback=ThreadedBackend(num_threads=2)
+        )
+        assert isinstance(threaded.prepare(data).sc, ThreadedMatrix)
+        # Datasets whose matrices are not scipy matrices use the fallback
+        memmap = MemmapDataset.from_dataset(data, str(tmpdir))
+        assert not AutoBackend().use_dense(memmap)
+        assert AutoBackend().prepare(memmap) is memmap
+        assert isinstance(Sums().backend, AutoBackend)
+
+    def test_auto_convert(self):
+        # 3 x 2 matrix with density 1/2
+        mat = scipy.sparse.csr_matrix(np.array([[1, 0], [0, 0], [1, 1]]))
+        assert isinstance(AutoBackend().convert(mat), DenseMatrix)
+        assert AutoBackend(small_size=5, max_size=5).convert(mat) is mat
+        assert isinstance(
+            AutoBackend(small_size=0, min_density=0.5).convert(mat),
+            DenseMatrix
+        )
+        threaded = AutoBackend(
+            small_size=0, min_density=0.6,
+            fallback=ThreadedBackend(num_threads=2)
+        )
+        assert isinstance(threaded.convert(mat), ThreadedMatrix)
+        assert np.array_equal(threaded.convert(mat).toarray(), mat.toarray())
+        vec = np.array([1, 2])
+        assert np.array_equal(AutoBackend().convert(mat) @ vec, [1, 0, 3])
+
+
 class TestIteratorsForAlgorithms:
     def test_default_iterator_types(self):
         test_data = {
@@ -623,6 +978,143 @@ class TestIteratorsForAlgorithms:
                 assert isinstance(obj.iterator, it_cls), err_msg
 
 
+class TestRunContext(BaseTest):
+    def test_iterator_not_modified(self, data):
+        it = FixedIterator(5)
+        alg = Sums(iterator=it)
+        res = alg.run(data)
+        assert res.iterations == 5
+        assert it.it_count == 0
+        assert alg.iterator is it
+
+    def test_shared_iterator(self, data):
+        # Iterator shared between algorithm objects should not cause runs to
+        # interfere with each other
+        it = FixedIterator(7)
+        sums = Sums(iterator=it)
+        avlog = AverageLog(iterator=it)
+        assert sums.run(data).iterations == 7
+        assert avlog.run(data).iterations == 7
+
+    def test_concurrent_runs(self, data):
+        alg = TruthFinder(iterator=FixedIterator(30))
+        expected = alg.run(data)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            all_results = list(pool.map(alg.run, [data] * 16))
+        for res in all_results:
+            assert res.iterations == 30
+            assert res.trust == expected.trust
+            assert res.belief == expected.belief
+
+
+class TestConvergenceHistory(BaseTest):
+    def test_no_history(self, data):
+        assert Sums().run(data).history is None
+
+    def test_history(self, data):
+        it = ConvergenceIterator(DistanceMeasures.L2, 0.001,
+                                 record_history=True)
+        alg = Sums(iterator=it)
+        res = alg.run(data)
+        assert len(res.history) == res.iterations
+        assert res.history["distance"][-1] < 0.001
+        assert np.all(res.history["distance"][:-1] >= 0.001)
+
+        # Check deltas against partial results
+        snapshots = list(alg.run_iter(data))
+        for i, entry in enumerate(res.history):
+            prev, current = snapshots[i], snapshots[i + 1]
+            exp_trust_delta = np.max(np.abs(current.trust - prev.trust))
+            exp_belief_delta = np.max(np.abs(current.belief - prev.belief))
+            assert np.isclose(entry["trust_delta"], exp_trust_delta)
+            assert np.isclose(entry["belief_delta"], exp_belief_delta)
+
+
+class TestHooks(BaseTest):
+    class RecordingHook(AlgorithmHook):
+        def __init__(self):
+            self.events = []
+
+        def on_start(self, algorithm, data):
+            self.events.append(("start", algorithm, data))
+
+        def on_iteration(self, state):
+            self.events.append(("iteration", state.iteration))
+
+        def on_finish(self, state):
+            self.events.append(("finish", state.iteration))
+
+    def test_no_hooks(self, data):
+        alg = Sums()
+        assert not alg.hooks
+        ctx = alg.get_context(data)
+        assert not isinstance(ctx, ProfiledRunContext)
+        assert ctx.pop_timings() is None
+
+    def test_hook_calls(self, data):
+        alg = Sums(iterator=FixedIterator(3))
+        hook = self.RecordingHook()
+        alg.add_hook(hook)
+        res = alg.run(data)
+        assert hook.events == [
+            ("start", alg, data),
+            ("iteration", 0),
+            ("iteration", 1),
+            ("iteration", 2),
+            ("iteration", 3),
+            ("finish", 3),
+        ]
+
+        # Hooks should not affect results
+        alg.remove_hook(hook)
+        assert not alg.hooks
+        res2 = alg.run(data)
+        assert res.trust == res2.trust
+        assert res.belief == res2.belief
+
+        with pytest.raises(ValueError):
+            alg.remove_hook(hook)
+
+    def test_hooks_with_run_iter(self, data):
+        alg = Sums(iterator=FixedIterator(4))
+        hook = self.RecordingHook()
+        alg.add_hook(hook)
+        _snapshots = list(alg.run_iter(data, every=3))
+        assert [e[0] for e in hook.events] == (
+            ["start"] + ["iteration"] * 5 + ["finish"]
+        )
+
+    def test_hooks_not_shared(self, data):
+        alg1 = Sums()
+        alg2 = Sums()
+        alg1.add_hook(self.RecordingHook())
+        assert len(alg1.hooks) == 1
+        assert not alg2.hooks
+
+    def test_profiler(self, data):
+        alg_classes = [AverageLog, Investment, PooledInvestment, Sums,
+                       TruthFinder]
+        for cls in alg_classes:
+            profiler = ProfilerHook()
+            alg = cls(iterator=FixedIterator(5))
+            alg.add_hook(profiler)
+            alg.run(data)
+
+            summary = profiler.get_summary()
+            for phase in ("setup", "spmv", "compare", "output", "result"):
+                assert phase in summary
+                assert summary[phase]["total_ns"] >= 0
+            assert summary["spmv"]["count"] == 5
+            assert summary["setup"]["count"] == 1
+            assert np.isclose(sum(p["fraction"] for p in summary.values()), 1)
+            assert len(profiler.iteration_timings) == 6
+            assert profiler.runs == 1
+            assert profiler.total_run_ns > 0
+
+            profiler.reset()
+            assert profiler.get_summary() == {}
+
+
 class TestLoggingAlgorithm(BaseTest):
     @pytest.fixture
     def alg_classes(self):
@@ -640,24 +1132,56 @@ class TestLoggingAlgorithm(BaseTest):
             # Iterate through partial results, and check the final result is as
             # expected
             last_res = None
-            for r in alg.run_iter(data):
+            for r in alg.run_iter(data, as_results=True):
                 last_res = r
 
             assert last_res.trust == final_res.trust
             assert last_res.belief == final_res.belief
             assert last_res.iterations == final_res.iterations
 
-    def test_no_logging(self, algs, data):
-        for alg in algs:
-            _res = alg.run(data)
-            assert alg.results_log is None
+    def test_snapshots(self, alg_classes, data):
+        for cls in alg_classes:
+            alg = cls(iterator=FixedIterator(4))
+            snapshots = list(alg.run_iter(data))
+            assert [s.iterations for s in snapshots] == [0, 1, 2, 3, 4]
+            for snap in snapshots:
+                assert isinstance(snap, Snapshot)
+                assert snap.trust.shape == (data.num_sources,)
+                assert snap.belief.shape == (data.num_claims,)
+
+            final_res = alg.run(data)
+            last_res = snapshots[-1].to_result(data)
+            assert last_res.trust == final_res.trust
+            assert last_res.belief == final_res.belief
+            assert last_res.iterations == final_res.iterations
+
+    def test_subsampling(self, data):
+        alg = Sums(iterator=FixedIterator(10))
+        its = [s.iterations for s in alg.run_iter(data, every=3)]
+        # Final iteration should be included
+        assert its == [0, 3, 6, 9, 10]
+        its = [s.iterations for s in alg.run_iter(data, every=5)]
+        assert its == [0, 5, 10]
+        with pytest.raises(ValueError):
+            list(alg.run_iter(data, every=0))
+
+    def test_lazy(self, data):
+        # First result should be available before iteration finishes: use an
+        # iterator that would never finish
+        it = ConvergenceIterator(DistanceMeasures.L1, 0, limit=10 ** 9)
+        gen = Sums(iterator=it).run_iter(data)
+        first = next(gen)
+        second = next(gen)
+        assert first.iterations == 0
+        assert second.iterations == 1
+        gen.close()
 
     def test_partial_results(self, alg_classes, data):
         it = FixedIterator(3)
         for cls in alg_classes:
             alg = cls(iterator=it)
 
-            log = list(alg.run_iter(data))
+            log = list(alg.run_iter(data, as_results=True))
             assert len(log) == 4
             initial, first, second, third = log
 
@@ -674,8 +1198,10 @@ class TestLoggingAlgorithm(BaseTest):
 
     def test_sums_detailed(self, data):
         it = FixedIterator(3)
-        alg = Sums(iterator=it, priors=PriorBelief.FIXED)
-        initial, first, second, third = alg.run_iter(data)
+        # Compare exactly with hand-computed scores, so use sparse products
+        alg = Sums(iterator=it, priors=PriorBelief.FIXED,
+                   backend=SparseBackend())
+        initial, first, second, third = alg.run_iter(data, as_results=True)
 
         assert initial.belief == {
             "x": {"one": 0.5},
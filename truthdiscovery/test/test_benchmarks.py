@@ -0,0 +1,590 @@
+from io import StringIO
+import json
+import threading
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from truthdiscovery.algorithm import MajorityVoting, Sums, TruthFinder
+from truthdiscovery.benchmarks import (
+    BenchmarkRunner,
+    cheapest_configuration,
+    compare_reports,
+    DenseBenchmark,
+    find_crossover,
+    get_agreement,
+    get_environment,
+    get_max_difference,
+    ImplicationBenchmark,
+    load_report,
+    make_key,
+    measure_memory,
+    MemoryBenchmark,
+    pareto_frontier,
+    ParetoBenchmark,
+    save_report,
+    ScalingBenchmark,
+    split_components,
+    summarise,
+    TimingBenchmark
+)
+from truthdiscovery.benchmarks.scaling import (
+    block_diagonal_sv,
+    default_worker_counts
+)
+from truthdiscovery.benchmarks.__main__ import main
+from truthdiscovery.output import Result
+from truthdiscovery.utils import FixedIterator
+
+
+class TestRunner:
+    def test_summarise(self):
+        stats = summarise([3, 1, 2])
+        assert stats["min"] == 1
+        assert stats["max"] == 3
+        assert stats["mean"] == 2
+        assert stats["median"] == 2
+        assert stats["stdev"] == 1
+        assert stats["repeat"] == 3
+        assert summarise([5])["stdev"] == 0
+
+    def test_make_key(self):
+        assert make_key("run", b=2, a=1) == "run/a=1/b=2"
+        assert make_key("build") == "build"
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            BenchmarkRunner(repeat=0)
+        with pytest.raises(ValueError):
+            BenchmarkRunner(warmup=-1)
+
+    def test_measure(self):
+        times = iter(range(100))
+        calls = []
+        runner = BenchmarkRunner(
+            repeat=3, warmup=2, timer=lambda: next(times)
+        )
+        stats = runner.measure(lambda: calls.append(1))
+        assert len(calls) == 5
+        assert stats["repeat"] == 3
+        # Each call is timed as taking 1 'second' with the fake timer
+        assert stats["min"] == stats["max"] == 1
+
+    def test_setup(self):
+        runner = BenchmarkRunner(repeat=2, warmup=1)
+        args = []
+        setup_values = iter(range(10))
+        runner.measure(args.append, setup=lambda: next(setup_values))
+        assert args == [0, 1, 2]
+
+    def test_environment(self, monkeypatch):
+        monkeypatch.setenv("OMP_NUM_THREADS", "3")
+        env = get_environment()
+        for key in ("python", "numpy", "scipy", "cpu_count", "platform"):
+            assert key in env
+        assert env["thread_settings"]["OMP_NUM_THREADS"] == "3"
+        json.dumps(env)
+
+
+class TestTimingBenchmark:
+    @pytest.fixture
+    def report(self):
+        bench = TimingBenchmark(
+            sizes=[(5, 6)],
+            claim_probabilities=[0.5],
+            algorithms={
+                "sums": Sums(iterator=FixedIterator(5)),
+                "voting": MajorityVoting()
+            },
+            runner=BenchmarkRunner(repeat=2, warmup=0)
+        )
+        return bench.run()
+
+    def test_report(self, report):
+        assert report["benchmark"] == "timing"
+        assert report["repeat"] == 2
+        assert report["config"]["algorithms"] == ["sums", "voting"]
+        stages = [res["stage"] for res in report["results"]]
+        assert stages == [
+            "build", "convert", "run", "accuracy", "run", "accuracy", "render"
+        ]
+        run_res = report["results"][2]
+        assert run_res["params"] == {
+            "num_sources": 5, "num_variables": 6, "claim_probability": 0.5,
+            "algorithm": "sums"
+        }
+        assert run_res["iterations"] == 5
+        assert run_res["num_claims"] > 0
+        assert run_res["stats"]["repeat"] == 2
+        assert 0 <= report["results"][3]["accuracy"] <= 1
+        keys = [res["key"] for res in report["results"]]
+        assert len(set(keys)) == len(keys)
+
+    def test_no_render_for_large_data(self):
+        bench = TimingBenchmark(
+            sizes=[(5, 5)], claim_probabilities=[1], algorithms={},
+            max_render_nodes=5, runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        stages = [res["stage"] for res in bench.run()["results"]]
+        assert stages == ["build", "convert"]
+
+    def test_save_load(self, report):
+        buf = StringIO()
+        save_report(report, buf)
+        buf.seek(0)
+        assert load_report(buf) == json.loads(json.dumps(report))
+
+
+class TestMemoryBenchmark:
+    def test_measure_memory(self):
+        size = 10 ** 6
+        value, stats = measure_memory(lambda: np.ones(size))
+        assert value.shape == (size,)
+        # The array is retained, and must have been allocated at some point
+        # (allow some leeway for unrelated objects being freed)
+        assert stats["retained_bytes"] >= 0.9 * value.nbytes
+        assert stats["peak_bytes"] >= 0.9 * value.nbytes
+
+        # Temporary allocations count towards peak but are not retained
+        _, stats = measure_memory(lambda: np.ones(size).sum())
+        assert stats["peak_bytes"] >= 0.9 * size * 8
+        assert stats["retained_bytes"] < 0.1 * size * 8
+
+    def test_report(self):
+        bench = MemoryBenchmark(
+            sizes=[(5, 6)],
+            claim_probabilities=[0.5],
+            algorithms={"sums": Sums(iterator=FixedIterator(5))}
+        )
+        report = bench.run()
+        assert report["benchmark"] == "memory"
+        stages = [res["stage"] for res in report["results"]]
+        assert stages == ["build", "convert", "run", "render"]
+        for res in report["results"]:
+            stats = res["stats"]
+            assert stats["peak_bytes"] > 0
+            assert stats["peak_bytes"] >= stats["retained_bytes"]
+            assert stats["peak_bytes_per_claim"] == pytest.approx(
+                stats["peak_bytes"] / res["num_claims"]
+            )
+        # Built dataset should be retained
+        assert report["results"][0]["stats"]["retained_bytes"] > 0
+
+
+class TestScalingBenchmark:
+    def test_worker_counts(self, monkeypatch):
+        monkeypatch.setattr("os.cpu_count", lambda: 6)
+        assert default_worker_counts() == [1, 2, 4, 6]
+        monkeypatch.setattr("os.cpu_count", lambda: 1)
+        assert default_worker_counts() == [1]
+
+        # One worker should always be included
+        bench = ScalingBenchmark(worker_counts=[4, 2])
+        assert bench.worker_counts == [1, 2, 4]
+
+    def test_invalid_executor(self):
+        with pytest.raises(ValueError):
+            ScalingBenchmark(executor="gpu")
+
+    def test_split_components(self):
+        block1 = ma.masked_values([[1, 2], [0, 3]], 0)
+        block2 = ma.masked_values([[4, 0, 5]], 0)
+        sv = block_diagonal_sv([block1, block2])
+        assert sv.shape == (3, 5)
+        assert ma.getmaskarray(sv)[0:2, 2:].all()
+        shards = split_components(sv)
+        assert len(shards) == 2
+        assert np.array_equal(shards[0].sv, block1)
+        # Variable with no claims should be ignored
+        assert np.array_equal(shards[1].sv, ma.masked_values([[4, 5]], 0))
+        assert sum(shard.num_claims for shard in shards) == 5
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_report(self, executor):
+        bench = ScalingBenchmark(
+            worker_counts=[2],
+            component_size=(4, 4),
+            num_components=3,
+            claim_probability=0.5,
+            algorithms={"voting": MajorityVoting()},
+            batch_size=2,
+            executor=executor,
+            spmv_products=2,
+            runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        report = bench.run()
+        assert report["benchmark"] == "scaling"
+        keys = [res["key"] for res in report["results"]]
+        assert keys == [
+            "components/algorithm=voting/workers=1",
+            "components/algorithm=voting/workers=2",
+            "batch/algorithm=voting/workers=1",
+            "batch/algorithm=voting/workers=2",
+            "spmv/workers=1",
+            "spmv/workers=2"
+        ]
+        for res in report["results"]:
+            assert res["num_shards"] == 3
+            assert res["efficiency"] == pytest.approx(
+                res["speedup"] / res["params"]["workers"]
+            )
+            if res["params"]["workers"] == 1:
+                assert res["speedup"] == 1
+
+    def test_backend_mode(self):
+        bench = ScalingBenchmark(
+            worker_counts=[2],
+            component_size=(4, 4),
+            num_components=2,
+            claim_probability=0.5,
+            algorithms={"voting": MajorityVoting(), "sums": Sums()},
+            batch_size=1,
+            spmv_products=1,
+            min_block_size=1,
+            runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        threads_before = set(threading.enumerate())
+        report = bench.run()
+        # Thread pools for each number of workers should be shut down
+        assert not [thread for thread in threading.enumerate()
+                    if thread not in threads_before
+                    and thread.name.startswith("ThreadedBackend")]
+        keys = [res["key"] for res in report["results"]
+                if res["stage"] == "backend"]
+        # Majority voting is not iterative, so has no backend
+        assert keys == [
+            "backend/algorithm=sums/workers=1",
+            "backend/algorithm=sums/workers=2"
+        ]
+        assert report["config"]["min_block_size"] == 1
+
+
+class TestParetoBenchmark:
+    def test_frontier(self):
+        results = [
+            {"key": "a", "time": 1, "accuracy": 0.5},
+            {"key": "b", "time": 2, "accuracy": 0.4},
+            {"key": "c", "time": 2, "accuracy": 0.7},
+            {"key": "d", "time": 3, "accuracy": 0.7},
+            {"key": "e", "time": 0.5, "accuracy": 0.3},
+            {"key": "f", "time": 4, "accuracy": 0.9},
+        ]
+        frontier = pareto_frontier(results)
+        assert [res["key"] for res in frontier] == ["e", "a", "c", "f"]
+
+        assert cheapest_configuration(frontier, 0.6)["key"] == "c"
+        assert cheapest_configuration(frontier, 0.7)["key"] == "c"
+        assert cheapest_configuration(frontier, 0)["key"] == "e"
+        assert cheapest_configuration(frontier, 0.95) is None
+
+    def test_invalid_iterator(self):
+        with pytest.raises(ValueError):
+            ParetoBenchmark(iterators=["blah-5"])
+
+    def test_report(self):
+        bench = ParetoBenchmark(
+            sizes=[(6, 8)],
+            claim_probabilities=[0.7],
+            algorithms={
+                "sums": Sums(),
+                "truthfinder": TruthFinder(),
+                "voting": MajorityVoting()
+            },
+            iterators=[
+                "fixed-3", "l1-convergence-0-limit-4", "deadline-0.01"
+            ],
+            trials=2,
+            runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        report = bench.run()
+        assert report["benchmark"] == "pareto"
+        assert report["config"]["trials"] == 2
+        configs = [
+            (res["params"]["algorithm"], res["params"]["iterator"])
+            for res in report["results"]
+        ]
+        assert configs == [
+            ("sums", "deadline-0.01"),
+            ("sums", "fixed-3"),
+            ("sums", "l1-convergence-0-limit-4"),
+            ("truthfinder", "deadline-0.01"),
+            ("truthfinder", "fixed-3"),
+            ("truthfinder", "l1-convergence-0-limit-4"),
+            ("voting", "none")
+        ]
+        by_config = dict(zip(configs, report["results"]))
+        fixed = by_config[("sums", "fixed-3")]
+        assert fixed["converged"]
+        assert fixed["iterations"] == 3
+        assert len(fixed["stats"]["times"]) == 2
+        assert 0 <= fixed["accuracy"] <= 1
+        # Convergence to a threshold of 0 should not be possible
+        failed = by_config[("sums", "l1-convergence-0-limit-4")]
+        assert not failed["converged"]
+        assert failed["accuracy"] is None
+
+        # The original algorithm objects should not be modified
+        assert bench.algorithms["sums"].iterator.limit == 20
+
+        assert len(report["frontiers"]) == 1
+        frontier = report["frontiers"][0]
+        assert frontier["params"] == {
+            "num_sources": 6, "num_variables": 8, "claim_probability": 0.7
+        }
+        keys = {res["key"] for res in report["results"]}
+        assert frontier["frontier"]
+        for res in frontier["frontier"]:
+            assert res["key"] in keys
+            assert res["key"] != failed["key"]
+
+
+class TestImplicationBenchmark:
+    def test_agreement(self):
+        reference = Result({}, {"x": {1: 0.5, 2: 0.5}, "y": {3: 0.9, 4: 0.1}},
+                           None)
+        assert get_agreement(reference, reference) == 1
+        other = Result({}, {"x": {1: 0.5, 2: 0.4}, "y": {3: 0.9, 4: 0.1}},
+                       None)
+        assert get_agreement(other, reference) == 0.5
+        assert get_agreement(other, Result({}, {}, None)) is None
+
+    def test_report(self):
+        bench = ImplicationBenchmark(
+            sizes=[(10, 10)],
+            claim_probabilities=[0.8],
+            top_ks=[1, 3],
+            thresholds=[0.5],
+            domain_size=10,
+            runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        report = bench.run()
+        assert report["benchmark"] == "implications"
+        assert report["config"]["top_ks"] == [1, 3]
+        assert report["config"]["algorithms"] == ["truthfinder"]
+        results = {
+            (res["stage"], res["params"]["implication"]): res
+            for res in report["results"]
+        }
+        labels = ["dense", "top-1", "top-3", "threshold-0.5"]
+        assert set(results) == {
+            (stage, label) for stage in ("build", "run") for label in labels
+        }
+        dense = results[("run", "dense")]
+        assert dense["agreement"] == 1
+        top_1 = results[("run", "top-1")]
+        assert top_1["imp_nnz"] <= top_1["num_claims"]
+        assert top_1["imp_nnz"] < results[("run", "top-3")]["imp_nnz"]
+        assert results[("run", "top-3")]["imp_nnz"] < dense["imp_nnz"]
+        assert 0 <= top_1["agreement"] <= 1
+        assert 0 <= top_1["accuracy"] <= 1
+
+
+class TestDenseBenchmark:
+    def test_max_difference(self):
+        reference = Result({"s": 0.5}, {"x": {1: 0.5, 2: 0.25}}, None)
+        assert get_max_difference(reference, reference) == 0
+        other = Result({"s": 0.4}, {"x": {1: 0.5, 2: 0.5}}, None)
+        assert get_max_difference(other, reference) == pytest.approx(0.25)
+
+    def test_crossover(self):
+        results = [
+            {"dense_size": 10, "speedup": 3},
+            {"dense_size": 1000, "speedup": 0.5},
+            {"dense_size": 100, "speedup": 0.9},
+            {"dense_size": 50, "speedup": 1.5}
+        ]
+        assert find_crossover(results) == 100
+        assert find_crossover(results[:1]) is None
+
+    def test_report(self):
+        bench = DenseBenchmark(
+            sizes=[(5, 5), (10, 10)],
+            claim_probabilities=[0.5],
+            algorithms={"sums": Sums(), "truthfinder": TruthFinder()},
+            runner=BenchmarkRunner(repeat=1, warmup=0)
+        )
+        report = bench.run()
+        assert report["benchmark"] == "dense"
+        assert "max_render_nodes" not in report["config"]
+        assert report["config"]["small_size"] == bench.auto_backend.small_size
+        assert len(report["results"]) == 8
+        for res in report["results"]:
+            assert res["stage"] == "run"
+            assert 0 < res["density"] <= 1
+            assert res["auto"] == "dense"
+            if res["params"]["backend"] == "dense":
+                assert res["speedup"] > 0
+                assert res["max_difference"] < 1e-6
+            else:
+                assert "speedup" not in res
+        assert [(case["algorithm"], case["claim_probability"])
+                for case in report["crossovers"]] == [
+            ("sums", 0.5), ("truthfinder", 0.5)
+        ]
+
+
+class TestCompare:
+    def test_compare(self):
+        baseline = {"results": [
+            {"key": "run/a", "stage": "run", "stats": {"median": 1.0}},
+            {"key": "run/b", "stage": "run", "stats": {"median": 1.0}},
+            {"key": "build/a", "stage": "build", "stats": {"median": 2.0}},
+            {"key": "old", "stage": "old", "stats": {"median": 1.0}},
+        ]}
+        report = {"results": [
+            {"key": "run/a", "stage": "run", "stats": {"median": 1.05}},
+            {"key": "run/b", "stage": "run", "stats": {"median": 1.5}},
+            {"key": "build/a", "stage": "build", "stats": {"median": 2.5}},
+            {"key": "new", "stage": "new", "stats": {"median": 1.0}},
+        ]}
+        comps = compare_reports(report, baseline, threshold=0.1)
+        assert [c.key for c in comps] == ["run/a", "run/b", "build/a"]
+        assert [c.regressed for c in comps] == [False, True, True]
+        assert comps[1].ratio == 1.5
+        assert str(comps[1]).startswith("REGRESSION run/b")
+
+        # Per-stage thresholds
+        comps = compare_reports(
+            report, baseline, threshold=0.1, thresholds={"build": 0.5}
+        )
+        assert [c.regressed for c in comps] == [False, True, False]
+
+    def test_zero_baseline(self):
+        baseline = {"results": [
+            {"key": "a", "stage": "a", "stats": {"median": 0}},
+            {"key": "b", "stage": "b", "stats": {"median": 0}}
+        ]}
+        report = {"results": [
+            {"key": "a", "stage": "a", "stats": {"median": 0}},
+            {"key": "b", "stage": "b", "stats": {"median": 1}}
+        ]}
+        comps = compare_reports(report, baseline)
+        assert [c.regressed for c in comps] == [False, True]
+
+
+class TestCommandLine:
+    def test_timing(self, tmpdir, capsys):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "timing", "--sizes", "4x4", "--claim-probs", "0.5",
+            "-a", "voting", "--repeat", "1", "--warmup", "0", "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["config"]["sizes"] == [[4, 4]]
+        assert report["config"]["algorithms"] == ["voting"]
+
+        # Comparing against itself should not give any regressions
+        assert main(["compare", outfile, outfile]) == 0
+        # Make a baseline that is much faster than the report
+        for res in report["results"]:
+            res["stats"]["median"] /= 100
+        baseline = str(tmpdir.join("baseline.json"))
+        with open(baseline, "w") as outfile_obj:
+            json.dump(report, outfile_obj)
+        capsys.readouterr()
+        assert main(["compare", outfile, baseline]) == 1
+        assert "REGRESSION" in capsys.readouterr().err
+
+    def test_memory(self, tmpdir, capsys):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "memory", "--sizes", "4x4", "--claim-probs", "0.5",
+            "-a", "voting", "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["benchmark"] == "memory"
+
+        # Memory reports should be compared on peak memory by default
+        for res in report["results"]:
+            res["stats"]["median"] = 0
+            res["stats"]["peak_bytes"] *= 2
+        baseline = str(tmpdir.join("baseline.json"))
+        with open(baseline, "w") as outfile_obj:
+            json.dump(report, outfile_obj)
+        assert main(["compare", outfile, baseline]) == 0
+        assert main(["compare", baseline, outfile]) == 1
+        assert main(["compare", baseline, outfile, "--metric", "median"]) == 0
+
+    def test_scaling(self, tmpdir):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "scaling", "--workers", "2", "--component-size", "3x3",
+            "--num-components", "2", "--batch-size", "2", "-a", "voting",
+            "--min-block-size", "10", "--repeat", "1", "--warmup", "0",
+            "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["config"]["worker_counts"] == [1, 2]
+        assert report["config"]["component_size"] == [3, 3]
+        assert report["config"]["min_block_size"] == 10
+
+    def test_pareto(self, tmpdir, capsys):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "pareto", "--sizes", "4x4", "--claim-probs", "0.8", "-a", "sums",
+            "--iterators", "fixed-1", "fixed-2", "--trials", "1",
+            "--repeat", "1", "--warmup", "0", "--target-accuracy", "0",
+            "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["config"]["iterators"] == ["fixed-1", "fixed-2"]
+        assert "sums with iterator fixed-" in capsys.readouterr().err
+
+        args[-3] = "2"
+        assert main(args) == 0
+        assert "no configuration achieves" in capsys.readouterr().err
+
+    def test_implications(self, tmpdir):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "implications", "--sizes", "5x5", "--claim-probs", "0.8",
+            "--top-k", "2", "--imp-thresholds", "0.1", "--sigma", "2",
+            "--domain-size", "6", "--repeat", "1", "--warmup", "0",
+            "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["config"]["top_ks"] == [2]
+        assert report["config"]["thresholds"] == [0.1]
+        assert report["config"]["sigma"] == 2
+        assert report["config"]["domain_size"] == 6
+
+    def test_dense(self, tmpdir):
+        outfile = str(tmpdir.join("report.json"))
+        args = [
+            "dense", "--sizes", "5x5", "--claim-probs", "0.8", "-a", "sums",
+            "--repeat", "1", "--warmup", "0", "-o", outfile
+        ]
+        assert main(args) == 0
+        with open(outfile) as infile:
+            report = json.load(infile)
+        assert report["config"]["sizes"] == [[5, 5]]
+        assert [res["params"]["backend"] for res in report["results"]] == [
+            "sparse", "dense"
+        ]
+        assert report["crossovers"][0]["algorithm"] == "sums"
+
+    def test_invalid_args(self, capsys):
+        with pytest.raises(SystemExit):
+            main(["timing", "--sizes", "4by4"])
+        assert "invalid size '4by4'" in capsys.readouterr().err
+        with pytest.raises(SystemExit):
+            main(["timing", "-a", "blah"])
+        assert "invalid algorithm 'blah'" in capsys.readouterr().err
+        with pytest.raises(SystemExit):
+            main(["pareto", "--iterators", "fixed-hello"])
+        assert "invalid iterator specification" in capsys.readouterr().err
+
+    def test_no_command(self, capsys):
+        assert main([]) == 0
+        assert "usage" in capsys.readouterr().out
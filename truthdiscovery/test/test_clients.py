@@ -6,11 +6,15 @@ import pytest
 import yaml
 
 from truthdiscovery.algorithm import (
+    AutoBackend,
     AverageLog,
+    DenseBackend,
     MajorityVoting,
     PooledInvestment,
     PriorBelief,
+    SparseBackend,
     Sums,
+    ThreadedBackend,
     TruthFinder
 )
 from truthdiscovery.client import BaseClient, CommandLineClient, OutputFields
@@ -18,8 +22,10 @@ from truthdiscovery.client.web import get_flask_app, route
 from truthdiscovery.input import MatrixDataset, SupervisedData
 from truthdiscovery.utils import (
     ConvergenceIterator,
+    DeadlineIterator,
     DistanceMeasures,
-    FixedIterator
+    FixedIterator,
+    get_tracer
 )
 from truthdiscovery.test.utils import is_valid_png
 
@@ -64,6 +70,14 @@ class TestBaseClient(ClientTestsBase):
         assert l2_with_limit.threshold == 0.234
         assert l2_with_limit.limit == 9
 
+        deadline = BaseClient().get_iterator("deadline-0.5")
+        assert isinstance(deadline, DeadlineIterator)
+        assert deadline.deadline == 0.5
+        assert deadline.limit == 200
+        deadline_with_limit = BaseClient().get_iterator("deadline-2-limit-7")
+        assert deadline_with_limit.deadline == 2
+        assert deadline_with_limit.limit == 7
+
         # Should be too many iterations
         with pytest.raises(ValueError):
             fixed_2000 = BaseClient().get_iterator(
@@ -73,6 +87,8 @@ class TestBaseClient(ClientTestsBase):
             conv_2000 = BaseClient().get_iterator(
                 "l2-convergence-1-limit-2000", max_limit=1999
             )
+        with pytest.raises(ValueError):
+            BaseClient().get_iterator("deadline-1-limit-2000", max_limit=1999)
 
         invalid_it_strings = (
             "fixed",
@@ -87,12 +103,33 @@ class TestBaseClient(ClientTestsBase):
             "blah-convergence-0.03",
             "l1-convergence-0.03-limit",
             "l1-convergence-0.03-limit-",
-            "l1-convergence-0.03-limit-45.0"
+            "l1-convergence-0.03-limit-45.0",
+            "deadline",
+            "deadline-",
+            "deadline-0",
+            "deadline-soon",
+            "deadline-1-limit-"
         )
         for it_string in invalid_it_strings:
             with pytest.raises(ValueError):
                 BaseClient().get_iterator(it_string)
 
+    def test_get_backend(self):
+        assert isinstance(BaseClient().get_backend("sparse"), SparseBackend)
+        threaded = BaseClient().get_backend("threaded-3")
+        assert isinstance(threaded, ThreadedBackend)
+        assert threaded.num_threads == 3
+        assert BaseClient().get_backend("threaded").num_threads >= 1
+        assert isinstance(BaseClient().get_backend("dense"), DenseBackend)
+        assert isinstance(BaseClient().get_backend("auto"), AutoBackend)
+        for invalid in ("blas", "threaded-", "threaded-0", "threaded-two"):
+            with pytest.raises(ValueError):
+                BaseClient().get_backend(invalid)
+
+        name, val = BaseClient().algorithm_parameter("backend=threaded-2")
+        assert name == "backend"
+        assert val.num_threads == 2
+
     def test_get_algorithm_parameter(self):
         # Iterator param
         name1, val1 = BaseClient().algorithm_parameter("iterator=fixed-99")
@@ -190,6 +227,20 @@ class TestCommandLineClient(ClientTestsBase):
             "run", "--algorithm", "sums", "-f", csv_dataset
         )
 
+    def test_trace(self, csv_dataset, tmpdir, capsys):
+        trace_path = str(tmpdir.join("trace.json"))
+        self.run(
+            "--trace", trace_path, "run", "-a", "sums", "-f", csv_dataset
+        )
+        assert "sums" in yaml.safe_load(capsys.readouterr().out)
+        with open(trace_path) as trace_file:
+            trace = json.load(trace_file)
+        names = {event["name"] for event in trace["traceEvents"]}
+        assert "Sums.run" in names
+        assert "Dataset.read_triples" in names
+        # Tracing should be switched off again afterwards
+        assert get_tracer() is None
+
     def test_results(self, csv_dataset, csv_fileobj, capsys):
         self.run(
             "run", "-a", "average_log", "-f", csv_dataset
@@ -477,6 +528,16 @@ class TestCommandLineClient(ClientTestsBase):
         true_vals, claims = output.split("\n")
         assert true_vals == claims
 
+    def test_synthetic_generation_outfile(self, tmpdir, capsys):
+        outfile = tmpdir.join("synth.csv")
+        self.run(
+            "synth", "--trust", "0.5", "0.6", "--num-vars", "7", "-o",
+            str(outfile)
+        )
+        assert capsys.readouterr().out == ""
+        sup = SupervisedData.from_csv(outfile.open())
+        assert sup.data.sv.shape == (2, 7)
+
     def test_synthetic_generation_invalid_params(self, capsys):
         # Check that invalid param errors are caught by the parser, not raised
         # as Python exceptions
@@ -3,7 +3,9 @@ import json
 from operator import attrgetter
 
 import imageio
+import numpy.ma as ma
 import pytest
+import scipy.sparse
 
 from truthdiscovery.algorithm import Sums
 from truthdiscovery.input import Dataset, MatrixDataset
@@ -245,6 +247,18 @@ class TestRendering(BaseTest):
         assert rend1.get_claim_label(0, 1) == "v1=7"
         assert rend2.get_claim_label(0, 1) == "v2=7"
 
+    def test_sparse_matrix_renderer(self):
+        dense = MatrixDataset(ma.masked_values([[0, 5, 7], [0, 0, 0],
+                                                [1, 2, 0]], 0))
+        sparse = MatrixDataset(scipy.sparse.csr_matrix(dense.sv.filled(0)))
+        outputs = []
+        for dataset in (dense, sparse):
+            rend = MatrixDatasetGraphRenderer(backend=JsonBackend())
+            buf = StringIO()
+            rend.render(dataset, buf)
+            outputs.append(buf.getvalue())
+        assert outputs[0] == outputs[1]
+
     def test_image_size(self, dataset):
         buf = BytesIO()
         w = 142
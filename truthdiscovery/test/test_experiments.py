@@ -0,0 +1,178 @@
+from io import StringIO
+import json
+import os
+
+import numpy as np
+import numpy.ma as ma
+import pytest
+
+from truthdiscovery.algorithm import MajorityVoting, Sums
+from truthdiscovery.experiments import (
+    DatasetCache,
+    Experiment,
+    ExperimentRunner,
+    mean_accuracy,
+    run_trial,
+    seeded_accuracy,
+    trial_seed
+)
+from truthdiscovery.input import MatrixDataset, SupervisedData
+from truthdiscovery.utils import ConvergenceIterator, DistanceMeasures
+
+
+class TestExperiment:
+    @pytest.fixture
+    def experiment(self):
+        return Experiment(
+            algorithms={"sums": Sums(), "voting": MajorityVoting()},
+            labels=["low", "high"],
+            synth_params={
+                "trust": lambda: np.random.uniform(size=(8,)),
+                "num_variables": 10,
+                "claim_probability": [0.3, 0.8],
+                "domain_size": 3
+            },
+            reps=3,
+            seed=5
+        )
+
+    def test_invalid_params(self):
+        with pytest.raises(ValueError):
+            Experiment({}, ["a", "b"], {"domain_size": [1, 2, 3]})
+
+    def test_seeds(self):
+        seeds = {trial_seed(0, i, j) for i in range(10) for j in range(10)}
+        assert len(seeds) == 100
+        assert trial_seed(1, 2, 3) == trial_seed(1, 2, 3)
+        assert 0 <= trial_seed(10 ** 10, 3, 4) < 2 ** 32
+
+    def test_trials(self, experiment):
+        trials = list(experiment.get_trials())
+        assert len(trials) == experiment.get_num_trials() == 6
+        assert [(t.label, t.rep) for t in trials] == [
+            ("low", 0), ("low", 1), ("low", 2),
+            ("high", 0), ("high", 1), ("high", 2)
+        ]
+        assert trials[0].synth_params["claim_probability"] == 0.3
+        assert trials[3].synth_params["claim_probability"] == 0.8
+        assert trials[0].synth_params["num_variables"] == 10
+
+        # Callables should be called for each trial, and be reproducible
+        trusts = [t.synth_params["trust"] for t in trials]
+        assert not np.array_equal(trusts[0], trusts[1])
+        again = list(experiment.get_trials())
+        for trial1, trial2 in zip(trials, again):
+            assert trial1.seed == trial2.seed
+            assert np.array_equal(trial1.synth_params["trust"],
+                                  trial2.synth_params["trust"])
+            assert trial1.get_cache_key() == trial2.get_cache_key()
+        assert len({t.get_cache_key() for t in trials}) == 6
+
+    def test_run_trial(self, experiment):
+        trial = next(experiment.get_trials())
+        results = run_trial(trial, experiment.algorithms)
+        assert [res["algorithm"] for res in results] == ["sums", "voting"]
+        for res in results:
+            assert res["label"] == "low"
+            assert res["rep"] == 0
+            assert res["seed"] == trial.seed
+            assert 0 <= res["accuracy"] <= 1
+            assert res["time"] >= 0
+        assert results[0]["iterations"] == 20
+        again = run_trial(trial, experiment.algorithms)
+        for res1, res2 in zip(results, again):
+            assert dict(res1, time=None) == dict(res2, time=None)
+
+    def test_convergence_error(self, experiment):
+        it = ConvergenceIterator(DistanceMeasures.L1, 0, limit=2)
+        trial = next(experiment.get_trials())
+        results = run_trial(trial, {"sums": Sums(iterator=it)})
+        assert results[0]["accuracy"] is None
+
+    def test_seeded_accuracy(self):
+        sv = ma.masked_values([
+            [1, 2],
+            [2, 2]
+        ], 0)
+        sup = SupervisedData(MatrixDataset(sv), {0: 1, 1: 2})
+        results = MajorityVoting().run(sup.data)
+        # Variable 0 is a tie, broken randomly (variable 1 has no conflicting
+        # claims, so is not counted)
+        accuracies = {seeded_accuracy(sup, results, seed)
+                      for seed in range(20)}
+        assert accuracies == {0, 1}
+        for seed in range(5):
+            assert (seeded_accuracy(sup, results, seed)
+                    == seeded_accuracy(sup, results, seed))
+        # No variables with conflicting claims
+        sup = SupervisedData(MatrixDataset(ma.masked_values([[1, 2]], 0)),
+                             {0: 1})
+        assert seeded_accuracy(
+            sup, MajorityVoting().run(sup.data), 0
+        ) is None
+
+    def test_mean_accuracy(self, experiment):
+        assert mean_accuracy([0.5, None, 1]) == 0.75
+        assert np.isnan(mean_accuracy([None, None]))
+        assert np.isnan(mean_accuracy([]))
+
+        # Trials without accuracy should be skipped when averaging results
+        it = ConvergenceIterator(DistanceMeasures.L1, 0, limit=2)
+        experiment.algorithms["sums"] = Sums(iterator=it)
+        results = ExperimentRunner(workers=1).run(experiment)
+        assert results["low"]["sums"] == [None] * 3
+        assert np.isnan(mean_accuracy(results["low"]["sums"]))
+        voting = results["low"]["voting"]
+        assert mean_accuracy(voting + [None]) == pytest.approx(
+            np.mean(voting)
+        )
+
+    @pytest.mark.parametrize("workers,executor", [
+        (2, "process"), (2, "thread")
+    ])
+    def test_parallel_deterministic(self, experiment, workers, executor):
+        serial = ExperimentRunner(workers=1).run(experiment)
+        assert list(serial.keys()) == ["low", "high"]
+        assert len(serial["low"]["sums"]) == 3
+        runner = ExperimentRunner(workers=workers, executor=executor)
+        assert runner.run(experiment) == serial
+
+    def test_invalid_executor(self):
+        with pytest.raises(ValueError):
+            ExperimentRunner(executor="cluster")
+
+    def test_streaming(self, experiment):
+        buf = StringIO()
+        runner = ExperimentRunner(workers=1)
+        results = runner.iter_results(experiment, outfile=buf)
+        first = next(results)
+        # Results should be written as soon as they are available
+        assert json.loads(buf.getvalue()) == first
+        rest = list(results)
+        lines = buf.getvalue().strip().split("\n")
+        assert len(lines) == 1 + len(rest) == 12
+
+    def test_cache(self, experiment, tmpdir):
+        cache_dir = str(tmpdir.join("cache"))
+        runner = ExperimentRunner(workers=1, cache_dir=cache_dir)
+        first = runner.run(experiment)
+        assert len(os.listdir(cache_dir)) == 6
+        # Results should be the same when datasets are loaded from the cache
+        assert runner.run(experiment) == first
+        assert ExperimentRunner(workers=1).run(experiment) == first
+
+
+class TestDatasetCache:
+    def test_save_load(self, tmpdir):
+        cache = DatasetCache(str(tmpdir.join("cache")))
+        assert cache.load("key") is None
+        sv = ma.masked_values([[1, 2, 0], [0, 3, 4]], 0)
+        sup = SupervisedData(MatrixDataset(sv), {0: 1, 2: 5})
+        cache.save("key", sup)
+        assert os.listdir(cache.directory) == ["key.npz"]
+
+        loaded = cache.load("key")
+        assert np.array_equal(loaded.data.sv, sv)
+        assert np.array_equal(loaded.data.sv.mask, sv.mask)
+        assert loaded.values == {0: 1, 2: 5}
+        assert loaded.data.num_claims == 4
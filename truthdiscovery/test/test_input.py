@@ -1,17 +1,45 @@
+from io import StringIO
+import pickle
+
 import numpy as np
 import numpy.ma as ma
 import pytest
+import scipy.sparse
 
 from truthdiscovery.algorithm import MajorityVoting
 from truthdiscovery.input import (
+    BaseCanonicaliser,
+    BaseImplication,
+    CaseFoldCanonicaliser,
+    CanonicaliserChain,
+    ClaimIDMapping,
+    CollapsedDataset,
     Dataset,
     FileDataset,
     FileSupervisedData,
+    GaussianImplication,
     IDMapping,
+    IdentityMapping,
+    KeyCanonicaliser,
     MatrixDataset,
+    MemmapCSR,
+    MemmapDataset,
+    NumericCanonicaliser,
+    RelativeDifferenceImplication,
+    ShardedDataset,
+    SparseImplication,
     SupervisedData,
-    SyntheticData
+    SyntheticData,
+    UnitCanonicaliser,
+    shard_triples
+)
+from truthdiscovery.input.collapsed_dataset import find_duplicate_rows
+from truthdiscovery.input.matrix_dataset import (
+    csv_to_masked_array,
+    get_row_widths
 )
+from truthdiscovery.input.memmap_dataset import save_csr
+from truthdiscovery.input.sharded_dataset import get_shard_index
 from truthdiscovery.output import Result
 
 
@@ -107,6 +135,281 @@ class TestDataset:
         assert ds2.num_connected_components() == 3
 
 
+class TestCollapsedDataset:
+    def test_find_duplicate_rows(self):
+        mat = scipy.sparse.csr_matrix(np.array([
+            [1, 0, 1],
+            [0, 1, 0],
+            [1, 0, 1],
+            [0, 0, 0],
+            [1, 0, 1],
+            [0, 0, 0]
+        ]))
+        groups, reps = find_duplicate_rows(mat)
+        assert list(groups) == [0, 1, 0, 2, 0, 2]
+        assert list(reps) == [0, 1, 3]
+
+    def test_collapse(self):
+        sv = ma.masked_values([
+            [1, 2, 0],
+            [1, 0, 3],
+            [1, 2, 0],
+            [1, 2, 0],
+            [1, 0, 3],
+            [2, 0, 0]
+        ], 0)
+        data = MatrixDataset(sv)
+        collapsed = CollapsedDataset(data)
+        assert collapsed.num_sources == 3
+        assert collapsed.num_claims == data.num_claims
+        assert list(collapsed.source_weights) == [3, 2, 1]
+        assert list(collapsed.source_groups) == [0, 1, 0, 0, 1, 2]
+        assert list(collapsed.source_ids) == [0, 1, 5]
+        assert np.array_equal(collapsed.sc.toarray(),
+                              data.sc.toarray()[[0, 1, 5]])
+        assert collapsed.mut_ex is data.mut_ex
+
+        # Claim totals should count each source with its weight
+        assert np.array_equal(
+            collapsed.get_claim_totals(np.array([1, 10, 100])),
+            data.get_claim_totals(np.array([1, 10, 1, 1, 10, 100]))
+        )
+        assert data.apply_source_weights(np.array([4])) == np.array([4])
+        assert collapsed.get_source_trust_dict([0.1, 0.2, 0.3]) == {
+            0: 0.1, 1: 0.2, 2: 0.1, 3: 0.1, 4: 0.2, 5: 0.3
+        }
+
+        # Collapsing again should change nothing
+        again = CollapsedDataset(collapsed)
+        assert list(again.source_weights) == [3, 2, 1]
+        assert list(again.source_groups) == [0, 1, 0, 0, 1, 2]
+        assert again.get_source_trust_dict([0.1, 0.2, 0.3]) == {
+            0: 0.1, 1: 0.2, 2: 0.1, 3: 0.1, 4: 0.2, 5: 0.3
+        }
+
+
+class TestShardedDataset:
+    @pytest.fixture
+    def triples(self):
+        return [
+            ("one", "x", 1), ("two", "x", 2), ("one", "y", 3),
+            ("three", "y", 3), ("two", "z", 4), ("four", "w", 5),
+            ("three", "x", 1)
+        ]
+
+    def test_shard_index(self):
+        for var in ("x", 1, np.int64(1), (1, "a"), None):
+            index = get_shard_index(var, 7)
+            assert 0 <= index < 7
+            assert get_shard_index(var, 7) == index
+        assert get_shard_index(np.int64(12), 5) == get_shard_index(12, 5)
+        assert get_shard_index("anything", 1) == 0
+
+    def test_shard_triples(self, triples, tmpdir):
+        paths = shard_triples(iter(triples), str(tmpdir), 3)
+        assert len(paths) == 3
+        assert sorted(tmpdir.listdir(sort=True)) == sorted(
+            [tmpdir.join("manifest.pickle")]
+            + [tmpdir.join(path.split("/")[-1]) for path in paths]
+        )
+        # Each variable should be in the shard given by its hash
+        for index, path in enumerate(paths):
+            with open(path, "rb") as infile:
+                shard = pickle.load(infile)
+            for var in shard.var_ids:
+                assert get_shard_index(var, 3) == index
+
+        with ShardedDataset(str(tmpdir)) as data:
+            assert data.num_shards == 3
+            assert data.num_sources == 4
+            assert data.num_variables == 4
+            assert data.num_claims == 5
+            assert list(data.source_ids) == ["one", "two", "three", "four"]
+            assert data.sc.shape == (4, 5)
+
+        with pytest.raises(ValueError):
+            shard_triples(triples, str(tmpdir), 0)
+
+    def test_matrices(self, triples, tmpdir):
+        shard_triples(triples, str(tmpdir), 2)
+        single = Dataset(triples)
+        with ShardedDataset(str(tmpdir), num_workers=1) as data:
+            assert list(data.source_ids) == list(single.source_ids)
+            # Claims are numbered differently, so compare via belief dicts
+            source_vec = np.array([1.0, 10, 100, 1000])
+            assert data.get_belief_dict(data.sc.T @ source_vec) == (
+                single.get_belief_dict(single.sc.T @ source_vec)
+            )
+            # The transpose is cached, so is only evaluated in the workers once
+            assert data.sc.T is data.sc.T
+            assert data.sc.T.T is data.sc
+            token = data.sc.T.token
+            assert token is not None
+            data.sc.T @ source_vec
+            assert data.sc.T.token == token
+            claim_ids = data.get_belief_dict(np.arange(data.num_claims))
+            claim_vec = np.zeros(data.num_claims)
+            single_vec = np.zeros(single.num_claims)
+            for var, vals in claim_ids.items():
+                for val, claim_id in vals.items():
+                    claim_vec[claim_id] = val
+                    single_vec[single.claim_ids.get_id((
+                        single.var_ids.get_id(var), single.val_hashes[val]
+                    ))] = val
+            assert np.array_equal(data.sc @ claim_vec,
+                                  single.sc @ single_vec)
+
+            # Number of claims mutually exclusive with each claim
+            mut_ex_counts = data.mut_ex @ np.ones(data.num_claims)
+            assert sorted(mut_ex_counts) == [1, 1, 1, 2, 2]
+
+            with pytest.raises(ValueError):
+                data.sc @ np.ones(3)
+            with pytest.raises(ValueError):
+                data.sc.multiply(np.ones(3))
+            with pytest.raises(NotImplementedError):
+                data.sc @ data.sc.T
+            with pytest.raises(NotImplementedError):
+                data.num_connected_components()
+
+    def test_worker_errors(self, triples, tmpdir):
+        shard_triples(triples, str(tmpdir), 2)
+        single = Dataset(triples)
+        source_vec = np.array([1.0, 10, 100, 1000])
+        with ShardedDataset(str(tmpdir), num_workers=2) as data:
+            with pytest.raises(ValueError):
+                data._broadcast("invalid")
+            # Replies from all workers should have been consumed, so later
+            # commands still work
+            assert data.get_belief_dict(data.sc.T @ source_vec) == (
+                single.get_belief_dict(single.sc.T @ source_vec)
+            )
+
+
+class TestMemmapDataset:
+    @pytest.fixture
+    def triples(self):
+        return [
+            ("one", "x", 1), ("two", "x", 2), ("one", "y", "3.0"),
+            ("three", "y", 3), ("two", "z", 4), ("four", "w", 5),
+            ("three", "x", 1), ("four", "x", 1)
+        ]
+
+    def assert_same_dataset(self, data, expected):
+        assert list(data.source_ids) == list(expected.source_ids)
+        assert list(data.var_ids) == list(expected.var_ids)
+        assert list(data.claim_ids) == list(expected.claim_ids)
+        assert list(data.val_hashes) == list(expected.val_hashes)
+        assert data.num_sources == expected.num_sources
+        assert data.num_variables == expected.num_variables
+        assert data.num_claims == expected.num_claims
+        for name in ("sc", "mut_ex", "imp"):
+            matrix = getattr(data, name)
+            assert isinstance(matrix, MemmapCSR)
+            assert np.array_equal(matrix.toarray(),
+                                  getattr(expected, name).toarray())
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 100])
+    def test_build(self, triples, tmpdir, chunk_size):
+        def imp(var, val1, val2):
+            return 0.5
+        kwargs = {
+            "implication_function": imp,
+            "canonicaliser": NumericCanonicaliser()
+        }
+        data = MemmapDataset(str(tmpdir), triples, chunk_size=chunk_size,
+                             block_size=2, **kwargs)
+        self.assert_same_dataset(data, Dataset(triples, **kwargs))
+        assert data.num_connected_components() == 1
+
+        # Should be able to load the dataset again
+        with MemmapDataset(str(tmpdir)) as loaded:
+            self.assert_same_dataset(loaded, data)
+            assert len(loaded.sc.block_bounds) == 2
+        data.close()
+
+    def test_multiple_claims(self, triples, tmpdir):
+        triples.append(("one", "x", 6))
+        with pytest.raises(ValueError):
+            MemmapDataset(str(tmpdir), triples)
+        data = MemmapDataset(str(tmpdir), triples, allow_multiple=True,
+                             chunk_size=2)
+        # The claim x=6 is only made in the discarded triple, so should be
+        # removed
+        assert data.num_claims == 6
+        assert data.get_belief_dict(np.arange(6)) == {
+            "x": {1: 0, 2: 1}, "y": {"3.0": 2, 3: 3}, "z": {4: 4}, "w": {5: 5}
+        }
+        assert data.sc.nnz == len(triples) - 1
+        expected = Dataset(triples, allow_multiple=True)
+        assert np.array_equal(data.sc.toarray(), expected.sc.toarray())
+
+    def test_from_dataset(self, tmpdir):
+        sv = ma.masked_values([
+            [1, 2, 0],
+            [0, 2, 3],
+            [1, 0, 0]
+        ], 0)
+        expected = MatrixDataset(sv)
+        data = MemmapDataset.from_dataset(expected, str(tmpdir))
+        self.assert_same_dataset(data, expected)
+
+    def test_operators(self, tmpdir):
+        mat = scipy.sparse.csr_matrix(np.array([
+            [1, 0, 2.5],
+            [0, 0, 0],
+            [0, -1, 0],
+            [3, 0, 1]
+        ]))
+        square = scipy.sparse.csr_matrix(np.array([
+            [1, 2, 0, 0],
+            [0, 1, 0, 0],
+            [0, 0, 0, 4],
+            [5, 0, 0, 1]
+        ]))
+        op = MemmapCSR(str(tmpdir), "mat", block_size=1,
+                       **save_csr(mat, str(tmpdir), "mat"))
+        sq_op = MemmapCSR(str(tmpdir), "sq", block_size=2, prefetch=False,
+                          **save_csr(square, str(tmpdir), "sq"))
+        assert list(op.block_bounds) == [0, 1, 3, 4]
+        vec = np.array([1, 10, 100])
+        rvec = np.array([1, 10, 100, 1000])
+        scale = np.array([2, 3, 5, 7])
+
+        assert np.array_equal(op @ vec, mat @ vec)
+        assert np.array_equal(op.T @ rvec, mat.T @ rvec)
+        assert op.T.T is op
+        assert np.array_equal(op.T.multiply(scale) @ rvec,
+                              mat.T.multiply(scale) @ rvec)
+        assert np.array_equal(op.T.multiply(scale).T @ vec,
+                              mat.T.multiply(scale).T @ vec)
+        assert np.allclose(
+            (op.T + np.float64(0.5) * (op.T @ sq_op.T)) @ rvec,
+            (mat.T + 0.5 * (mat.T @ square.T)) @ rvec
+        )
+        assert np.allclose((op.T @ sq_op).T @ vec, (mat.T @ square).T @ vec)
+
+        # The prefetch thread is reused between products, and restarted if
+        # needed after closing
+        reader = op.get_reader()
+        op @ vec
+        assert op.get_reader() is reader
+        op.close()
+        assert np.array_equal(op @ vec, mat @ vec)
+        assert op.get_reader() is not reader
+        op.close()
+        sq_op.close()
+
+        with pytest.raises(ValueError):
+            op @ rvec
+        with pytest.raises(ValueError):
+            op.multiply(rvec)
+        with pytest.raises(ValueError):
+            op + op.T
+        with pytest.raises(ValueError):
+            op @ op
+
+
 class TestIDMapping:
     def test_insert(self):
         mapping = IDMapping()
@@ -125,6 +428,95 @@ class TestIDMapping:
         assert mapping.inverse[1] == "goodbye"
         assert mapping.inverse[2] == ("this", "is", 4, "tuple")
 
+    def test_mapping_interface(self):
+        mapping = IDMapping(["a", "b", "c"])
+        # Forward index should only be built when needed
+        assert mapping._index is None
+        assert mapping.inverse[1] == "b"
+        assert mapping._index is None
+        assert mapping["c"] == 2
+        assert mapping._index is not None
+
+        assert len(mapping) == 3
+        assert "a" in mapping
+        assert "d" not in mapping
+        assert list(mapping) == ["a", "b", "c"]
+        assert list(mapping.values()) == [0, 1, 2]
+        assert dict(mapping) == {"a": 0, "b": 1, "c": 2}
+        assert mapping.get_id("d") == 3
+        assert mapping.inverse[3] == "d"
+        with pytest.raises(KeyError):
+            mapping["e"]
+
+    def test_identity_mapping(self):
+        mapping = IdentityMapping(3)
+        assert len(mapping) == 3
+        assert mapping[2] == 2
+        assert mapping[np.int64(1)] == 1
+        assert mapping.inverse[1] == 1
+        assert list(mapping.items()) == [(0, 0), (1, 1), (2, 2)]
+        assert 3 not in mapping
+        assert "0" not in mapping
+        assert True not in mapping
+        with pytest.raises(KeyError):
+            mapping[-1]
+        with pytest.raises(KeyError):
+            mapping.get_id(3, insert=False)
+        # Only the next integer can be inserted
+        assert mapping.get_id(3) == 3
+        assert len(mapping) == 4
+        with pytest.raises(ValueError):
+            mapping.get_id(5)
+        with pytest.raises(ValueError):
+            mapping.get_id("x")
+
+        assert IdentityMapping.matches([0, 1, 2])
+        assert IdentityMapping.matches(np.arange(4))
+        assert IdentityMapping.matches([])
+        assert not IdentityMapping.matches([0, 2])
+        assert not IdentityMapping.matches([1, 0])
+        assert not IdentityMapping.matches([False, True])
+
+    def test_identity_mapping_in_datasets(self):
+        data = Dataset([(0, 0, "a"), (1, 1, "b"), (1, 0, "c")])
+        assert isinstance(data.source_ids, IdentityMapping)
+        assert isinstance(data.var_ids, IdentityMapping)
+        data = Dataset([(1, 0, "a"), (0, 1, "b")])
+        assert not isinstance(data.source_ids, IdentityMapping)
+        assert isinstance(data.var_ids, IdentityMapping)
+        assert data.get_source_trust_dict([0.1, 0.2]) == {1: 0.1, 0: 0.2}
+
+        full = MatrixDataset(np.ones((3, 4)))
+        assert isinstance(full.source_ids, IdentityMapping)
+        assert isinstance(full.var_ids, IdentityMapping)
+        sv = ma.masked_values([[1, 0, 2], [0, 0, 0], [3, 0, 4]], 0)
+        partial = MatrixDataset(sv)
+        assert dict(partial.source_ids) == {0: 0, 2: 1}
+        assert dict(partial.var_ids) == {0: 0, 2: 1}
+
+    def test_claim_mapping(self):
+        mapping = ClaimIDMapping()
+        assert mapping.get_id((0, 5)) == 0
+        assert mapping.get_id((1, 5)) == 1
+        assert mapping.get_id((0, 2 ** 20)) == 2
+        assert mapping.get_id((0, 5)) == 0
+        assert mapping.inverse[2] == (0, 2 ** 20)
+        assert (1, 5) in mapping
+        assert (5, 1) not in mapping
+        assert dict(mapping) == {(0, 5): 0, (1, 5): 1, (0, 2 ** 20): 2}
+        var_ids, val_hashes = mapping.get_arrays()
+        assert var_ids.tolist() == [0, 1, 0]
+        assert val_hashes.tolist() == [5, 5, 2 ** 20]
+        # Returned arrays should not prevent further inserts
+        assert mapping.get_id((3, 3)) == 3
+
+        from_arrays = ClaimIDMapping.from_arrays(np.array([2, 2, 0]),
+                                                 np.array([1, 0, 1]))
+        assert from_arrays._index is None
+        assert list(from_arrays) == [(2, 1), (2, 0), (0, 1)]
+        assert from_arrays[(0, 1)] == 2
+        assert isinstance(from_arrays.inverse[0][0], int)
+
 
 class TestMatrixDataset:
     def test_create(self):
@@ -229,6 +621,55 @@ class TestMatrixDataset:
         assert np.array_equal(data2.sv.mask, exp_sv2.mask)
         assert (data2.sv == exp_sv2).all()
 
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 2 ** 20])
+    def test_csv_chunks(self, chunk_size):
+        csv = "\n".join([
+            "  ",
+            "",
+            " 1,,3, 2,6  ",
+            ", 9,0,2,5",
+            "3,9,  ,\t,1",
+            ",,,,",
+            "1,9  , 5.7,3,nan",
+            "-5e-1,1,3,1,1 ",
+            "",
+            "  "
+        ])
+        sv = csv_to_masked_array(StringIO(csv), chunk_size=chunk_size)
+        expected = ma.masked_values([
+            [1, 999, 3, 2, 6],
+            [999, 9, 0, 2, 5],
+            [3, 9, 999, 999, 1],
+            [999, 999, 999, 999, 999],
+            [1, 9, 5.7, 3, 999],
+            [-0.5, 1, 3, 1, 1]
+        ], 999)
+        assert np.array_equal(sv.mask, expected.mask)
+        assert (sv == expected).all()
+
+    def test_row_widths(self):
+        assert list(get_row_widths("1,2,3\n4,5,6")) == [3, 3]
+        assert list(get_row_widths("1,,\n\n,\u00e9,x,")) == [3, 1, 4]
+        assert list(get_row_widths("")) == [1]
+        assert list(get_row_widths("7")) == [1]
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 2 ** 20])
+    def test_csv_chunks_errors(self, chunk_size):
+        csv = "\n".join(["1,2,3"] * 10 + ["1,2"])
+        with pytest.raises(ValueError) as excinfo:
+            csv_to_masked_array(StringIO(csv), chunk_size=chunk_size)
+        assert "Expected 3 entries in row 11, got 2" in str(excinfo.value)
+
+        csv = "1,2,3\n4,5x,6"
+        with pytest.raises(ValueError) as excinfo:
+            csv_to_masked_array(StringIO(csv), chunk_size=chunk_size)
+        assert "'5x'" in str(excinfo.value)
+
+    def test_csv_empty_file(self):
+        sv = csv_to_masked_array(StringIO("\n \n"))
+        assert sv.shape == (1, 1)
+        assert sv.mask.all()
+
     def test_claims_matrix(self):
         data = MatrixDataset(ma.masked_values([
             [7, 4, 7],
@@ -275,6 +716,185 @@ class TestMatrixDataset:
         assert data.mut_ex.shape == expected_mut_ex_mat.shape
         assert np.array_equal(data.mut_ex.toarray(), expected_mut_ex_mat)
 
+    def test_matches_triples(self):
+        sv = ma.masked_values([
+            [-1, -1, -1, -1],
+            [7, -1, 4, 7],
+            [5, -1, 1, -1],
+            [-1, -1, 4, 2],
+            [-1, -1, -1, -1],
+            [7, -1, 2, 2]
+        ], -1)
+        data = MatrixDataset(sv)
+        # Empty rows and columns should be skipped
+        assert data.num_sources == 4
+        assert data.num_variables == 3
+        assert data.num_claims == 7
+        assert dict(data.source_ids) == {1: 0, 2: 1, 3: 2, 5: 3}
+        assert dict(data.var_ids) == {0: 0, 2: 1, 3: 2}
+        assert list(data.val_hashes) == [7, 4, 5, 1, 2]
+
+        triples = list(data.get_triples())
+        assert triples[:3] == [(1, 0, 7), (1, 2, 4), (1, 3, 7)]
+        assert len(triples) == 10
+        from_triples = Dataset(triples)
+        assert dict(data.claim_ids) == dict(from_triples.claim_ids)
+        for attr in ("sc", "mut_ex", "imp"):
+            mat1 = getattr(data, attr)
+            mat2 = getattr(from_triples, attr)
+            assert mat1.shape == mat2.shape
+            assert np.array_equal(mat1.toarray(), mat2.toarray())
+
+    def test_sparse_input(self):
+        dense = ma.masked_values([
+            [7, -1, 4, 0],
+            [-1, -1, -1, -1],
+            [5, -1, 1, -1],
+            [0, -1, 4, 2]
+        ], -1)
+        # Build COO matrix with entries out of order; explicit zeros are
+        # claims
+        rows, cols = np.nonzero(~dense.mask)
+        order = np.random.permutation(len(rows))
+        rows, cols = rows[order], cols[order]
+        for fmt in ("coo", "csr", "csc"):
+            coo = scipy.sparse.coo_matrix(
+                (dense.data[rows, cols], (rows, cols)), shape=dense.shape
+            )
+            sparse_data = MatrixDataset(coo.asformat(fmt))
+            dense_data = MatrixDataset(dense)
+            assert sparse_data.num_claims == dense_data.num_claims == 7
+            assert dict(sparse_data.claim_ids) == dict(dense_data.claim_ids)
+            assert dict(sparse_data.var_ids) == dict(dense_data.var_ids)
+            assert np.array_equal(sparse_data.sc.toarray(),
+                                  dense_data.sc.toarray())
+            assert sparse_data.to_csv() == dense_data.to_csv()
+
+        # Zeros which are not stored are not claims
+        assert MatrixDataset(scipy.sparse.eye(3).tocsr()).num_claims == 3
+
+    def test_sparse_input_duplicates(self):
+        coo = scipy.sparse.coo_matrix(([1, 2, 3], ([0, 1, 0], [1, 1, 1])))
+        with pytest.raises(ValueError) as excinfo:
+            MatrixDataset(coo)
+        err_msg = "Source '0' claimed more than one value for variable '1'"
+        assert err_msg in str(excinfo.value)
+
+    def test_wide_sparse_input(self):
+        # Wide matrix with many distinct values, so that combining variable
+        # and value IDs overflows 32-bit sparse indices
+        num_vars = 70000
+        rows = np.repeat([0, 1], num_vars)
+        cols = np.tile(np.arange(num_vars), 2)
+        values = np.arange(2 * num_vars, dtype=float)
+        coo = scipy.sparse.coo_matrix((values, (rows, cols)),
+                                      shape=(2, num_vars))
+        assert coo.col.dtype == np.int32
+        data = MatrixDataset(coo, keep_sv=False)
+        assert data.num_variables == num_vars
+        assert data.num_claims == 2 * num_vars
+        claim_vars, _ = data.claim_ids.get_arrays()
+        assert np.array_equal(np.bincount(claim_vars), [2] * num_vars)
+        # Each claim is mutually exclusive with itself and the other claim for
+        # its variable
+        assert data.mut_ex.shape == (2 * num_vars, 2 * num_vars)
+        assert data.mut_ex.nnz == 4 * num_vars
+        rebuilt = data.reconstruct_sv()
+        assert np.array_equal(rebuilt.toarray(), coo.toarray())
+
+    def test_sparse_to_csv_blocks(self):
+        dense = np.random.randint(0, 3, size=(10, 4))
+        sparse = scipy.sparse.csr_matrix(dense)
+        sparse_data = MatrixDataset(sparse)
+        rows = list(sparse_data.iter_rows(block_size=3))
+        assert len(rows) == 10
+        for row, dense_row in zip(rows, dense):
+            assert np.array_equal(row.mask, dense_row == 0)
+            assert np.array_equal(row.filled(0), dense_row)
+
+    def test_discard_sv(self, tmpdir):
+        sv = ma.masked_values([
+            [-1, -1, -1, -1],
+            [7, -1, 4.5, 0],
+            [5, -1, 1, -1],
+            [0, -1, 4.5, 2]
+        ], -1)
+        kept = MatrixDataset(sv)
+        assert kept.sv is sv
+        discarded = MatrixDataset(sv, keep_sv=False)
+        assert discarded._sv is None
+        assert discarded.shape == (4, 4)
+
+        rebuilt = discarded.sv
+        assert rebuilt is not sv
+        assert rebuilt.dtype == sv.dtype
+        assert np.array_equal(rebuilt.mask, sv.mask)
+        assert np.array_equal(rebuilt.filled(-1), sv.filled(-1))
+        assert discarded.to_csv() == kept.to_csv()
+
+        # The matrix should only be reconstructed once to get the triples
+        calls = []
+        reconstruct_sv = discarded.reconstruct_sv
+        discarded.reconstruct_sv = lambda: calls.append(1) or reconstruct_sv()
+        assert list(discarded.get_triples()) == list(kept.get_triples())
+        assert len(calls) == 1
+
+        # Sparse input should be reconstructed in the same format
+        sparse = scipy.sparse.csc_matrix(([0, 3, 1], ([0, 2, 2], [1, 0, 4])),
+                                         shape=(3, 6))
+        discarded = MatrixDataset(sparse, keep_sv=False)
+        rebuilt = discarded.sv
+        assert rebuilt.format == "csc"
+        assert rebuilt.shape == (3, 6)
+        assert rebuilt.nnz == 3
+        assert np.array_equal(rebuilt.toarray(), sparse.toarray())
+
+        filepath = tmpdir.join("data.csv")
+        filepath.write(kept.to_csv())
+        from_csv = MatrixDataset.from_csv(filepath.open(), keep_sv=False)
+        assert from_csv._sv is None
+        assert from_csv.to_csv() == kept.to_csv()
+
+    def test_write_csv(self, tmpdir, monkeypatch):
+        sv = ma.masked_values(np.random.randint(0, 4, size=(25, 6)), 0)
+        # Include empty rows and columns
+        sv[3] = ma.masked
+        sv[20:] = ma.masked
+        sv[:, 2] = ma.masked
+        data = MatrixDataset(sv)
+        sparse_data = MatrixDataset(scipy.sparse.csr_matrix(sv.filled(0)))
+        discarded = MatrixDataset(sv, keep_sv=False)
+        sparse_discarded = MatrixDataset(
+            scipy.sparse.csr_matrix(sv.filled(0)), keep_sv=False
+        )
+        # Blocks should be built without reconstructing the whole matrix
+        monkeypatch.setattr(MatrixDataset, "reconstruct_sv", None)
+        for dataset in (data, sparse_data, discarded, sparse_discarded):
+            for block_size in (1, 4, 100):
+                buf = StringIO()
+                dataset.write_csv(buf, block_size=block_size)
+                assert buf.getvalue() == data.to_csv() + "\n"
+
+        filepath = tmpdir.join("data.csv")
+        with filepath.open("w") as outfile:
+            data.write_csv(outfile)
+        loaded = MatrixDataset.from_csv(filepath.open())
+        assert np.array_equal(loaded.sv.mask, sv.mask)
+        assert np.array_equal(loaded.sv.filled(0), sv.filled(0))
+
+    def test_implication_function(self):
+        data = MatrixDataset(
+            ma.masked_values([[1, 2], [3, 0], [2, 2]], 0),
+            implication_function=lambda var, x, y: (x - y) / 10
+        )
+        # Claims are 0: x=1, 1: y=2, 2: x=3, 3: x=2
+        assert np.allclose(data.imp.toarray(), [
+            [0, 0, -0.2, -0.1],
+            [0, 0, 0, 0],
+            [0.2, 0, 0, 0.1],
+            [0.1, 0, -0.1, 0]
+        ])
+
     def test_export_to_csv(self):
         data = MatrixDataset(ma.masked_values([
             # All full row
@@ -491,6 +1111,16 @@ class TestSyntheticData:
             synth.data.sc.toarray()
         )
 
+    def test_write_csv(self):
+        synth = SyntheticData(np.array([0.5, 0.7, 0.9]), num_variables=12)
+        buf = StringIO()
+        synth.write_csv(buf)
+        assert buf.getvalue() == synth.to_csv() + "\n"
+        buf.seek(0)
+        loaded = SupervisedData.from_csv(buf)
+        assert loaded.values == synth.values
+        assert np.array_equal(loaded.data.sv.mask, synth.data.sv.mask)
+
 
 class TestImplications:
     @pytest.fixture
@@ -572,6 +1202,203 @@ class TestImplications:
         with pytest.raises(ValueError):
             Dataset(triples, implication_function=too_small)
 
+    def test_batch_implications(self, triples):
+        class Implication(BaseImplication):
+            def get_block(self, var, values):
+                if var == "z":
+                    return np.full((len(values), len(values)), np.nan)
+                return values[:, np.newaxis] / 10 - values[np.newaxis, :] / 10
+
+        imp = Implication()
+        batch = Dataset(triples, implication_function=imp)
+        # Objects should also work as per-pair functions, giving the same
+        # results
+        pairwise = Dataset(
+            triples,
+            implication_function=lambda *args: imp(*args)
+        )
+        assert imp("x", 4, 2) == pytest.approx(0.2)
+        assert imp("z", 4, 2) is None
+        assert np.allclose(batch.imp.toarray(), pairwise.imp.toarray())
+        assert batch.imp[0, 4] == pytest.approx(-0.1)
+        assert batch.imp[4, 0] == pytest.approx(0.1)
+        assert batch.imp[2, 5] == 0
+        assert batch.imp.diagonal().sum() == 0
+
+    def test_batch_implication_mixed_types(self):
+        class SameType(BaseImplication):
+            def get_block(self, var, values):
+                types = [type(val) for val in values]
+                return np.array([[1.0 if t1 is t2 else -1.0 for t2 in types]
+                                 for t1 in types])
+
+        imp = SameType()
+        triples = [("s1", "x", 1), ("s2", "x", "1"), ("s3", "x", 2)]
+        data = Dataset(triples, implication_function=imp)
+        int_1 = data.claim_ids[(0, data.val_hashes[1])]
+        str_1 = data.claim_ids[(0, data.val_hashes["1"])]
+        int_2 = data.claim_ids[(0, data.val_hashes[2])]
+        assert data.imp[int_1, str_1] == -1
+        assert data.imp[int_1, int_2] == 1
+        assert imp("x", 1, "1") == -1
+        assert imp("x", 1, 2) == 1
+
+    def test_batch_implication_not_modified(self):
+        class Cached(BaseImplication):
+            def __init__(self):
+                self.block = np.array([[0.0, 0.5], [-0.5, 0.0]])
+
+            def get_block(self, var, values):
+                return self.block
+
+        imp = Cached()
+        triples = [("s1", "x", 1), ("s2", "x", 2)]
+        data = Dataset(triples, implication_function=imp)
+        assert data.imp[0, 1] == 0.5
+        # The block returned by the function should not be changed
+        assert np.array_equal(imp.block, [[0, 0.5], [-0.5, 0]])
+
+    def test_batch_implication_errors(self, triples):
+        class TooBig(BaseImplication):
+            def get_block(self, var, values):
+                return np.full((len(values), len(values)), 1.5)
+
+        class WrongShape(BaseImplication):
+            def get_block(self, var, values):
+                return np.zeros((1, 1))
+
+        with pytest.raises(ValueError):
+            Dataset(triples, implication_function=TooBig())
+        with pytest.raises(ValueError):
+            Dataset(triples, implication_function=WrongShape())
+        with pytest.raises(NotImplementedError):
+            Dataset(triples, implication_function=BaseImplication())
+
+    def test_gaussian_implication(self):
+        imp = GaussianImplication(sigma=2)
+        block = imp.get_block("x", np.array([0, 2, 100]))
+        assert block.shape == (3, 3)
+        assert np.allclose(np.diag(block), 1)
+        assert block[0, 1] == pytest.approx(2 * np.exp(-0.5) - 1)
+        assert block[0, 1] == block[1, 0]
+        assert block[0, 2] == pytest.approx(-1)
+        with pytest.raises(ValueError):
+            GaussianImplication(sigma=0)
+
+    def test_relative_difference_implication(self):
+        imp = RelativeDifferenceImplication(tolerance=0.1)
+        block = imp.get_block("x", np.array([0, 0, 100, 95, 50]))
+        assert block[0, 1] == 1
+        assert block[0, 2] == -1
+        assert block[2, 3] == pytest.approx(0.5)
+        assert block[3, 2] == pytest.approx(0.5)
+        assert block[2, 4] == -1
+        assert np.all((block >= -1) & (block <= 1))
+        with pytest.raises(ValueError):
+            RelativeDifferenceImplication(tolerance=-1)
+
+    def test_sparse_implication(self):
+        class Implication(BaseImplication):
+            def get_block(self, var, values):
+                return np.array([
+                    [1, 0.2, -0.9, 0.5],
+                    [0.1, 1, np.nan, np.nan],
+                    [0.3, -0.35, 1, 0.6],
+                    [-0.05, 0.1, 0.05, 1]
+                ])
+
+        values = np.arange(4)
+        top_2 = SparseImplication(Implication(), top_k=2)
+        assert np.array_equal(top_2.get_block("x", values), np.array([
+            [np.nan, np.nan, -0.9, 0.5],
+            [0.1, np.nan, np.nan, np.nan],
+            [np.nan, -0.35, np.nan, 0.6],
+            [-0.05, 0.1, np.nan, np.nan]
+        ]), equal_nan=True)
+
+        threshold = SparseImplication(Implication(), threshold=0.3)
+        assert np.array_equal(threshold.get_block("x", values), np.array([
+            [np.nan, np.nan, -0.9, 0.5],
+            [np.nan, np.nan, np.nan, np.nan],
+            [0.3, -0.35, np.nan, 0.6],
+            [np.nan, np.nan, np.nan, np.nan]
+        ]), equal_nan=True)
+
+        both = SparseImplication(Implication(), top_k=1, threshold=0.4)
+        assert np.array_equal(both.get_block("x", values), np.array([
+            [np.nan, np.nan, -0.9, np.nan],
+            [np.nan, np.nan, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, 0.6],
+            [np.nan, np.nan, np.nan, np.nan]
+        ]), equal_nan=True)
+
+        # top_k larger than the number of other values keeps everything
+        assert np.array_equal(
+            SparseImplication(Implication(), top_k=3).get_block("x", values),
+            Implication().get_block("x", values) + np.diag([np.nan] * 4),
+            equal_nan=True
+        )
+
+        for kwargs in ({}, {"top_k": 0}, {"threshold": 1.5}):
+            with pytest.raises(ValueError):
+                SparseImplication(Implication(), **kwargs)
+
+    def test_sparse_implication_in_dataset(self):
+        sv = np.array([
+            [1, 2],
+            [2, 2],
+            [3, 5],
+            [40, 6]
+        ])
+        # Wrap a per-pair function
+        imp = SparseImplication(
+            lambda var, val1, val2: 1 / (1 + abs(val1 - val2)), top_k=1
+        )
+        data = MatrixDataset(ma.masked_array(sv), implication_function=imp)
+        assert data.imp.nnz == data.num_claims
+        # Each claim should keep its implication on the closest value
+        imp_arr = data.imp.toarray()
+        for claim in range(data.num_claims):
+            var_id, val_hash = data.claim_ids.inverse[claim]
+            val = data.val_hashes.inverse[val_hash]
+            target = np.argmax(imp_arr[claim])
+            _, target_hash = data.claim_ids.inverse[target]
+            others = [
+                data.val_hashes.inverse[data.claim_ids.inverse[j][1]]
+                for j in range(data.num_claims)
+                if j != claim and data.claim_ids.inverse[j][0] == var_id
+            ]
+            nearest = min(abs(val - other) for other in others)
+            assert abs(val - data.val_hashes.inverse[target_hash]) == nearest
+
+    def test_sparse_implication_per_pair_values(self):
+        def same_type(var, val1, val2):
+            return 0.5 if type(val1) is type(val2) else -0.5
+
+        triples = [("s1", "x", 1), ("s2", "x", "1"), ("s3", "x", 2)]
+        unwrapped = Dataset(triples, implication_function=same_type)
+        for kwargs in ({"threshold": 0}, {"threshold": 0.1}, {"top_k": 2}):
+            wrapped = Dataset(
+                triples,
+                implication_function=SparseImplication(same_type, **kwargs)
+            )
+            assert np.array_equal(
+                wrapped.imp.toarray(), unwrapped.imp.toarray()
+            )
+        assert set(unwrapped.imp.data) == {-0.5, 0.5}
+
+    def test_matrix_dataset_batch_implications(self):
+        sv = ma.masked_values([
+            [1, 2, 0],
+            [1.05, 7, 3],
+            [5, 0, 3]
+        ], 0)
+        imp = RelativeDifferenceImplication()
+        batch = MatrixDataset(sv, implication_function=imp)
+        pairwise = MatrixDataset(sv, implication_function=imp.__call__)
+        assert batch.imp.nnz > 0
+        assert np.allclose(batch.imp.toarray(), pairwise.imp.toarray())
+
 
 class TestFileDataset:
     @pytest.fixture
@@ -690,3 +1517,139 @@ class TestFileSupervisedData:
             "best programming language": "python",
             "favourite cheese": "cheddar"
         }
+
+
+class TestCanonicalisation:
+    def test_numeric(self):
+        canon = NumericCanonicaliser(decimals=2, ignore_chars=",")
+        values = np.array(["1.50", "1.5", "1,000", "abc", 3, "-0.001", "nan",
+                           ("t", 1), True], dtype=object)
+        assert list(canon.canonicalise(values)) == [
+            1.5, 1.5, 1000, "abc", 3, 0, "nan", ("t", 1), True
+        ]
+        # Numeric arrays should be rounded without going through Python
+        result = canon.canonicalise(np.array([1.004, 1.0, -0.001]))
+        assert result.dtype == float
+        assert np.array_equal(result, [1, 1, 0])
+        assert canon("1.499") == 1.5
+        assert NumericCanonicaliser()("1.499") == 1.499
+
+    def test_units(self):
+        canon = UnitCanonicaliser({"k": 1e3, "M": 1e6, "%": 0.01, "km": 1e4})
+        values = np.array(["1.5K", "1500", " 2 m", "5%", "3km", "k", "abc",
+                           7], dtype=object)
+        assert list(canon.canonicalise(values)) == [
+            1500, 1500, 2e6, 0.05, 3e4, "k", "abc", 7
+        ]
+        case_sensitive = UnitCanonicaliser({"M": 1e6}, case_sensitive=True)
+        assert case_sensitive("2M") == 2e6
+        assert case_sensitive("2m") == "2m"
+        assert np.array_equal(canon.canonicalise(np.array([1, 2])), [1, 2])
+
+    def test_case_fold(self):
+        canon = CaseFoldCanonicaliser()
+        values = np.array(["  Hello   World ", "HELLO WORLD", "Straße", 4],
+                          dtype=object)
+        assert list(canon.canonicalise(values)) == [
+            "hello world", "hello world", "strasse", 4
+        ]
+
+    def test_key(self):
+        canon = KeyCanonicaliser(lambda val: val[:3])
+        assert list(canon.canonicalise(np.array(["abcd", "abc"]))) == [
+            "abc", "abc"
+        ]
+        vectorised = KeyCanonicaliser(lambda arr: arr // 10, vectorised=True)
+        assert list(vectorised.canonicalise(np.array([14, 15, 21]))) == [
+            1, 1, 2
+        ]
+
+    def test_chain(self):
+        canon = CanonicaliserChain(
+            CaseFoldCanonicaliser(),
+            UnitCanonicaliser({"k": 1e3}),
+            NumericCanonicaliser(decimals=1)
+        )
+        assert canon("1.04 K") == 1040
+        assert canon(" Yes") == "yes"
+
+    def test_base(self):
+        with pytest.raises(NotImplementedError):
+            BaseCanonicaliser().canonicalise(np.array([1]))
+
+    def test_dataset(self):
+        triples = [
+            ("s1", "x", "1.50"),
+            ("s2", "x", "1.5"),
+            ("s3", "x", "2"),
+            ("s1", "y", "Yes"),
+            ("s2", "y", "yes "),
+            ("s3", "y", "no"),
+            ("s1", "z", 4)
+        ]
+        canon = CanonicaliserChain(
+            CaseFoldCanonicaliser(), NumericCanonicaliser()
+        )
+        data = Dataset(triples, canonicaliser=canon)
+        assert data.canonicaliser is canon
+        assert data.num_claims == 5
+        assert list(data.val_hashes) == [1.5, 2, "yes", "no", 4]
+        # Claims should be numbered in order of first appearance
+        assert [data.claim_ids.inverse[j] for j in range(5)] == [
+            (0, 0), (0, 1), (1, 2), (1, 3), (2, 4)
+        ]
+        assert np.array_equal(data.sc.toarray(), [
+            [1, 0, 1, 0, 1],
+            [1, 0, 1, 0, 0],
+            [0, 1, 0, 1, 0]
+        ])
+        assert np.array_equal(data.mut_ex.toarray(), [
+            [1, 1, 0, 0, 0],
+            [1, 1, 0, 0, 0],
+            [0, 0, 1, 1, 0],
+            [0, 0, 1, 1, 0],
+            [0, 0, 0, 0, 1]
+        ])
+
+        results = MajorityVoting().run(data)
+        assert results.belief["x"] == {1.5: 1, 2: 0.5}
+        sup = SupervisedData(data, {"x": "1.500", "y": "YES"})
+        assert sup.values == {"x": 1.5, "y": "yes"}
+        assert sup.get_accuracy(results) == 1
+
+        without = Dataset(triples)
+        assert without.num_claims == 7
+        assert SupervisedData(without, {"x": "1.500"}).values == {
+            "x": "1.500"
+        }
+
+    def test_dataset_errors(self):
+        triples = [("s1", "x", 1), ("s2", "x", 2)]
+        wrong_length = KeyCanonicaliser(lambda arr: arr[:1], vectorised=True)
+        with pytest.raises(ValueError):
+            Dataset(triples, canonicaliser=wrong_length)
+        non_numeric = KeyCanonicaliser(lambda val: "v{}".format(val))
+        with pytest.raises(ValueError):
+            MatrixDataset(ma.masked_values([[1, 2]], 0),
+                          canonicaliser=non_numeric)
+
+    def test_matrix_dataset(self):
+        sv = ma.masked_values([
+            [1.001, 2, 0],
+            [1.0, 0, 5],
+            [3, 2.0004, 5.01]
+        ], 0)
+        data = MatrixDataset(sv, canonicaliser=NumericCanonicaliser(2))
+        assert data.num_claims == 5
+        assert list(data.val_hashes) == [1, 2, 5, 3, 5.01]
+        reconstructed = data.reconstruct_sv()
+        assert np.array_equal(reconstructed.filled(0), [
+            [1, 2, 0],
+            [1, 0, 5],
+            [3, 2, 5.01]
+        ])
+        assert data.sv is sv
+        # Results should be the same as for a matrix with the canonical
+        # values
+        expected = MatrixDataset(reconstructed)
+        assert np.array_equal(data.sc.toarray(), expected.sc.toarray())
@@ -1,9 +1,12 @@
+import time
+
 import pytest
 
 import numpy as np
 
 from truthdiscovery.utils import (
     ConvergenceIterator,
+    DeadlineIterator,
     DistanceMeasures,
     FixedIterator,
     Iterator
@@ -55,6 +58,21 @@ class TestBaseIterator:
         assert it_count == limit
         assert conv_it.it_count == limit
 
+    def test_copy(self):
+        it = ConvergenceIterator(DistanceMeasures.L2, 0.5, limit=10)
+        it.compare(np.array([1]), np.array([3]))
+        new_it = it.copy()
+        assert isinstance(new_it, ConvergenceIterator)
+        assert new_it is not it
+        assert new_it.it_count == 0
+        assert new_it.current_distance is None
+        assert new_it.distance_measure == DistanceMeasures.L2
+        assert new_it.threshold == 0.5
+        assert new_it.limit == 10
+        # Original should be unchanged
+        assert it.it_count == 1
+        assert it.current_distance == 2
+
 
 class TestFixedIterator:
     def test_invalid_limit(self):
@@ -107,6 +125,104 @@ class TestConvergenceIterator:
         assert it_count == 200
 
 
+class TestDeadlineIterator:
+    def test_invalid(self):
+        for deadline in (0, -1):
+            with pytest.raises(ValueError):
+                DeadlineIterator(deadline)
+        with pytest.raises(ValueError):
+            DeadlineIterator(1, limit=0)
+
+    def test_deadline(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr("time.perf_counter", lambda: now[0])
+        it = DeadlineIterator(1)
+        it_count = 0
+        while not it.finished():
+            it_count += 1
+            now[0] += 0.25
+            it.compare(1, 2)
+        assert it_count == 4
+
+        # Budget should be measured from reset
+        it = it.copy()
+        assert it.get_elapsed_time() == 0
+        assert not it.finished()
+
+    def test_at_least_one_iteration(self, monkeypatch):
+        it = DeadlineIterator(0.001)
+        now = time.perf_counter()
+        monkeypatch.setattr("time.perf_counter", lambda: now + 10)
+        assert not it.finished()
+        it.compare(1, 2)
+        assert it.finished()
+
+    def test_limit(self):
+        it = DeadlineIterator(1000, limit=3)
+        it_count = 0
+        while not it.finished():
+            it_count += 1
+            it.compare(1, 2)
+        assert it_count == 3
+
+
+class TestHistory:
+    def test_no_history_by_default(self):
+        for it in (FixedIterator(5), ConvergenceIterator(DistanceMeasures.L1,
+                                                         0.1)):
+            it.compare(np.array([1]), np.array([2]))
+            assert it.get_history() is None
+
+    def test_fixed_history(self):
+        it = FixedIterator(3, record_history=True)
+        # Should be preallocated to the number of iterations
+        assert len(it.history) == 3
+        it.compare(np.array([1, 2]), np.array([1.5, 2]))
+        it.record_belief_change(np.array([0, 1]), np.array([0, 0.25]))
+        it.compare(np.array([1, 2]), np.array([1, -1]))
+        hist = it.get_history()
+        assert len(hist) == 2
+        assert np.all(np.isnan(hist["distance"]))
+        assert list(hist["trust_delta"]) == [0.5, 3]
+        assert hist["belief_delta"][0] == 0.75
+        assert np.isnan(hist["belief_delta"][1])
+        assert np.all(hist["time"] >= 0)
+        assert hist["time"][0] <= hist["time"][1]
+
+        it.reset()
+        assert len(it.get_history()) == 0
+
+    def test_convergence_history(self):
+        it = ConvergenceIterator(DistanceMeasures.L1, 0.1, limit=2,
+                                 record_history=True)
+        it.compare(np.array([1, 2]), np.array([2, 4]))
+        assert list(it.get_history()["distance"]) == [3]
+        it.compare(np.array([1, 2]), np.array([1, 2.5]))
+        assert list(it.get_history()["distance"]) == [3, 0.5]
+
+        # History should be available when iteration does not converge
+        with pytest.raises(ConvergenceError) as excinfo:
+            it.finished()
+        assert list(excinfo.value.history["distance"]) == [3, 0.5]
+
+    def test_history_grows(self):
+        it = ConvergenceIterator(DistanceMeasures.L1, 0, record_history=True)
+        it.MAX_HISTORY_PREALLOCATION = 4
+        it.reset()
+        assert len(it.history) == 4
+        for i in range(10):
+            it.compare(np.array([0]), np.array([i]))
+        assert list(it.get_history()["distance"]) == list(range(10))
+
+    def test_copies_do_not_share_history(self):
+        it = FixedIterator(5, record_history=True)
+        copy1 = it.copy()
+        copy2 = it.copy()
+        copy1.compare(np.array([0]), np.array([1]))
+        assert len(copy1.get_history()) == 1
+        assert len(copy2.get_history()) == 0
+
+
 class TestDistanceMeasures:
     def check(self, measure, obj1, obj2, exp_distance):
         got = ConvergenceIterator.get_distance(
@@ -149,3 +265,29 @@ class TestDistanceMeasures:
             [0, 0, 0, 0],
             1
         )
+
+    def test_weighted(self):
+        obj1 = np.array([1, 2, 3, 4])
+        obj2 = np.array([0, 3, -4, 1])
+        weights = np.array([2, 1, 0, 3])
+        # Weighted distances should be the same as for vectors with entries
+        # repeated according to the weights
+        rep1 = np.repeat(obj1, weights)
+        rep2 = np.repeat(obj2, weights)
+        for measure in DistanceMeasures:
+            got = ConvergenceIterator.get_distance(
+                measure, obj1, obj2, weights=weights
+            )
+            exp = ConvergenceIterator.get_distance(measure, rep1, rep2)
+            assert got == pytest.approx(exp)
+
+    def test_iterator_weights(self):
+        it = ConvergenceIterator(DistanceMeasures.L1, 1.5)
+        it.compare(np.array([1, 2]), np.array([2, 3]))
+        assert not it.finished()
+        it.weights = np.array([3, 1])
+        it.compare(np.array([1, 2]), np.array([2, 3]))
+        assert it.current_distance == 4
+        it.weights = np.array([1, 0])
+        it.compare(np.array([1, 2]), np.array([2, 3]))
+        assert it.finished()
@@ -0,0 +1,131 @@
+from io import StringIO
+import json
+
+import pytest
+
+from truthdiscovery.algorithm import Sums
+from truthdiscovery.graphs import GraphRenderer
+from truthdiscovery.graphs.backends import JsonBackend
+from truthdiscovery.input import Dataset
+from truthdiscovery.utils import (
+    disable_tracing,
+    enable_tracing,
+    FixedIterator,
+    get_tracer,
+    Tracer
+)
+from truthdiscovery.utils import tracing
+
+
+class TestTracing:
+    @pytest.fixture
+    def tracer(self):
+        tracer = enable_tracing()
+        yield tracer
+        disable_tracing()
+
+    @pytest.fixture
+    def dataset(self):
+        return Dataset((
+            ("s1", "x", 1), ("s1", "y", 2),
+            ("s2", "x", 1), ("s2", "y", 3)
+        ))
+
+    def get_names(self, tracer):
+        return [event["name"] for event in tracer.events]
+
+    def test_disabled(self):
+        assert get_tracer() is None
+        with tracing.span("nothing") as span:
+            pass
+        # No-op objects should be shared, and not record anything
+        assert span is tracing.span("nothing else")
+        tracing.phases("prefix").checkpoint("phase")
+
+    def test_span(self, tracer):
+        assert get_tracer() is tracer
+        with tracing.span("outer", info=4):
+            with tracing.span("inner"):
+                pass
+        assert self.get_names(tracer) == ["inner", "outer"]
+        inner, outer = tracer.events
+        assert inner["ph"] == outer["ph"] == "X"
+        assert outer["args"] == {"info": 4}
+        assert "args" not in inner
+        assert outer["ts"] <= inner["ts"]
+        assert (inner["ts"] + inner["dur"]) <= (outer["ts"] + outer["dur"])
+
+    def test_phases(self, tracer):
+        recorder = tracing.phases("stage")
+        recorder.checkpoint("one")
+        recorder.checkpoint("two", size=2)
+        assert self.get_names(tracer) == ["stage.one", "stage.two"]
+        one, two = tracer.events
+        assert two["ts"] == one["ts"] + one["dur"]
+        assert two["args"] == {"size": 2}
+
+    def test_traced(self, tracer):
+        @tracing.traced("my_func")
+        def my_func(x):
+            return x + 1
+        assert my_func.__name__ == "my_func"
+        assert my_func(1) == 2
+        assert self.get_names(tracer) == ["my_func"]
+
+    def test_write(self, tracer):
+        with tracing.span("span"):
+            pass
+        buf = StringIO()
+        tracer.write(buf)
+        obj = json.loads(buf.getvalue())
+        assert len(obj["traceEvents"]) == 1
+        assert obj["traceEvents"][0]["name"] == "span"
+
+    def test_save(self, tracer, tmpdir):
+        with tracing.span("span"):
+            pass
+        path = str(tmpdir.join("trace.json"))
+        tracer.save(path)
+        with open(path) as infile:
+            obj = json.load(infile)
+        assert obj == tracer.get_trace()
+
+    def test_instrumentation(self, tracer, dataset):
+        alg = Sums(iterator=FixedIterator(3))
+        alg.run(dataset)
+        GraphRenderer(backend=JsonBackend()).render(dataset, StringIO())
+        names = self.get_names(tracer)
+
+        for phase in ("read_triples", "build_sc", "build_mut_ex",
+                      "build_imp"):
+            assert "Dataset.{}".format(phase) in names
+        assert "Sums.run" in names
+        assert "Dataset.get_belief_dict" in names
+        assert "Dataset.get_source_trust_dict" in names
+        assert "GraphRenderer.render" in names
+
+        iterations = [
+            event["args"]["iteration"] for event in tracer.events
+            if event["name"] == "Sums.iteration"
+        ]
+        assert iterations == [0, 1, 2, 3]
+
+    def test_environment_variable(self, monkeypatch):
+        registered = []
+        monkeypatch.setattr(
+            tracing.atexit, "register",
+            lambda *args: registered.append(args)
+        )
+        monkeypatch.delenv(tracing.TRACE_ENV_VAR, raising=False)
+        tracing._enable_from_environment()
+        assert get_tracer() is None
+        assert registered == []
+
+        monkeypatch.setenv(tracing.TRACE_ENV_VAR, "/some/path.json")
+        try:
+            tracing._enable_from_environment()
+            tracer = get_tracer()
+            assert isinstance(tracer, Tracer)
+            assert registered == [(tracer.save, "/some/path.json")]
+        finally:
+            disable_tracing()
@@ -1,9 +1,16 @@
 from truthdiscovery.utils.iterator import (
     ConvergenceIterator,
+    DeadlineIterator,
     DistanceMeasures,
     FixedIterator,
     Iterator
 )
+from truthdiscovery.utils.tracing import (
+    disable_tracing,
+    enable_tracing,
+    get_tracer,
+    Tracer
+)
 
 
 def filter_dict(dct, keys):
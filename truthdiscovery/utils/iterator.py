@@ -1,4 +1,6 @@
+import copy
 from enum import Enum
+import time
 
 import numpy as np
 
@@ -23,17 +25,56 @@ class DistanceMeasures(Enum):
 
 class Iterator:
     """
-    Base class for iterators
+    Base class for iterators.
+
+    Iterators can optionally record a history of each iteration, which is
+    stored in a preallocated numpy structured array with the following fields:
+
+    * ``distance``: distance between old and new trust vectors (for iterators
+      that measure distance; NaN otherwise)
+    * ``time``: seconds elapsed since the iterator was reset
+    * ``trust_delta``: largest absolute change in a trust score
+    * ``belief_delta``: largest absolute change in a belief score (NaN if the
+      algorithm did not report beliefs)
     """
     it_count = 0
+    # Upper limit on the number of iterations, if any
+    limit = None
+    # Weight of each entry of the compared vectors in distance calculations,
+    # or None for equal weights. Set by algorithms for datasets with weighted
+    # sources (see :any:`CollapsedDataset`)
+    weights = None
+    record_history = False
+    history = None
+    _start_time = None
+
+    HISTORY_DTYPE = np.dtype([
+        ("distance", np.float64),
+        ("time", np.float64),
+        ("trust_delta", np.float64),
+        ("belief_delta", np.float64),
+    ])
+    # Upper bound on the initial size of the history array: if more iterations
+    # are performed the array is grown as needed
+    MAX_HISTORY_PREALLOCATION = 10000
+
+    def __init__(self, record_history=False):
+        """
+        :param record_history: if True, record a history of each iteration
+                               (see :meth:`get_history`)
+        """
+        self.record_history = record_history
+        self.reset()
 
-    def compare(self, _obj1, _obj2):
+    def compare(self, obj1, obj2):
         """
         Log the comparison of two objects
         """
         # By default just increase iteration count without comparing objects at
-        # all
+        # all (unless recording history)
         self.it_count += 1
+        if self.history is not None:
+            self._record_iteration(obj1, obj2)
 
     def finished(self):
         """
@@ -46,6 +87,75 @@ class Iterator:
         Reset iteration
         """
         self.it_count = 0
+        self.history = None
+        if self.record_history:
+            self.history = np.full(
+                (self.get_history_capacity(),), np.nan,
+                dtype=self.HISTORY_DTYPE
+            )
+            self._start_time = time.perf_counter()
+
+    def copy(self):
+        """
+        Return a copy of this iterator with iteration reset. Algorithms iterate
+        with a copy so that a single iterator may be shared between several
+        (possibly concurrent) runs
+
+        :return: a new :any:`Iterator` object of the same type
+        """
+        new_it = copy.copy(self)
+        new_it.reset()
+        return new_it
+
+    def get_history_capacity(self):
+        """
+        :return: the number of entries to preallocate for the history array
+        """
+        if self.limit is None:
+            return self.MAX_HISTORY_PREALLOCATION
+        return max(min(self.limit, self.MAX_HISTORY_PREALLOCATION), 1)
+
+    def get_history(self):
+        """
+        :return: a numpy structured array (with dtype ``HISTORY_DTYPE``) with
+                 one entry per iteration performed, or None if history is not
+                 being recorded
+        """
+        if self.history is None:
+            return None
+        return self.history[:self.it_count]
+
+    def record_belief_change(self, new_belief, old_belief):
+        """
+        Record the change in belief scores for the current iteration, if
+        history is being recorded
+        """
+        if self.history is not None and self.it_count > 0:
+            self.history[self.it_count - 1]["belief_delta"] = (
+                self._max_abs_diff(new_belief, old_belief)
+            )
+
+    def _record_iteration(self, obj1, obj2):
+        """
+        Add an entry for the current iteration to the history array
+        """
+        index = self.it_count - 1
+        if index >= len(self.history):
+            # Grow the array geometrically so that recording stays amortised
+            # O(1) per iteration
+            new_history = np.full(
+                (2 * len(self.history),), np.nan, dtype=self.HISTORY_DTYPE
+            )
+            new_history[:len(self.history)] = self.history
+            self.history = new_history
+        entry = self.history[index]
+        entry["time"] = time.perf_counter() - self._start_time
+        entry["trust_delta"] = self._max_abs_diff(obj1, obj2)
+
+    @classmethod
+    def _max_abs_diff(cls, obj1, obj2):
+        diff = np.abs(np.asarray(obj1) - np.asarray(obj2))
+        return np.max(diff) if diff.size else 0
 
 
 class FixedIterator(Iterator):
@@ -54,15 +164,16 @@ class FixedIterator(Iterator):
     """
     limit = 20
 
-    def __init__(self, limit=None):
+    def __init__(self, limit=None, record_history=False):
         """
-        :param limit: number of iterations to perform
+        :param limit:          number of iterations to perform
+        :param record_history: see :any:`Iterator`
         """
         if limit is not None:
             if limit < 0:
                 raise ValueError("Iteration limit cannot be negative")
             self.limit = limit
-        self.reset()
+        super().__init__(record_history=record_history)
 
     def finished(self):
         return self.it_count >= self.limit
@@ -79,7 +190,8 @@ class ConvergenceIterator(Iterator):
     limit = 1000000
     debug = False
 
-    def __init__(self, distance_measure, threshold, limit=None, debug=False):
+    def __init__(self, distance_measure, threshold, limit=None, debug=False,
+                 record_history=False):
         """
         :param distance_measure: value from :any:`DistanceMeasures` enumeration
         :param threshold:        iteration is finished when distance goes below
@@ -87,6 +199,7 @@ class ConvergenceIterator(Iterator):
         :param limit:            upper limit on number of iterations to perform
         :param debug:            if True, print out current distance at each
                                  iteration
+        :param record_history:   see :any:`Iterator`
         """
         self.distance_measure = distance_measure
         if threshold is not None:
@@ -94,7 +207,7 @@ class ConvergenceIterator(Iterator):
         if limit is not None:
             self.limit = limit
         self.debug = debug
-        self.reset()
+        super().__init__(record_history=record_history)
 
     def reset(self):
         super().reset()
@@ -106,8 +219,10 @@ class ConvergenceIterator(Iterator):
         """
         super().compare(obj1, obj2)
         self.current_distance = self.get_distance(
-            self.distance_measure, obj1, obj2
+            self.distance_measure, obj1, obj2, weights=self.weights
         )
+        if self.history is not None:
+            self.history[self.it_count - 1]["distance"] = self.current_distance
         if self.debug:  # pragma: no cover
             print("{},{}".format(self.it_count, self.current_distance))
 
@@ -121,21 +236,36 @@ class ConvergenceIterator(Iterator):
             return True
         if self.it_count >= self.limit:
             raise ConvergenceError(
-                "Did not converge in {} iterations".format(self.limit)
+                "Did not converge in {} iterations".format(self.limit),
+                history=self.get_history()
             )
         return False
 
     @classmethod
-    def get_distance(cls, distance_measure, obj1, obj2):
+    def get_distance(cls, distance_measure, obj1, obj2, weights=None):
         """
         Calculate distance between vectors using the given measure
 
         :param distance_measure: value from :any:`DistanceMeasures` enumeration
         :param obj1:             first object to be compared
         :param obj2:             second object to be compared
+        :param weights:          (optional) non-negative integer weights for
+                                 the entries of the vectors. The distance is
+                                 the same as between vectors in which each
+                                 entry is repeated according to its weight
         :raises ValueError: if ``distance_measure`` is not an item from the
                             :any:`DistanceMeasures` enumeration
         """
+        if weights is not None:
+            if distance_measure == DistanceMeasures.L1:
+                obj1, obj2 = weights * obj1, weights * obj2
+            elif distance_measure in (DistanceMeasures.L2,
+                                      DistanceMeasures.COSINE):
+                root_weights = np.sqrt(weights)
+                obj1, obj2 = root_weights * obj1, root_weights * obj2
+            else:
+                present = weights > 0
+                obj1, obj2 = obj1[present], obj2[present]
         if distance_measure == DistanceMeasures.L1:
             return np.linalg.norm(obj1 - obj2, ord=1)
         if distance_measure == DistanceMeasures.L2:
@@ -151,3 +281,46 @@ class ConvergenceIterator(Iterator):
         raise ValueError(
             "Invalid distance measure: '{}'".format(distance_measure)
         )
+
+
+class DeadlineIterator(Iterator):
+    """
+    Iterator that runs until a time budget is used up, measured from when the
+    iterator was reset (i.e. the start of an algorithm run). At least one
+    iteration is always performed.
+    """
+    deadline = None
+    _deadline_start = None
+
+    def __init__(self, deadline, limit=None, record_history=False):
+        """
+        :param deadline:       time budget in seconds
+        :param limit:          (optional) upper limit on number of iterations
+                               to perform
+        :param record_history: see :any:`Iterator`
+        :raises ValueError: if ``deadline`` or ``limit`` is not positive
+        """
+        if deadline <= 0:
+            raise ValueError("Deadline must be positive")
+        if limit is not None and limit <= 0:
+            raise ValueError("Iteration limit must be positive")
+        self.deadline = deadline
+        self.limit = limit
+        super().__init__(record_history=record_history)
+
+    def reset(self):
+        super().reset()
+        self._deadline_start = time.perf_counter()
+
+    def get_elapsed_time(self):
+        """
+        :return: seconds elapsed since the iterator was reset
+        """
+        return time.perf_counter() - self._deadline_start
+
+    def finished(self):
+        if self.it_count == 0:
+            return False
+        if self.limit is not None and self.it_count >= self.limit:
+            return True
+        return self.get_elapsed_time() >= self.deadline
@@ -0,0 +1,233 @@
+"""
+Lightweight tracing of the library's main stages (dataset construction,
+algorithm iterations, result conversion and rendering), written in the Chrome
+trace-event JSON format. Traces can be viewed in ``chrome://tracing`` or
+https://ui.perfetto.dev.
+
+Tracing is disabled by default, in which case :func:`span` returns a shared
+no-op context manager. It can be enabled with :func:`enable_tracing`, the
+``--trace`` option of the command-line client, or by setting the environment
+variable ``TRUTHDISCOVERY_TRACE`` to the path of a file to write the trace to
+when the process exits.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+TRACE_ENV_VAR = "TRUTHDISCOVERY_TRACE"
+
+
+class Tracer:
+    """
+    Collects trace events in memory, and writes them in Chrome trace-event
+    format
+    """
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    @classmethod
+    def now(cls):
+        """
+        :return: current timestamp in microseconds
+        """
+        return time.perf_counter_ns() / 1000
+
+    def add_span(self, name, start, end, category="truthdiscovery",
+                 args=None):
+        """
+        Record a complete event
+
+        :param name:     name of the span
+        :param start:    start timestamp as returned by :meth:`now`
+        :param end:      end timestamp as returned by :meth:`now`
+        :param category: event category
+        :param args:     (optional) dict of extra information to attach
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": end - start,
+            "pid": self.pid,
+            "tid": threading.get_ident()
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def span(self, name, **args):
+        """
+        :return: a context manager that records a span covering its body
+        """
+        return Span(self, name, args)
+
+    def get_trace(self):
+        """
+        :return: the trace as a JSON-serialisable dict
+        """
+        with self.lock:
+            events = list(self.events)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, fileobj):
+        """
+        Write the trace as JSON to a file object
+        """
+        json.dump(self.get_trace(), fileobj, default=str)
+
+    def save(self, path):
+        """
+        Write the trace as JSON to the file at ``path``
+        """
+        with open(path, "w") as fileobj:
+            self.write(fileobj)
+
+
+class Span:
+    """
+    Context manager to record a span with a :any:`Tracer`
+    """
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.tracer.now()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.add_span(
+            self.name, self.start, self.tracer.now(), args=self.args
+        )
+
+
+class PhaseRecorder:
+    """
+    Record consecutive phases of a computation as spans, without having to
+    wrap each phase in a ``with`` block: each call to :meth:`checkpoint`
+    records a span from the previous checkpoint (or creation of the recorder)
+    to now
+    """
+    def __init__(self, tracer, prefix):
+        self.tracer = tracer
+        self.prefix = prefix
+        self.last = tracer.now()
+
+    def checkpoint(self, phase, **args):
+        """
+        Mark the end of a phase
+
+        :param phase: name of the phase that has just finished
+        """
+        now = self.tracer.now()
+        self.tracer.add_span(
+            "{}.{}".format(self.prefix, phase), self.last, now, args=args
+        )
+        self.last = now
+
+
+class NullSpan:
+    """
+    Context manager and phase recorder that does nothing, used when tracing is
+    disabled
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def checkpoint(self, phase, **args):
+        pass
+
+
+_NULL_SPAN = NullSpan()
+_active_tracer = None
+
+
+def get_tracer():
+    """
+    :return: the active :any:`Tracer`, or None if tracing is disabled
+    """
+    return _active_tracer
+
+
+def enable_tracing(tracer=None):
+    """
+    Start recording trace events
+
+    :param tracer: (optional) :any:`Tracer` object to record events with. A new
+                   one is created if not given
+    :return: the active :any:`Tracer`
+    """
+    global _active_tracer
+    _active_tracer = tracer or Tracer()
+    return _active_tracer
+
+
+def disable_tracing():
+    """
+    Stop recording trace events
+
+    :return: the :any:`Tracer` that was active, or None
+    """
+    global _active_tracer
+    tracer = _active_tracer
+    _active_tracer = None
+    return tracer
+
+
+def span(name, **args):
+    """
+    Return a context manager that records a span named ``name`` with the active
+    tracer, or does nothing if tracing is disabled. Keyword arguments are
+    attached to the event.
+    """
+    if _active_tracer is None:
+        return _NULL_SPAN
+    return _active_tracer.span(name, **args)
+
+
+def traced(name):
+    """
+    Decorator to record a span named ``name`` for each call to the decorated
+    function when tracing is enabled
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return inner
+    return decorator
+
+
+def phases(prefix):
+    """
+    Return a :any:`PhaseRecorder` for the active tracer, or an object whose
+    ``checkpoint`` method does nothing if tracing is disabled
+
+    :param prefix: prefix for the names of the recorded spans
+    """
+    if _active_tracer is None:
+        return _NULL_SPAN
+    return PhaseRecorder(_active_tracer, prefix)
+
+
+def _enable_from_environment():
+    path = os.environ.get(TRACE_ENV_VAR)
+    if path:
+        tracer = enable_tracing()
+        atexit.register(tracer.save, path)
+
+
+_enable_from_environment()